@@ -1,6 +1,6 @@
 import sqlite3
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 
 #Migration de SQLite a PostgreSQL para pasarlo a Power BI
 
@@ -19,6 +19,13 @@ tablas = pd.read_sql("SELECT name FROM sqlite_master WHERE type='table';", sqlit
 postgres_url = f"postgresql+psycopg2://{usuario}:{clave}@{host}:{puerto}/{base_datos}"
 engine = create_engine(postgres_url)
 
+#Vistas de SQLite (p.ej. V_BRFSS_2024_LIMPIO con etiquetas); se eliminan antes
+#de reemplazar las tablas de las que dependen y se recrean al final
+vistas = pd.read_sql("SELECT name, sql FROM sqlite_master WHERE type='view';", sqlite_conn)
+for v in vistas["name"]:
+    with engine.begin() as pg:
+        pg.execute(text(f'DROP VIEW IF EXISTS "{v}" CASCADE'))
+
 #Migrar todas las tablas del pipeline.db a PostgreSQL 
 for t in tablas["name"]:
     print(f"Migrando tabla: {t}")
@@ -26,6 +33,25 @@ for t in tablas["name"]:
     df.to_sql(t, engine, if_exists="replace", index=False)
     print(f" Tabla {t} migrada correctamente")
 
+#Recrear vistas en PostgreSQL, una por transacción: si una falla se informa y
+#se siguen creando las demás. Las definiciones usan solo SQL estándar (sin
+#rowid); las que dependen de otra vista se reintentan en la pasada siguiente
+pendientes = list(zip(vistas["name"], vistas["sql"]))
+while pendientes:
+    fallidas = []
+    for v, sql in pendientes:
+        try:
+            with engine.begin() as pg:
+                pg.exec_driver_sql(sql)
+            print(f" Vista {v} creada")
+        except Exception as e:
+            fallidas.append((v, sql, e))
+    if len(fallidas) == len(pendientes):
+        for v, _, e in fallidas:
+            print(f" ⚠ Vista {v} no se pudo crear: {e}")
+        break
+    pendientes = [(v, sql) for v, sql, _ in fallidas]
+
 sqlite_conn.close()
 engine.dispose()
 print("\n Migración completa: todas las tablas ahora están en PostgreSQL")
@@ -14,37 +14,13 @@ os.makedirs("data_csv", exist_ok=True)
 
 conn = sqlite3.connect("pipeline.db")
 
-# --- NHANES 2021 ---
-nhanes_urls = {
-    "ALB_CR_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/ALB_CR_L.xpt",
-    "AGP_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/AGP_L.xpt",
-    "HDL_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/HDL_L.xpt",
-    "TRIGLY_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/TRIGLY_L.xpt",
-    "TCHOL_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/TCHOL_L.xpt",
-    "CBC_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/CBC_L.xpt",
-    "FASTQX_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/FASTQX_L.xpt",
-    "FERTIN_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/FERTIN_L.xpt",
-    "FOLATE_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/FOLATE_L.xpt",
-    "GHB_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/GHB_L.xpt",
-    "HEPA_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/HEPA_L.xpt",
-    "HEPB_S_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/HEPB_S_L.xpt",
-    "HSCRP_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/HSCRP_L.xpt",
-    "INS_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/INS_L.xpt",
-    "PBCD_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/PBCD_L.xpt",
-    "IHGEM_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/IHGEM_L.xpt",
-    "GLU_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/GLU_L.xpt",
-    "FOLFMS_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/FOLFMS_L.xpt",
-    "TST_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/TST_L.xpt",
-    "BIOPRO_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/BIOPRO_L.xpt",
-    "TFR_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/TFR_L.xpt",
-    "UCPREG_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/UCPREG_L.xpt",
-    "VID_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/VID_L.xpt",
-    "VOCWB_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/VOCWB_L.xpt",
-    "BMX_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/BMX_L.xpt",
-    "DEMO_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/DEMO_L.xpt",
-    "DR1TOT_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/DR1TOT_L.xpt",
-    "DR2TOT_L": "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/2021/DataFiles/DR2TOT_L.xpt"
-}
+# --- NHANES (ciclos 2011-2023) ---
+# Por defecto solo el ciclo 2021-2023 (_L); NHANES_CICLOS="G,H,I,J,L" agrega
+# los ciclos anteriores. Cada ciclo queda en sus propias tablas (DEMO_G, ...)
+from utilidades.ciclos_nhanes import CICLO_ACTUAL, TABLAS_NHANES, ciclos_validos, urls_nhanes
+
+ciclos_nhanes = ciclos_validos(os.environ.get("NHANES_CICLOS", CICLO_ACTUAL).split(","))
+nhanes_urls = urls_nhanes(TABLAS_NHANES, ciclos_nhanes)
 
 for name, url in nhanes_urls.items():
     try:
@@ -88,7 +64,9 @@ try:
                 '_TOTINDA', 'WEIGHT2', 'WTKG3', 'HEIGHT3', '_BMI5', '_BMI5CAT', '_RFBMI5',
                 'SMOKDAY2', 'LCSFIRST', 'LCSNUMCG', '_SMOKER3', 'LCSLAST_', 'LCSNUMC_',
                 '_LCSSMKG', '_LCSYSMK', 'ALCDAY4', 'AVEDRNK4', 'DRNK3GE5', '_DRNKWK3',
-                '_RFDRHV9', 'MARIJAN1', 'SSBFRUT3'
+                '_RFDRHV9', 'MARIJAN1', 'SSBFRUT3',
+                # Diseño muestral: peso final, estrato y PSU (estimaciones ponderadas)
+                '_LLCPWT', '_STSTR', '_PSU'
             ]
 
             columnas_existentes = [c for c in columnas_relevantes if c in df_brfss.columns]
@@ -101,7 +79,15 @@ except Exception as e:
     print(f"Error con BRFSS: {e}")
 
 # --- FoodData Central - Solo tablas necesarias ---
-fdc_url = "https://fdc.nal.usda.gov/fdc-datasets/FoodData_Central_foundation_food_csv_2025-04-24.zip"
+# FDC_DATASET="branded" descarga Branded Foods (millones de filas en
+# food_nutrient.csv); los CSV se cargan por bloques de FDC_TAMANO_BLOQUE filas
+FDC_DATASETS = {
+    'foundation': "FoodData_Central_foundation_food_csv_2025-04-24",
+    'branded': "FoodData_Central_branded_food_csv_2025-04-24",
+}
+fdc_dataset = FDC_DATASETS[os.environ.get("FDC_DATASET", "foundation")]
+fdc_tamano_bloque = int(os.environ.get("FDC_TAMANO_BLOQUE", "500000"))
+fdc_url = f"https://fdc.nal.usda.gov/fdc-datasets/{fdc_dataset}.zip"
 try:
     print("Descargando FoodData Central...", end=" ")
     resp = requests.get(fdc_url)
@@ -126,43 +112,64 @@ try:
     ]
     
     import glob
-    csv_path = "data_csv/fooddata/FoodData_Central_foundation_food_csv_2025-04-24"
+    csv_path = f"data_csv/fooddata/{fdc_dataset}"
     
     for tabla_nombre in tablas_fdc_principales:
         tabla_path = os.path.join(csv_path, tabla_nombre)
         if os.path.exists(tabla_path):
             table_name = tabla_nombre.replace('.csv', '').upper()
             print(f"Cargando {tabla_nombre}...", end=" ")
-            df_fdc = pd.read_csv(tabla_path, low_memory=False)
-            df_fdc.to_sql(f"FDC_{table_name}", conn, if_exists="replace", index=False)
-            print(f"OK - {df_fdc.shape[0]} filas x {df_fdc.shape[1]} columnas")
+            n_filas = 0
+            for i, df_fdc in enumerate(pd.read_csv(tabla_path, low_memory=False, chunksize=fdc_tamano_bloque)):
+                df_fdc.to_sql(f"FDC_{table_name}", conn, if_exists="replace" if i == 0 else "append", index=False)
+                n_filas += df_fdc.shape[0]
+            print(f"OK - {n_filas} filas x {df_fdc.shape[1]} columnas")
         else:
             print(f"Advertencia: {tabla_nombre} no encontrado")
     
 except Exception as e:
     print(f"ERROR: {e}")
 
-# -- ODEPA 2025 --  
-
-url_csv = "https://datos.odepa.gob.cl/dataset/c3ca8246-3d84-4145-9e34-525b0ba95859/resource/7f8f1255-a13b-4233-aad0-631054a8a025/download/precio_consumidor_publico_2025.csv"
-
-try:
-    print("Descargando ODEPA (CSV completo)...")
-    response = requests.get(url_csv, verify=False)  
-    response.raise_for_status()
-    
-    path_csv = "data_xpt/precio_consumidor_publico_2025.csv"
-    with open(path_csv, "wb") as f:
-        f.write(response.content)
-
-    df_odepa = pd.read_csv(path_csv, encoding="utf-8")
-    print(f"ODEPA cargado correctamente: {df_odepa.shape[0]} filas × {df_odepa.shape[1]} columnas")
-
-    df_odepa.to_sql("ODEPA_2025", conn, if_exists="replace", index=False)
-    print(f"'ODEPA_2025' guardado en SQLite: {df_odepa.shape[0]} filas × {df_odepa.shape[1]} columnas")
+# -- ODEPA (precios al consumidor, 2008 en adelante) --
+# Por defecto solo el año actual; ODEPA_ANIOS="2008-2025" (o "2023,2024,2025")
+# carga el historial. Cada año reemplaza solo su partición (Anio) en
+# ODEPA_PRECIOS y se omite si el archivo no cambió desde la última carga, para
+# que la limpieza incremental (ODEPA_INCREMENTAL=1) solo vea semanas nuevas.
+from utilidades.carga import guardar_particion
+from utilidades.particiones_odepa import (
+    ANIO_ODEPA_ACTUAL, URLS_ODEPA, anios_odepa, archivo_odepa_cambiado, registrar_archivo_odepa
+)
+
+for anio in anios_odepa(os.environ.get("ODEPA_ANIOS", str(ANIO_ODEPA_ACTUAL))):
+    path_csv = f"data_xpt/precio_consumidor_publico_{anio}.csv"
+    try:
+        if anio in URLS_ODEPA:
+            print(f"Descargando ODEPA {anio} (CSV completo)...")
+            response = requests.get(URLS_ODEPA[anio], verify=False)
+            response.raise_for_status()
+            with open(path_csv, "wb") as f:
+                f.write(response.content)
+        elif not os.path.exists(path_csv):
+            print(f"⚠ ODEPA {anio}: sin URL registrada ni archivo {path_csv}, se omite")
+            continue
+
+        with open(path_csv, "rb") as f:
+            contenido = f.read()
+        if not archivo_odepa_cambiado(conn, anio, contenido):
+            print(f"ODEPA {anio}: archivo sin cambios, se mantiene la partición cargada")
+            continue
+
+        df_odepa = pd.read_csv(io.BytesIO(contenido), encoding="utf-8")
+        if 'Anio' not in df_odepa.columns:
+            df_odepa['Anio'] = anio
+        print(f"ODEPA {anio} cargado correctamente: {df_odepa.shape[0]} filas × {df_odepa.shape[1]} columnas")
+
+        guardar_particion(conn, df_odepa, "ODEPA_PRECIOS", columna='Anio')
+        registrar_archivo_odepa(conn, anio, contenido, len(df_odepa))
+        print(f"'ODEPA_PRECIOS' (Anio={anio}) guardado en SQLite: {df_odepa.shape[0]} filas")
 
-except Exception as e:
-    print(f"Error al descargar ODEPA: {e}")
+    except Exception as e:
+        print(f"Error al descargar ODEPA {anio}: {e}")
 
 conn.close()
 print("\n ¡Todos los datasets guardados en 'pipeline.db'!")
@@ -1,14 +1,53 @@
 import pandas as pd
 import sqlite3
 import numpy as np
+import os
+import sys
+import time
+
+# Paquete compartido scripts/utilidades
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utilidades.encuesta import (
+    PESO_NHANES, ESTRATO_NHANES, PSU_NHANES, TABLA_ESTIMACIONES_NHANES, INDICADORES_NHANES, DOMINIOS_NHANES,
+    estimar_indicadores, consultar_indicador, guardar_ponderadas
+)
+from utilidades.union_nhanes import unir_por_seqn
+from utilidades.ciclos_nhanes import (
+    CICLOS_NHANES, CICLO_ACTUAL, TABLAS_NHANES, ciclos_validos, nombre_tabla, separar_nombre, tablas_por_ciclo,
+    agregar_ciclo, peso_combinado
+)
+from utilidades.carga import guardar_particion, leer_columnas
+from utilidades.vistas_nhanes import guardar_como_vista, eliminar_tabla_o_vista, SUFIJO_DELTA
+from utilidades.limpieza_nhanes import limpiar_tablas
+from utilidades.tipos_compactos import optimizar_tipos, restaurar_tipos, imprimir_reporte_memoria
+from utilidades.reglas_clinicas import (
+    REGLAS_CATEGORIAS, CRITERIOS_BINARIOS, CRITERIOS_SINDROME_METABOLICO, PUNTOS_RIESGO_CV,
+    variable_regla, aplicar_categoria, evaluar_criterio, calcular_puntaje, mascara_criterios, contar_bits
+)
 
 # ========================================
 # CONFIGURACIÓN INICIAL
 # ========================================
-conn = sqlite3.connect("pipeline.db")
+# Unir también las tablas de laboratorio restantes (otras_tablas_lab) a NHANES_MASTER
+UNIR_TABLAS_LAB = os.environ.get("NHANES_UNIR_LAB", "0") == "1"
+
+# Ciclos NHANES a procesar (G, H, I, J, L = 2011-2023), p.ej. NHANES_CICLOS="G,H,I,J,L".
+# Cada ciclo es una partición de NHANES_MASTER: solo se reemplazan los ciclos procesados
+CICLOS = ciclos_validos(os.environ.get("NHANES_CICLOS", CICLO_ACTUAL).split(","))
+
+# Guardar las tablas *_LIMPIO como vistas sobre NHANES_MASTER + tabla delta
+# (solo las columnas que no están en la maestra) en lugar de copias completas
+LIMPIO_COMO_VISTAS = os.environ.get("NHANES_LIMPIO_VISTAS", "0") == "1"
+
+# Procesos para la limpieza por tabla (1 = en serie)
+N_PROCESOS = int(os.environ.get("NHANES_PROCESOS", os.cpu_count() or 1))
+
+RUTA_DB = "pipeline.db"
+conn = sqlite3.connect(RUTA_DB)
 print("="*70)
 print("LIMPIEZA Y TRANSFORMACIÓN NHANES - ENFOQUE DIABETES/COLESTEROL")
 print("="*70)
+print("Ciclos: " + ", ".join(f"{c} ({CICLOS_NHANES[c]['anios']})" for c in CICLOS))
 
 # ========================================
 # 1. LIMPIEZA GLOBAL NHANES
@@ -17,63 +56,58 @@ print("\n" + "="*70)
 print("PASO 1: LIMPIEZA GLOBAL DE TABLAS NHANES")
 print("="*70)
 
-# Parámetros de limpieza
-threshold_nan_col = 0.70
-threshold_nan_row = 0.70
-
-# Tablas NHANES
-tablas = [
-    "DEMO_L", "BMX_L", "GLU_L", "HDL_L", "TRIGLY_L", "TCHOL_L",
-    "DR1TOT_L", "DR2TOT_L", "ALB_CR_L", "AGP_L", "CBC_L", "FASTQX_L",
-    "FERTIN_L", "FOLATE_L", "GHB_L", "HEPA_L", "HEPB_S_L", "HSCRP_L",
-    "INS_L", "PBCD_L", "IHGEM_L", "FOLFMS_L", "TST_L", "BIOPRO_L",
-    "TFR_L", "UCPREG_L", "VID_L", "VOCWB_L"
+otras_tablas_lab = [
+    "ALB_CR", "AGP", "CBC", "FASTQX", "FERTIN", "FOLATE",
+    "HEPA", "HEPB_S", "HSCRP", "INS", "PBCD", "IHGEM",
+    "FOLFMS", "TST", "BIOPRO", "TFR", "UCPREG", "VID", "VOCWB"
 ]
 
+# Tablas de todos los ciclos; los ciclos antiguos no tienen todos los laboratorios
+tablas_existentes = {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+tablas = [t for t in tablas_por_ciclo(TABLAS_NHANES, CICLOS) if t in tablas_existentes]
+omitidas = [t for t in tablas_por_ciclo(TABLAS_NHANES, CICLOS) if t not in tablas_existentes]
+if omitidas:
+    print(f"⚠ {len(omitidas)} tablas no ingeridas, se omiten: {', '.join(omitidas)}")
+
+# Cada tabla de cada ciclo se limpia de forma independiente (PASO 1 + PASO 2)
+# en un pool de procesos; los mensajes se imprimen después, en el orden de `tablas`
+inicio = time.perf_counter()
+resultados = limpiar_tablas(tablas, RUTA_DB, N_PROCESOS)
+duracion = time.perf_counter() - inicio
+
+# Tablas limpias con tipos compactos (los trabajadores ya aplicaron
+# optimizar_tipos) y su reporte de tipos para restaurarlas al unir y guardar
 nhanes_clean = {}
+tipos_clean = {}
 nhanes_cleaning_summary = []
+mensajes_paso2 = []
+violaciones_rango = []
 
-for name in tablas:
-    try:
-        df = pd.read_sql(f"SELECT * FROM {name}", conn)
-        original_shape = df.shape
-
-        if name == 'FASTQX_L':
-            # Regla especial FASTQX (90% de threshold)
-            col_nan_pct = df.isnull().sum() / len(df)
-            cols_to_drop = col_nan_pct[col_nan_pct > 0.90].index.tolist()
-            df_limpio = df.drop(columns=cols_to_drop)
-            row_nan_pct = df_limpio.isnull().sum(axis=1) / df_limpio.shape[1]
-            df_limpio = df_limpio[row_nan_pct < 1.0]
-        else:
-            # Limpieza estándar
-            col_nan_pct = df.isnull().sum() / len(df)
-            cols_to_drop = col_nan_pct[col_nan_pct > threshold_nan_col].index.tolist()
-            df_limpio = df.drop(columns=cols_to_drop)
-            row_nan_pct = df_limpio.isnull().sum(axis=1) / df_limpio.shape[1]
-            df_limpio = df_limpio[row_nan_pct <= threshold_nan_row]
+for name, df_limpio, tipos, resumen, mensajes, violaciones, error in resultados:
+    if error is not None:
+        print(f"✗ Error en {name}: {error}")
+        continue
 
-        final_shape = df_limpio.shape
-        completitud = (1 - df_limpio.isnull().sum().sum() / (df_limpio.shape[0] * df_limpio.shape[1])) * 100
+    nhanes_clean[name] = df_limpio
+    tipos_clean[name] = tipos
+    nhanes_cleaning_summary.append(resumen)
+    mensajes_paso2 += mensajes
+    if violaciones is not None and len(violaciones):
+        violaciones_rango.append(violaciones)
 
-        nhanes_clean[name] = df_limpio
-        
-        nhanes_cleaning_summary.append({
-            'dataset': name,
-            'filas_original': original_shape[0],
-            'filas_final': final_shape[0],
-            'cols_original': original_shape[1],
-            'cols_final': final_shape[1],
-            'cols_eliminadas': len(cols_to_drop),
-            'completitud_pct': completitud
-        })
-        
-        print(f"✓ {name}: {original_shape[0]:,} → {final_shape[0]:,} filas | "
-              f"{original_shape[1]} → {final_shape[1]} cols | "
-              f"Completitud: {completitud:.1f}%")
-        
-    except Exception as e:
-        print(f"✗ Error en {name}: {e}")
+    print(f"✓ {name}: {resumen['filas_original']:,} → {resumen['filas_final']:,} filas | "
+          f"{resumen['cols_original']} → {resumen['cols_final']} cols | "
+          f"Completitud: {resumen['completitud_pct']:.1f}%")
+
+print(f"\n  Tablas procesadas: {len(nhanes_clean)}/{len(tablas)} en {duracion:.1f}s "
+      f"({min(N_PROCESOS, len(tablas))} procesos)")
+if tipos_clean:
+    imprimir_reporte_memoria(pd.concat(tipos_clean.values(), ignore_index=True), "Tablas limpias")
+
+
+def tabla_limpia(name):
+    """Tabla limpia con sus tipos originales (mismos valores que antes de compactar)"""
+    return restaurar_tipos(nhanes_clean[name], tipos_clean[name])
 
 nhanes_summary_df = pd.DataFrame(nhanes_cleaning_summary)
 print(f"\n{'='*70}")
@@ -87,280 +121,16 @@ print(f"\n{'='*70}")
 print("PASO 2: LIMPIEZA ESPECÍFICA DE VARIABLES CLAVE")
 print("="*70)
 
-# ----------------------------------------
-# 2.1 DEMO_L - Variables demográficas
-# ----------------------------------------
-print("\n2.1. Limpiando DEMO_L (Demographics)...")
-try:
-    df_demo = nhanes_clean['DEMO_L'].copy()
-    
-    # Mapeos de variables categóricas
-    demo_mappings = {
-        "RIAGENDR": {
-            1: "Hombre",
-            2: "Mujer"
-        },
-        "DMDBORN4": {
-            1: "Nacido en EE.UU.",
-            2: "Otros países",
-            77: np.nan,  # Se negó a responder
-            99: np.nan   # No sabe
-        },
-        "DMDEDUC2": {
-            1: "Menos de 9º grado",
-            2: "9-11º grado",
-            3: "Graduado secundaria",
-            4: "Alguna universidad/AA",
-            5: "Graduado universitario",
-            7: np.nan,
-            9: np.nan
-        },
-        "DMDHHSIZ": {
-            1: "1 persona", 2: "2 personas", 3: "3 personas",
-            4: "4 personas", 5: "5 personas", 6: "6 personas",
-            7: "7 o más personas"
-        },
-        "DMDHRAGZ": {
-            1: "<20 años",
-            2: "20-39 años",
-            3: "40-59 años",
-            4: "60+ años"
-        },
-        "DMDHRGND": {
-            1: "Hombre",
-            2: "Mujer"
-        },
-        "DMDMARTZ": {
-            1: "Casado/Vive con pareja",
-            2: "Viudo/Divorciado/Separado",
-            3: "Nunca se casó",
-            77: np.nan,
-            99: np.nan
-        },
-        "RIDRETH3": {  # Raza/Etnicidad (importante para diabetes)
-            1: "Mexicano-Americano",
-            2: "Otro Hispano",
-            3: "Blanco no hispano",
-            4: "Negro no hispano",
-            6: "Asiático no hispano",
-            7: "Otra raza"
-        }
-    }
-    
-    for col, mapping in demo_mappings.items():
-        if col in df_demo.columns:
-            df_demo[col] = df_demo[col].map(mapping)
-    
-    # Variables numéricas
-    if 'RIDAGEYR' in df_demo.columns:
-        df_demo['RIDAGEYR'] = pd.to_numeric(df_demo['RIDAGEYR'], errors='coerce')
-    
-    if 'INDFMPIR' in df_demo.columns:  # Ratio ingreso/pobreza
-        df_demo['INDFMPIR'] = pd.to_numeric(df_demo['INDFMPIR'], errors='coerce')
-    
-    nhanes_clean['DEMO_L'] = df_demo
-    print("  ✓ DEMO_L: Variables demográficas mapeadas")
-    
-except Exception as e:
-    print(f"  ✗ Error en DEMO_L: {e}")
-
-# ----------------------------------------
-# 2.2 BMX_L - Antropometría
-# ----------------------------------------
-print("\n2.2. Limpiando BMX_L (Body Measures)...")
-try:
-    df_bmx = nhanes_clean['BMX_L'].copy()
-    
-    # Variables antropométricas clave
-    vars_antropo = {
-        'BMXWT': 'Peso (kg)',
-        'BMXHT': 'Altura (cm)',
-        'BMXBMI': 'IMC',
-        'BMXWAIST': 'Circunferencia cintura (cm)',
-        'BMXHIP': 'Circunferencia cadera (cm)'
-    }
-    
-    for var, desc in vars_antropo.items():
-        if var in df_bmx.columns:
-            df_bmx[var] = pd.to_numeric(df_bmx[var], errors='coerce')
-            
-            # Validación de outliers
-            if var == 'BMXWT':  # Peso
-                df_bmx.loc[(df_bmx[var] < 20) | (df_bmx[var] > 300), var] = np.nan
-            elif var == 'BMXHT':  # Altura
-                df_bmx.loc[(df_bmx[var] < 100) | (df_bmx[var] > 230), var] = np.nan
-            elif var == 'BMXBMI':  # IMC
-                df_bmx.loc[(df_bmx[var] < 12) | (df_bmx[var] > 70), var] = np.nan
-            elif var == 'BMXWAIST':  # Cintura
-                df_bmx.loc[(df_bmx[var] < 40) | (df_bmx[var] > 200), var] = np.nan
-    
-    nhanes_clean['BMX_L'] = df_bmx
-    print("  ✓ BMX_L: Variables antropométricas validadas")
-    
-except Exception as e:
-    print(f"  ✗ Error en BMX_L: {e}")
-
-# ----------------------------------------
-# 2.3 GHB_L - Hemoglobina Glucosilada (HbA1c) ***CRÍTICA***
-# ----------------------------------------
-print("\n2.3. Limpiando GHB_L (Glycohemoglobin - HbA1c)...")
-try:
-    df_ghb = nhanes_clean['GHB_L'].copy()
-    
-    if 'LBXGH' in df_ghb.columns:
-        df_ghb['LBXGH'] = pd.to_numeric(df_ghb['LBXGH'], errors='coerce')
-        # Validar rango: HbA1c normal = 4-6%, diabetes ≥6.5%
-        df_ghb.loc[(df_ghb['LBXGH'] < 3) | (df_ghb['LBXGH'] > 18), 'LBXGH'] = np.nan
-        
-        nhanes_clean['GHB_L'] = df_ghb
-        print(f"   GHB_L: HbA1c limpiada (n={df_ghb['LBXGH'].notna().sum():,})")
-    else:
-        print("   LBXGH no encontrada en GHB_L")
-        
-except Exception as e:
-    print(f"  ✗ Error en GHB_L: {e}")
-
-# ----------------------------------------
-# 2.4 GLU_L - Glucosa en sangre
-# ----------------------------------------
-print("\n2.4. Limpiando GLU_L (Glucose)...")
-try:
-    df_glu = nhanes_clean['GLU_L'].copy()
-    
-    if 'LBXGLU' in df_glu.columns:
-        df_glu['LBXGLU'] = pd.to_numeric(df_glu['LBXGLU'], errors='coerce')
-        # Validar rango razonable: 40-600 mg/dL
-        df_glu.loc[(df_glu['LBXGLU'] < 40) | (df_glu['LBXGLU'] > 600), 'LBXGLU'] = np.nan
-        
-        nhanes_clean['GLU_L'] = df_glu
-        print(f"   GLU_L: Glucosa limpiada (n={df_glu['LBXGLU'].notna().sum():,})")
-    else:
-        print("   LBXGLU no encontrada en GLU_L")
-        
-except Exception as e:
-    print(f"   Error en GLU_L: {e}")
+# Demografía (mapeos), antropometría y laboratorio (rangos válidos), dieta y
+# resto de laboratorio (conversión numérica): ver utilidades/limpieza_nhanes.py
+# Los rangos salen del registro único utilidades/validacion_rangos.RANGOS_VALIDOS
+for mensaje in mensajes_paso2:
+    print(mensaje)
 
-# ----------------------------------------
-# 2.5 TCHOL_L - Colesterol Total
-# ----------------------------------------
-print("\n2.5. Limpiando TCHOL_L (Total Cholesterol)...")
-try:
-    df_tchol = nhanes_clean['TCHOL_L'].copy()
-    
-    if 'LBXTC' in df_tchol.columns:
-        df_tchol['LBXTC'] = pd.to_numeric(df_tchol['LBXTC'], errors='coerce')
-        # Validar rango: 100-500 mg/dL
-        df_tchol.loc[(df_tchol['LBXTC'] < 100) | (df_tchol['LBXTC'] > 500), 'LBXTC'] = np.nan
-        
-        nhanes_clean['TCHOL_L'] = df_tchol
-        print(f"   TCHOL_L: Colesterol total limpiado (n={df_tchol['LBXTC'].notna().sum():,})")
-    else:
-        print("   LBXTC no encontrada en TCHOL_L")
-        
-except Exception as e:
-    print(f"   Error en TCHOL_L: {e}")
-
-# ----------------------------------------
-# 2.6 HDL_L - Colesterol HDL (Bueno)
-# ----------------------------------------
-print("\n2.6. Limpiando HDL_L (HDL Cholesterol)...")
-try:
-    df_hdl = nhanes_clean['HDL_L'].copy()
-    
-    if 'LBDHDD' in df_hdl.columns:
-        df_hdl['LBDHDD'] = pd.to_numeric(df_hdl['LBDHDD'], errors='coerce')
-        # Validar rango: 10-150 mg/dL
-        df_hdl.loc[(df_hdl['LBDHDD'] < 10) | (df_hdl['LBDHDD'] > 150), 'LBDHDD'] = np.nan
-        
-        nhanes_clean['HDL_L'] = df_hdl
-        print(f"  HDL_L: HDL limpiado (n={df_hdl['LBDHDD'].notna().sum():,})")
-    else:
-        print("  LBDHDD no encontrada en HDL_L")
-    
-except Exception as e:
-    print(f"  Error en HDL_L: {e}")
-
-# ----------------------------------------
-# 2.7 TRIGLY_L - Triglicéridos
-# ----------------------------------------
-print("\n2.7. Limpiando TRIGLY_L (Triglycerides)...")
-try:
-    df_trigly = nhanes_clean['TRIGLY_L'].copy()
-    
-    if 'LBXTR' in df_trigly.columns:
-        df_trigly['LBXTR'] = pd.to_numeric(df_trigly['LBXTR'], errors='coerce')
-        # Validar rango: 30-1000 mg/dL
-        df_trigly.loc[(df_trigly['LBXTR'] < 30) | (df_trigly['LBXTR'] > 1000), 'LBXTR'] = np.nan
-        
-        nhanes_clean['TRIGLY_L'] = df_trigly
-        print(f"  ✓ TRIGLY_L: Triglicéridos limpiados (n={df_trigly['LBXTR'].notna().sum():,})")
-    elif 'LBDTRSI' in df_trigly.columns:  # Nombre alternativo
-        df_trigly['LBDTRSI'] = pd.to_numeric(df_trigly['LBDTRSI'], errors='coerce')
-        df_trigly.loc[(df_trigly['LBDTRSI'] < 30) | (df_trigly['LBDTRSI'] > 1000), 'LBDTRSI'] = np.nan
-        
-        nhanes_clean['TRIGLY_L'] = df_trigly
-        print(f"   TRIGLY_L: Triglicéridos limpiados (n={df_trigly['LBDTRSI'].notna().sum():,})")
-    else:
-        print("   LBXTR/LBDTRSI no encontrada en TRIGLY_L")
-        
-except Exception as e:
-    print(f"  Error en TRIGLY_L: {e}")
-
-# ----------------------------------------
-# 2.8 DR1TOT_L y DR2TOT_L - Dieta
-# ----------------------------------------
-print("\n2.8. Limpiando DR1TOT_L y DR2TOT_L (Dietary Intake)...")
-for tbl_name, dia in [("DR1TOT_L", "día 1"), ("DR2TOT_L", "día 2")]:
-    try:
-        df_diet = nhanes_clean[tbl_name].copy()
-        
-        # Variables dietéticas clave para diabetes/colesterol
-        vars_dieta = {
-            f'DR{dia[4]}TKCAL': 'Calorías totales',
-            f'DR{dia[4]}TCARB': 'Carbohidratos (g)',
-            f'DR{dia[4]}TSUGR': 'Azúcares totales (g)',
-            f'DR{dia[4]}TFIBE': 'Fibra (g)',
-            f'DR{dia[4]}TTFAT': 'Grasa total (g)',
-            f'DR{dia[4]}TSFAT': 'Grasa saturada (g)',
-            f'DR{dia[4]}TCHOL': 'Colesterol dietético (mg)',
-            f'DR{dia[4]}TSODI': 'Sodio (mg)',
-            f'DR{dia[4]}TPROT': 'Proteína (g)'
-        }
-        
-        for var, desc in vars_dieta.items():
-            if var in df_diet.columns:
-                df_diet[var] = pd.to_numeric(df_diet[var], errors='coerce')
-        
-        nhanes_clean[tbl_name] = df_diet
-        print(f"   {tbl_name}: Variables dietéticas limpiadas ({dia})")
-        
-    except Exception as e:
-        print(f"   Error en {tbl_name}: {e}")
-
-# ----------------------------------------
-# 2.9 Otras tablas de laboratorio
-# ----------------------------------------
-print("\n2.9. Limpiando otras tablas de laboratorio...")
-otras_tablas_lab = [
-    "ALB_CR_L", "AGP_L", "CBC_L", "FASTQX_L", "FERTIN_L", "FOLATE_L",
-    "HEPA_L", "HEPB_S_L", "HSCRP_L", "INS_L", "PBCD_L", "IHGEM_L",
-    "FOLFMS_L", "TST_L", "BIOPRO_L", "TFR_L", "UCPREG_L", "VID_L", "VOCWB_L"
-]
-
-for tbl in otras_tablas_lab:
-    try:
-        if tbl in nhanes_clean:
-            df = nhanes_clean[tbl].copy()
-            
-            # Convertir todas las columnas numéricas
-            for col in df.columns:
-                if col != 'SEQN':  # No convertir el ID
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            nhanes_clean[tbl] = df
-            print(f"  ✓ {tbl}: Convertido a numérico")
-    except Exception as e:
-        print(f"  ✗ Error en {tbl}: {e}")
+if violaciones_rango:
+    resumen_violaciones = pd.concat(violaciones_rango, ignore_index=True)
+    print("\nRESUMEN DE VALORES FUERA DE RANGO (anulados):")
+    print(resumen_violaciones.to_string(index=False))
 
 # ========================================
 # 3. UNIR TODAS LAS TABLAS NHANES (JOIN)
@@ -369,42 +139,59 @@ print(f"\n{'='*70}")
 print("PASO 3: UNIÓN DE TABLAS NHANES POR SEQN")
 print("="*70)
 
-try:
-    # Comenzar con DEMO_L como base
-    nhanes_master = nhanes_clean['DEMO_L'].copy()
-    print(f"Base inicial (DEMO_L): {nhanes_master.shape[0]:,} participantes")
-    
-    # JOINs secuenciales
-    tablas_merge = [
-        ('BMX_L', 'Antropometría'),
-        ('GHB_L', 'HbA1c'),
-        ('GLU_L', 'Glucosa'),
-        ('TCHOL_L', 'Colesterol Total'),
-        ('HDL_L', 'HDL'),
-        ('TRIGLY_L', 'Triglicéridos'),
-        ('DR1TOT_L', 'Dieta Día 1'),
-        ('DR2TOT_L', 'Dieta Día 2')
-    ]
-    
-    for tabla, descripcion in tablas_merge:
-        if tabla in nhanes_clean:
-            antes = nhanes_master.shape[1]
-            nhanes_master = nhanes_master.merge(
-                nhanes_clean[tabla],
-                on='SEQN',
-                how='left',
-                suffixes=('', f'_{tabla}')
-            )
-            despues = nhanes_master.shape[1]
-            print(f"  ✓ {tabla} ({descripcion}): +{despues - antes} columnas")
-        else:
-            print(f"  ⚠ {tabla} no disponible, se omite")
+# DEMO es la base de cada ciclo; el resto se alinea por SEQN en una sola
+# concatenación. Las columnas repetidas llevan el nombre base de la tabla
+# (sin ciclo), así coinciden entre ciclos.
+tablas_merge = [
+    ('BMX', 'Antropometría'),
+    ('GHB', 'HbA1c'),
+    ('GLU', 'Glucosa'),
+    ('TCHOL', 'Colesterol Total'),
+    ('HDL', 'HDL'),
+    ('TRIGLY', 'Triglicéridos'),
+    ('DR1TOT', 'Dieta Día 1'),
+    ('DR2TOT', 'Dieta Día 2')
+]
+if UNIR_TABLAS_LAB:
+    tablas_merge += [(tbl, 'Laboratorio') for tbl in otras_tablas_lab]
+
+maestras_ciclo = []
+for ciclo in CICLOS:
+    demo = nombre_tabla('DEMO', ciclo)
+    if demo not in nhanes_clean:
+        print(f"⚠ {demo} no disponible, se omite el ciclo {ciclo}")
+        continue
     
-    print(f"\nTabla maestra creada: {nhanes_master.shape[0]:,} filas × {nhanes_master.shape[1]} columnas")
+    try:
+        print(f"Base inicial ({demo}): {nhanes_clean[demo].shape[0]:,} participantes")
+        
+        disponibles = [
+            (base, tabla_limpia(nombre_tabla(base, ciclo)))
+            for base, _ in tablas_merge if nombre_tabla(base, ciclo) in nhanes_clean
+        ]
+        master_ciclo, resumen_union = unir_por_seqn(tabla_limpia(demo), disponibles)
+        
+        resumen_union = resumen_union.set_index('tabla') if len(resumen_union) else resumen_union
+        for base, descripcion in tablas_merge:
+            tabla = nombre_tabla(base, ciclo)
+            if tabla in nhanes_clean:
+                fila = resumen_union.loc[base]
+                extra = f" ({fila['renombradas']} renombradas)" if fila['renombradas'] else ""
+                aviso = f" ⚠ {fila['seqn_duplicados']:,} SEQN repetidos descartados" if fila['seqn_duplicados'] else ""
+                print(f"  ✓ {tabla} ({descripcion}): +{fila['columnas']} columnas{extra}{aviso}")
+            else:
+                print(f"  ⚠ {tabla} no disponible, se omite")
+        
+    except Exception as e:
+        print(f"✗ Error en unión de tablas del ciclo {ciclo}: {e}")
+        master_ciclo = tabla_limpia(demo)
     
-except Exception as e:
-    print(f"✗ Error en unión de tablas: {e}")
-    nhanes_master = nhanes_clean['DEMO_L'].copy()
+    maestras_ciclo.append(agregar_ciclo(master_ciclo, ciclo))
+
+# Un solo concat de todos los ciclos (las columnas que faltan en un ciclo quedan NaN)
+nhanes_master = pd.concat(maestras_ciclo, ignore_index=True)
+print(f"\nTabla maestra creada: {nhanes_master.shape[0]:,} filas × {nhanes_master.shape[1]} columnas "
+      f"(ciclos: {', '.join(nhanes_master['ciclo'].unique())})")
 
 # ========================================
 # 4. CREAR VARIABLES DERIVADAS
@@ -413,6 +200,9 @@ print(f"\n{'='*70}")
 print("PASO 4: CREACIÓN DE VARIABLES DERIVADAS")
 print("="*70)
 
+# Umbrales y puntos de corte: tablas declarativas en utilidades/reglas_clinicas.py
+# (REGLAS_CATEGORIAS, CRITERIOS_BINARIOS, PUNTOS_RIESGO_CV)
+
 # ----------------------------------------
 # 4.1 Variables demográficas categóricas
 # ----------------------------------------
@@ -432,19 +222,7 @@ if 'RIDAGEYR' in nhanes_master.columns:
 
 # Categoría de ingresos
 if 'INDFMPIR' in nhanes_master.columns:
-    def clasificar_ingreso(pir):
-        if pd.isna(pir):
-            return np.nan
-        elif pir < 1.0:
-            return 'Bajo pobreza'
-        elif pir < 2.0:
-            return 'Cerca pobreza'
-        elif pir < 4.0:
-            return 'Medio'
-        else:
-            return 'Alto'
-    
-    nhanes_master['categoria_ingreso'] = nhanes_master['INDFMPIR'].apply(clasificar_ingreso)
+    nhanes_master['categoria_ingreso'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['categoria_ingreso'])
     print("  ✓ categoria_ingreso creada")
 
 # ----------------------------------------
@@ -459,41 +237,13 @@ if 'BMXBMI' not in nhanes_master.columns and 'BMXWT' in nhanes_master.columns an
 
 # Categoría de IMC
 if 'BMXBMI' in nhanes_master.columns:
-    def clasificar_imc(imc):
-        if pd.isna(imc):
-            return np.nan
-        elif imc < 18.5:
-            return 'Bajo peso'
-        elif imc < 25:
-            return 'Normal'
-        elif imc < 30:
-            return 'Sobrepeso'
-        else:
-            return 'Obesidad'
-    
-    nhanes_master['categoria_imc'] = nhanes_master['BMXBMI'].apply(clasificar_imc)
+    nhanes_master['categoria_imc'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['categoria_imc'])
     print(" categoria_imc creada")
 
-# Ratio cintura/cadera (importante para riesgo metabólico)
+# Ratio cintura/cadera (importante para riesgo metabólico), con corte por sexo
 if 'BMXWAIST' in nhanes_master.columns and 'BMXHIP' in nhanes_master.columns:
     nhanes_master['ratio_cintura_cadera'] = nhanes_master['BMXWAIST'] / nhanes_master['BMXHIP']
-    
-    def clasificar_rcc(row):
-        rcc = row.get('ratio_cintura_cadera')
-        sexo = row.get('RIAGENDR')
-        
-        if pd.isna(rcc) or pd.isna(sexo):
-            return np.nan
-        
-        # Criterios de riesgo por sexo
-        if sexo == 'Hombre':
-            return 'Alto riesgo' if rcc > 0.90 else 'Normal'
-        elif sexo == 'Mujer':
-            return 'Alto riesgo' if rcc > 0.85 else 'Normal'
-        else:
-            return np.nan
-    
-    nhanes_master['riesgo_rcc'] = nhanes_master.apply(clasificar_rcc, axis=1)
+    nhanes_master['riesgo_rcc'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['riesgo_rcc'])
     print(" ratio_cintura_cadera y riesgo_rcc creados")
 
 # ----------------------------------------
@@ -503,21 +253,8 @@ print("\n4.3. Variables de diabetes...")
 
 # Diagnóstico de diabetes por HbA1c
 if 'LBXGH' in nhanes_master.columns:
-    nhanes_master['diabetes_hba1c'] = (nhanes_master['LBXGH'] >= 6.5).astype(float)
-    nhanes_master.loc[nhanes_master['LBXGH'].isna(), 'diabetes_hba1c'] = np.nan
-    
-    # Categorías de HbA1c
-    def clasificar_hba1c(valor):
-        if pd.isna(valor):
-            return np.nan
-        elif valor < 5.7:
-            return 'Normal'
-        elif valor < 6.5:
-            return 'Prediabetes'
-        else:
-            return 'Diabetes'
-    
-    nhanes_master['categoria_hba1c'] = nhanes_master['LBXGH'].apply(clasificar_hba1c)
+    nhanes_master['diabetes_hba1c'] = evaluar_criterio(nhanes_master, CRITERIOS_BINARIOS['diabetes_hba1c'])
+    nhanes_master['categoria_hba1c'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['categoria_hba1c'])
     
     count_diabetes = nhanes_master['diabetes_hba1c'].sum()
     total = nhanes_master['diabetes_hba1c'].notna().sum()
@@ -525,21 +262,8 @@ if 'LBXGH' in nhanes_master.columns:
 
 # Diagnóstico de diabetes por glucosa en ayunas
 if 'LBXGLU' in nhanes_master.columns:
-    nhanes_master['diabetes_glucosa'] = (nhanes_master['LBXGLU'] >= 126).astype(float)
-    nhanes_master.loc[nhanes_master['LBXGLU'].isna(), 'diabetes_glucosa'] = np.nan
-    
-    # Categorías de glucosa
-    def clasificar_glucosa(valor):
-        if pd.isna(valor):
-            return np.nan
-        elif valor < 100:
-            return 'Normal'
-        elif valor < 126:
-            return 'Prediabetes'
-        else:
-            return 'Diabetes'
-    
-    nhanes_master['categoria_glucosa'] = nhanes_master['LBXGLU'].apply(clasificar_glucosa)
+    nhanes_master['diabetes_glucosa'] = evaluar_criterio(nhanes_master, CRITERIOS_BINARIOS['diabetes_glucosa'])
+    nhanes_master['categoria_glucosa'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['categoria_glucosa'])
     print(" diabetes_glucosa y categoria_glucosa creadas")
 
 # DIABETES COMBINADA
@@ -571,91 +295,25 @@ print("\n4.4. Variables de colesterol...")
 
 # Colesterol total alto
 if 'LBXTC' in nhanes_master.columns:
-    nhanes_master['colesterol_alto'] = (nhanes_master['LBXTC'] >= 240).astype(float)
-    nhanes_master.loc[nhanes_master['LBXTC'].isna(), 'colesterol_alto'] = np.nan
-    
-    # Categorías de colesterol total
-    def clasificar_colesterol_total(valor):
-        if pd.isna(valor):
-            return np.nan
-        elif valor < 200:
-            return 'Deseable'
-        elif valor < 240:
-            return 'Límite alto'
-        else:
-            return 'Alto'
-    
-    nhanes_master['categoria_colesterol'] = nhanes_master['LBXTC'].apply(clasificar_colesterol_total)
+    nhanes_master['colesterol_alto'] = evaluar_criterio(nhanes_master, CRITERIOS_BINARIOS['colesterol_alto'])
+    nhanes_master['categoria_colesterol'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['categoria_colesterol'])
     
     count_col_alto = nhanes_master['colesterol_alto'].sum()
     total = nhanes_master['colesterol_alto'].notna().sum()
     print(f"  ✓ colesterol_alto: {count_col_alto:.0f} casos de {total:,} ({count_col_alto/total*100:.1f}%)")
 
-# HDL bajo (riesgo cardiovascular)
+# HDL bajo (riesgo cardiovascular), cortes por sexo
 if 'LBDHDD' in nhanes_master.columns:
-    def clasificar_hdl(row):
-        hdl = row.get('LBDHDD')
-        sexo = row.get('RIAGENDR')
-        
-        if pd.isna(hdl):
-            return np.nan
-        
-        # Criterios por sexo
-        if sexo == 'Hombre':
-            if hdl < 40:
-                return 'Bajo (riesgo)'
-            elif hdl < 60:
-                return 'Normal'
-            else:
-                return 'Alto (protector)'
-        elif sexo == 'Mujer':
-            if hdl < 50:
-                return 'Bajo (riesgo)'
-            elif hdl < 60:
-                return 'Normal'
-            else:
-                return 'Alto (protector)'
-        else:
-            return np.nan
-    
-    nhanes_master['categoria_hdl'] = nhanes_master.apply(clasificar_hdl, axis=1)
-    
-    # HDL bajo binario
-    nhanes_master['hdl_bajo'] = 0
-    nhanes_master.loc[
-        ((nhanes_master['RIAGENDR'] == 'Hombre') & (nhanes_master['LBDHDD'] < 40)) |
-        ((nhanes_master['RIAGENDR'] == 'Mujer') & (nhanes_master['LBDHDD'] < 50)),
-        'hdl_bajo'
-    ] = 1
-    nhanes_master.loc[nhanes_master['LBDHDD'].isna(), 'hdl_bajo'] = np.nan
-    
+    nhanes_master['categoria_hdl'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['categoria_hdl'])
+    nhanes_master['hdl_bajo'] = evaluar_criterio(nhanes_master, CRITERIOS_BINARIOS['hdl_bajo'])
     print("  ✓ categoria_hdl y hdl_bajo creadas")
 
 # Triglicéridos altos
-if 'LBXTR' in nhanes_master.columns:
-    var_trig = 'LBXTR'
-elif 'LBDTRSI' in nhanes_master.columns:
-    var_trig = 'LBDTRSI'
-else:
-    var_trig = None
+var_trig = variable_regla(nhanes_master, CRITERIOS_BINARIOS['trigliceridos_altos'])
 
 if var_trig:
-    nhanes_master['trigliceridos_altos'] = (nhanes_master[var_trig] >= 150).astype(float)
-    nhanes_master.loc[nhanes_master[var_trig].isna(), 'trigliceridos_altos'] = np.nan
-    
-    def clasificar_trigliceridos(valor):
-        if pd.isna(valor):
-            return np.nan
-        elif valor < 150:
-            return 'Normal'
-        elif valor < 200:
-            return 'Límite alto'
-        elif valor < 500:
-            return 'Alto'
-        else:
-            return 'Muy alto'
-    
-    nhanes_master['categoria_trigliceridos'] = nhanes_master[var_trig].apply(clasificar_trigliceridos)
+    nhanes_master['trigliceridos_altos'] = evaluar_criterio(nhanes_master, CRITERIOS_BINARIOS['trigliceridos_altos'])
+    nhanes_master['categoria_trigliceridos'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['categoria_trigliceridos'])
     print("trigliceridos_altos y categoria_trigliceridos creadas")
 
 # LDL calculado
@@ -671,22 +329,7 @@ if 'LBXTC' in nhanes_master.columns and 'LBDHDD' in nhanes_master.columns and va
         (nhanes_master.loc[mask_valido, var_trig] / 5)
     )
     
-    # Categoría LDL
-    def clasificar_ldl(valor):
-        if pd.isna(valor):
-            return np.nan
-        elif valor < 100:
-            return 'Óptimo'
-        elif valor < 130:
-            return 'Cerca del óptimo'
-        elif valor < 160:
-            return 'Límite alto'
-        elif valor < 190:
-            return 'Alto'
-        else:
-            return 'Muy alto'
-    
-    nhanes_master['categoria_ldl'] = nhanes_master['LBDLDL_calc'].apply(clasificar_ldl)
+    nhanes_master['categoria_ldl'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['categoria_ldl'])
     
     count_ldl = nhanes_master['LBDLDL_calc'].notna().sum()
     print(f"LBDLDL_calc (LDL calculado): {count_ldl:,} valores")
@@ -703,37 +346,15 @@ print("\n4.5. Síndrome metabólico...")
 # 4. Presión arterial ≥130/85 (no tenemos datos de presión)
 # 5. Glucosa en ayunas ≥100 mg/dL
 
-nhanes_master['sm_criterio_cintura'] = 0
-if 'BMXWAIST' in nhanes_master.columns:
-    nhanes_master.loc[
-        ((nhanes_master['RIAGENDR'] == 'Hombre') & (nhanes_master['BMXWAIST'] > 102)) |
-        ((nhanes_master['RIAGENDR'] == 'Mujer') & (nhanes_master['BMXWAIST'] > 88)),
-        'sm_criterio_cintura'
-    ] = 1
-
-nhanes_master['sm_criterio_trigliceridos'] = 0
-if var_trig:
-    nhanes_master.loc[nhanes_master[var_trig] >= 150, 'sm_criterio_trigliceridos'] = 1
+# Criterio sin su variable de origen = no cumplido (0)
+for criterio in CRITERIOS_SINDROME_METABOLICO:
+    if variable_regla(nhanes_master, CRITERIOS_BINARIOS[criterio]):
+        nhanes_master[criterio] = evaluar_criterio(nhanes_master, CRITERIOS_BINARIOS[criterio])
+    else:
+        nhanes_master[criterio] = 0
 
-nhanes_master['sm_criterio_hdl'] = 0
-if 'LBDHDD' in nhanes_master.columns:
-    nhanes_master.loc[
-        ((nhanes_master['RIAGENDR'] == 'Hombre') & (nhanes_master['LBDHDD'] < 40)) |
-        ((nhanes_master['RIAGENDR'] == 'Mujer') & (nhanes_master['LBDHDD'] < 50)),
-        'sm_criterio_hdl'
-    ] = 1
-
-nhanes_master['sm_criterio_glucosa'] = 0
-if 'LBXGLU' in nhanes_master.columns:
-    nhanes_master.loc[nhanes_master['LBXGLU'] >= 100, 'sm_criterio_glucosa'] = 1
-
-# Score de síndrome metabólico (0-4, sin presión arterial)
-nhanes_master['sm_score'] = (
-    nhanes_master['sm_criterio_cintura'] +
-    nhanes_master['sm_criterio_trigliceridos'] +
-    nhanes_master['sm_criterio_hdl'] +
-    nhanes_master['sm_criterio_glucosa']
-)
+# Score de síndrome metabólico (0-4, sin presión arterial) desde la máscara de criterios
+nhanes_master['sm_score'] = contar_bits(mascara_criterios(nhanes_master))
 
 # Síndrome metabólico probable (≥3 criterios de 4 disponibles)
 nhanes_master['sindrome_metabolico'] = (nhanes_master['sm_score'] >= 3).astype(int)
@@ -747,58 +368,10 @@ print(f"  ✓ sindrome_metabolico: {count_sm:,} casos de {total_sm:,} ({count_sm
 # ----------------------------------------
 print("\n4.6. Riesgo cardiovascular combinado...")
 
-def calcular_riesgo_cv(row):
-    """
-    Score de riesgo cardiovascular (0-10)
-    """
-    score = 0
-    
-    # Edad (0-2 puntos)
-    edad = row.get('RIDAGEYR')
-    if pd.notna(edad):
-        if edad >= 65:
-            score += 2
-        elif edad >= 45:
-            score += 1
-    
-    # Diabetes (3 puntos)
-    if row.get('tiene_diabetes') == 1:
-        score += 3
-    
-    # Colesterol alto (2 puntos)
-    if row.get('colesterol_alto') == 1:
-        score += 2
-    
-    # HDL bajo (1 punto)
-    if row.get('hdl_bajo') == 1:
-        score += 1
-    
-    # Obesidad (1 punto)
-    if row.get('categoria_imc') == 'Obesidad':
-        score += 1
-    
-    # Síndrome metabólico (1 punto adicional)
-    if row.get('sindrome_metabolico') == 1:
-        score += 1
-    
-    return score
-
-nhanes_master['riesgo_cardiovascular'] = nhanes_master.apply(calcular_riesgo_cv, axis=1)
-
-# Categoría de riesgo CV
-def clasificar_riesgo_cv(score):
-    if pd.isna(score):
-        return np.nan
-    elif score <= 2:
-        return 'Bajo'
-    elif score <= 5:
-        return 'Moderado'
-    elif score <= 7:
-        return 'Alto'
-    else:
-        return 'Muy alto'
-
-nhanes_master['categoria_riesgo_cv'] = nhanes_master['riesgo_cardiovascular'].apply(clasificar_riesgo_cv)
+# Score de riesgo cardiovascular (0-10): edad ≥45 (+1) y ≥65 (+1), diabetes (+3),
+# colesterol alto (+2), HDL bajo (+1), obesidad (+1), síndrome metabólico (+1)
+nhanes_master['riesgo_cardiovascular'] = calcular_puntaje(nhanes_master, PUNTOS_RIESGO_CV)
+nhanes_master['categoria_riesgo_cv'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['categoria_riesgo_cv'])
 
 print("  ✓ riesgo_cardiovascular y categoria_riesgo_cv creadas")
 
@@ -838,17 +411,7 @@ if 'promedio_tsugr' in nhanes_master.columns and 'promedio_tkcal' in nhanes_mast
         (nhanes_master['promedio_tsugr'] * 4) / nhanes_master['promedio_tkcal']
     ) * 100
     
-    def clasificar_azucar(pct):
-        if pd.isna(pct):
-            return np.nan
-        elif pct < 10:
-            return 'Bajo'
-        elif pct < 20:
-            return 'Moderado'
-        else:
-            return 'Alto'
-    
-    nhanes_master['categoria_azucar'] = nhanes_master['pct_calorias_azucar'].apply(clasificar_azucar)
+    nhanes_master['categoria_azucar'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['categoria_azucar'])
     print("  ✓ pct_calorias_azucar creada")
 
 # Ratio grasa saturada/grasa total
@@ -860,17 +423,7 @@ if 'promedio_tsfat' in nhanes_master.columns and 'promedio_ttfat' in nhanes_mast
 
 # Categoría de fibra (importante para diabetes)
 if 'promedio_tfibe' in nhanes_master.columns:
-    def clasificar_fibra(valor):
-        if pd.isna(valor):
-            return np.nan
-        elif valor < 15:
-            return 'Bajo'
-        elif valor < 25:
-            return 'Adecuado'
-        else:
-            return 'Alto'
-    
-    nhanes_master['categoria_fibra'] = nhanes_master['promedio_tfibe'].apply(clasificar_fibra)
+    nhanes_master['categoria_fibra'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['categoria_fibra'])
     print("  ✓ categoria_fibra creada")
 
 # ----------------------------------------
@@ -880,25 +433,7 @@ print("\n4.8. Variables comparables con BRFSS...")
 
 # Grupo de edad compatible con BRFSS
 if 'RIDAGEYR' in nhanes_master.columns:
-    def grupo_edad_brfss(edad):
-        if pd.isna(edad):
-            return np.nan
-        elif edad < 18:
-            return '<18'
-        elif edad < 25:
-            return '18-24'
-        elif edad < 35:
-            return '25-34'
-        elif edad < 45:
-            return '35-44'
-        elif edad < 55:
-            return '45-54'
-        elif edad < 65:
-            return '55-64'
-        else:
-            return '65+'
-    
-    nhanes_master['edad_grupo_brfss'] = nhanes_master['RIDAGEYR'].apply(grupo_edad_brfss)
+    nhanes_master['edad_grupo_brfss'] = aplicar_categoria(nhanes_master, REGLAS_CATEGORIAS['edad_grupo_brfss'])
     print("  ✓ edad_grupo_brfss creada")
 
 # ========================================
@@ -908,21 +443,53 @@ print(f"\n{'='*70}")
 print("PASO 5: GUARDANDO TABLAS EN BASE DE DATOS")
 print("="*70)
 
-# Guardar tabla maestra
+# Tipos compactos en memoria (float32, enteros chicos, category); el reporte
+# permite guardar con los tipos originales, sin cambiar los valores en la base
+nhanes_master, reporte_tipos = optimizar_tipos(nhanes_master, excluir=['SEQN'])
+print("Memoria de la tabla maestra:")
+imprimir_reporte_memoria(reporte_tipos, "NHANES_MASTER")
+
+# Guardar tabla maestra: solo se reemplazan las particiones (ciclos) procesadas.
+# Los tipos originales se restauran de a un ciclo, justo antes de escribirlo,
+# para no tener en memoria una copia completa de la maestra
+maestra_ok = False
 try:
-    nhanes_master.to_sql("NHANES_MASTER", conn, if_exists="replace", index=False)
-    print(f"✓ NHANES_MASTER guardada: {nhanes_master.shape[0]:,} filas × {nhanes_master.shape[1]} columnas")
+    particiones = []
+    for particion in pd.unique(nhanes_master['ciclo']):
+        parte = restaurar_tipos(nhanes_master[nhanes_master['ciclo'] == particion], reporte_tipos)
+        particiones += guardar_particion(conn, parte, "NHANES_MASTER", 'ciclo')
+        del parte
+    maestra_ok = True
+    print(f"✓ NHANES_MASTER guardada: {nhanes_master.shape[0]:,} filas × {nhanes_master.shape[1]} columnas "
+          f"(ciclos actualizados: {', '.join(particiones)})")
 except Exception as e:
     print(f"✗ Error guardando NHANES_MASTER: {e}")
 
-# Guardar tablas individuales limpias
-print("\nGuardando tablas individuales limpias...")
-for tabla, df in nhanes_clean.items():
+# Guardar tablas individuales limpias (copias completas o vistas + delta).
+# Las vistas leen la NHANES_MASTER de la base: si no se pudo guardar, quedarían
+# con valores de otra corrida (o NULL), así que se guardan copias completas.
+como_vistas = LIMPIO_COMO_VISTAS and maestra_ok
+if LIMPIO_COMO_VISTAS and not maestra_ok:
+    print("⚠ NHANES_MASTER no se guardó: las tablas limpias se guardan como copias completas")
+modo = "vistas sobre NHANES_MASTER" if como_vistas else "copias completas"
+print(f"\nGuardando tablas individuales limpias ({modo})...")
+for tabla in nhanes_clean:
+    nombre = f"{tabla}_LIMPIO"
     try:
-        df.to_sql(f"{tabla}_LIMPIO", conn, if_exists="replace", index=False)
-        print(f"  ✓ {tabla}_LIMPIO: {df.shape[0]:,} filas × {df.shape[1]} columnas")
+        df = tabla_limpia(tabla)
+        if como_vistas:
+            base, ciclo = separar_nombre(tabla)
+            n_maestra, n_delta = guardar_como_vista(conn, nombre, df, nhanes_master, base, ciclo,
+                                                      tipos=reporte_tipos)
+            print(f"  ✓ {nombre}: {df.shape[0]:,} filas × {df.shape[1]} columnas "
+                  f"({n_maestra} desde la maestra, {n_delta} en {nombre}{SUFIJO_DELTA})")
+        else:
+            eliminar_tabla_o_vista(conn, nombre)
+            eliminar_tabla_o_vista(conn, f"{nombre}{SUFIJO_DELTA}")
+            df.to_sql(nombre, conn, if_exists="replace", index=False)
+            print(f"  ✓ {nombre}: {df.shape[0]:,} filas × {df.shape[1]} columnas")
     except Exception as e:
-        print(f"  ✗ Error en {tabla}_LIMPIO: {e}")
+        print(f"  ✗ Error en {nombre}: {e}")
 
 # ========================================
 # 6. CREAR ÍNDICES PARA OPTIMIZAR CONSULTAS
@@ -974,7 +541,7 @@ if 'tiene_diabetes' in nhanes_master.columns:
             ('Total', 'count'),
             ('Con_Diabetes', 'sum'),
             ('Prevalencia_%', lambda x: (x.sum() / x.count() * 100))
-        ]).round(2)
+        ]).astype({'Prevalencia_%': 'float64'}).round(2)
         print(diabetes_edad)
     
     # Por categoría IMC
@@ -984,7 +551,7 @@ if 'tiene_diabetes' in nhanes_master.columns:
             ('Total', 'count'),
             ('Con_Diabetes', 'sum'),
             ('Prevalencia_%', lambda x: (x.sum() / x.count() * 100))
-        ]).round(2)
+        ]).astype({'Prevalencia_%': 'float64'}).round(2)
         print(diabetes_imc)
     
     # Por nivel de ingresos
@@ -994,7 +561,7 @@ if 'tiene_diabetes' in nhanes_master.columns:
             ('Total', 'count'),
             ('Con_Diabetes', 'sum'),
             ('Prevalencia_%', lambda x: (x.sum() / x.count() * 100))
-        ]).round(2)
+        ]).astype({'Prevalencia_%': 'float64'}).round(2)
         print(diabetes_ingreso)
 
 # Reporte de colesterol
@@ -1016,6 +583,55 @@ if 'colesterol_alto' in nhanes_master.columns:
         dist_col = nhanes_master['categoria_colesterol'].value_counts()
         print(dist_col)
 
+# Estimaciones ponderadas con el diseño NHANES (WTMEC2YR, SDMVSTRA, SDMVPSU)
+if all(c in nhanes_master.columns for c in (PESO_NHANES, ESTRATO_NHANES, PSU_NHANES)):
+    print("\n REPORTE: ESTIMACIONES PONDERADAS (DISEÑO MUESTRAL)")
+    print("-" * 50)
+    
+    # Se estima sobre NHANES_MASTER guardada (todos sus ciclos, no solo los
+    # procesados en esta corrida), porque la tabla de estimaciones se reemplaza
+    columnas_ponderadas = (
+        [PESO_NHANES, ESTRATO_NHANES, PSU_NHANES, 'ciclo'] + list(INDICADORES_NHANES)
+        + [d for conjunto in DOMINIOS_NHANES for d in conjunto]
+    )
+    try:
+        master_ponderada = leer_columnas(conn, "NHANES_MASTER", columnas_ponderadas)
+    except Exception as e:
+        print(f"⚠ No se pudo leer NHANES_MASTER ({e}): se estima solo con los ciclos procesados")
+        master_ponderada = nhanes_master[[c for c in dict.fromkeys(columnas_ponderadas) if c in nhanes_master.columns]]
+    ciclos_master = sorted(master_ponderada['ciclo'].dropna().unique().tolist())
+    
+    if len(ciclos_master) > 1:
+        # Varios ciclos de 2 años: peso combinado y una serie de estimaciones por ciclo (tendencia)
+        master_ponderada = master_ponderada.assign(
+            WTMEC_COMBINADO=peso_combinado(master_ponderada, PESO_NHANES, ciclos_master)
+        )
+        estimaciones_nhanes = estimar_indicadores(
+            master_ponderada, conjuntos=DOMINIOS_NHANES + [['ciclo']], peso='WTMEC_COMBINADO'
+        )
+    else:
+        estimaciones_nhanes = estimar_indicadores(master_ponderada)
+    print(f"Ciclos en NHANES_MASTER: {', '.join(ciclos_master)}")
+    print(f"Estimaciones calculadas: {len(estimaciones_nhanes):,} "
+          f"({estimaciones_nhanes['indicador'].nunique()} indicadores × {estimaciones_nhanes['dominio'].nunique()} series de dominios)")
+    
+    for indicador in ['tiene_diabetes', 'colesterol_alto']:
+        general = consultar_indicador(estimaciones_nhanes, indicador, [])
+        if general.empty:
+            continue
+        fila = general.iloc[0]
+        print(f"\n{indicador} ponderado: {fila['estimacion']:.2f}% "
+              f"(EE {fila['ee']:.2f}, IC 95% {fila['ic95_inf']:.2f}-{fila['ic95_sup']:.2f})")
+        for dimension in ['grupo_edad', 'categoria_imc', 'categoria_ingreso']:
+            tabla = consultar_indicador(estimaciones_nhanes, indicador, [dimension])
+            if len(tabla):
+                print(tabla.set_index(dimension)[['n_muestra', 'estimacion', 'ee', 'ic95_inf', 'ic95_sup']].round(2))
+    
+    guardar_ponderadas(conn, estimaciones_nhanes, TABLA_ESTIMACIONES_NHANES)
+    print(f"\n✓ {TABLA_ESTIMACIONES_NHANES} guardada")
+else:
+    print("\n⚠ Variables de diseño (WTMEC2YR, SDMVSTRA, SDMVPSU) no disponibles: se omiten estimaciones ponderadas")
+
 # Reporte de síndrome metabólico
 if 'sindrome_metabolico' in nhanes_master.columns:
     print("\n REPORTE: SÍNDROME METABÓLICO")
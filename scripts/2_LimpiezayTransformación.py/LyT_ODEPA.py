@@ -1,9 +1,35 @@
 import pandas as pd
 import sqlite3
 import numpy as np
+import os
+import sys
+
+# Paquete compartido scripts/utilidades
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utilidades.cuantiles import SketchKLL, guardar_sketch, comparar_con_exacto
+from utilidades.validacion_rangos import RANGOS_VALIDOS, validar_rangos
+from utilidades.normalizacion_odepa import (
+    COLUMNAS_PRECIO_ODEPA, COLUMNAS_TEXTO_ODEPA, UNIDADES_ODEPA, normalizar_precio, normalizar_texto
+)
+from utilidades.particiones_odepa import (
+    TABLA_PARTICIONES_ODEPA, TABLA_PARCIALES_ODEPA, procesar_odepa_incremental
+)
+
+# Modo incremental: historial multi-año particionado por año/semana; solo se
+# limpian las semanas nuevas o cambiadas y lo global se actualiza desde
+# agregados parciales y sketches por partición
+MODO_INCREMENTAL = os.environ.get("ODEPA_INCREMENTAL", "0") == "1"
 
 conn = sqlite3.connect("pipeline.db")
 
+if MODO_INCREMENTAL:
+    procesar_odepa_incremental(conn)
+    conn.close()
+    print("\n" + "=" * 80)
+    print("LIMPIEZA ODEPA COMPLETADA (INCREMENTAL)")
+    print("=" * 80)
+    sys.exit(0)
+
 # ----------------------------------------------------------------------------
 # Cargar datos
 # ----------------------------------------------------------------------------
@@ -32,7 +58,7 @@ print(df.head())
 
 print("\n3. Limpieza de Columnas de Precios")
 
-columnas_precio = ['Precio minimo', 'Precio maximo', 'Precio promedio']
+columnas_precio = COLUMNAS_PRECIO_ODEPA
 
 for col in columnas_precio:
     if col in df.columns:
@@ -42,20 +68,9 @@ for col in columnas_precio:
         print(f"  Tipo original: {df[col].dtype}")
         print(f"  Ejemplo de valores: {df[col].head(3).tolist()}")
         
-        # Convertir a string primero
-        df[col] = df[col].astype(str)
-        
-        # Reemplazar coma por punto (formato decimal chileno)
-        df[col] = df[col].str.replace(',', '.', regex=False)
-        
-        # Eliminar espacios en blanco
-        df[col] = df[col].str.strip()
-        
-        # Eliminar valores no numéricos como 'nan', 'None', etc.
-        df[col] = df[col].replace(['nan', 'None', ''], np.nan)
-        
-        # Convertir a float
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+        # Coma decimal → float en una pasada sobre los valores distintos
+        # ('nan', 'None' y vacíos quedan como NaN)
+        df[col] = normalizar_precio(df[col])
         
         # Estadísticas
         valid_count = df[col].notna().sum()
@@ -118,17 +133,12 @@ odepa_precios = odepa_precios.merge(grupos, on='Producto', how='left')
 
 print("\n5. Normalización de Texto")
 
-columnas_texto = ['Region', 'Sector', 'Tipo de punto monitoreo', 'Grupo', 'Producto', 'Unidad']
+columnas_texto = COLUMNAS_TEXTO_ODEPA
 
 for col in columnas_texto:
     if col in df.columns:
-        # Convertir a string y normalizar
-        df[col] = df[col].astype(str)
-        df[col] = df[col].str.strip()
-        
-        # No cambiar a Title case para mantener formato original
-        # Solo limpiar espacios extra
-        df[col] = df[col].str.replace(r'\s+', ' ', regex=True)
+        # Limpiar espacios (sin cambiar a Title case) sobre los valores distintos
+        df[col] = normalizar_texto(df[col])
         
         valores_unicos = df[col].nunique()
         print(f"  {col}: {valores_unicos:,} valores únicos")
@@ -149,11 +159,10 @@ if 'Precio promedio' in df.columns:
     if eliminados > 0:
         print(f"  Registros sin precio promedio: {eliminados:,} eliminados")
 
-# Eliminar precios negativos o cero
+# Eliminar precios negativos o cero (rango del registro: Precio promedio > 0)
 if 'Precio promedio' in df.columns:
-    antes = len(df)
-    df = df[df['Precio promedio'] > 0]
-    eliminados = antes - len(df)
+    df, violaciones = validar_rangos(df, RANGOS_VALIDOS, tabla='ODEPA', accion='eliminar', variables=['Precio promedio'])
+    eliminados = int(violaciones['n_fuera_rango'].sum())
     if eliminados > 0:
         print(f"  Registros con precio <= 0: {eliminados:,} eliminados")
 
@@ -229,6 +238,12 @@ if 'Precio promedio' in df.columns:
     print(f"Outliers detectados: {n_outliers:,} ({pct_outliers:.2f}%)")
     print(f"Rango normal (Q1-3*IQR, Q3+3*IQR): ${lower_bound:.0f} - ${upper_bound:.0f}")
     
+    # Sketch KLL (fusionable) para actualizar los límites al agregar datos nuevos
+    sketch_precio = SketchKLL().actualizar(df['Precio promedio'].to_numpy())
+    guardar_sketch(conn, 'ODEPA_PRECIO_PROMEDIO', sketch_precio)
+    print("Cuantiles exactos vs sketch KLL:")
+    print(comparar_con_exacto(sketch_precio, df['Precio promedio']).round(2).to_string(index=False))
+    
     if n_outliers > 0:
         print("\nProductos con outliers más frecuentes:")
         outliers_por_producto = df[df['es_outlier'] == 1].groupby('Producto').size().sort_values(ascending=False).head(10)
@@ -264,18 +279,7 @@ if 'Unidad' in df.columns:
     print(unidades_unicas)
     
     # Normalizar unidades comunes
-    unidad_map = {
-        '$/kilo': 'CLP/kg',
-        '$/kilogramo': 'CLP/kg',
-        '$/kg': 'CLP/kg',
-        '$/litro': 'CLP/L',
-        '$/lt': 'CLP/L',
-        '$/unidad': 'CLP/unidad',
-        '$/un': 'CLP/unidad',
-        '$/docena': 'CLP/docena'
-    }
-    
-    df['Unidad_normalizada'] = df['Unidad'].replace(unidad_map)
+    df['Unidad_normalizada'] = df['Unidad'].replace(UNIDADES_ODEPA)
     print("\nUnidades después de normalización:")
     print(df['Unidad_normalizada'].value_counts())
 
@@ -392,6 +396,11 @@ print("\n16. Guardando Tabla Limpia")
 df.to_sql("ODEPA_PRECIOS_CLEAN", conn, if_exists="replace", index=False)
 print("Tabla ODEPA_PRECIOS_CLEAN creada exitosamente")
 
+# La tabla completa reemplaza a la particionada: el registro de particiones y
+# los agregados parciales del modo incremental ya no corresponden
+for tabla in [TABLA_PARTICIONES_ODEPA, TABLA_PARCIALES_ODEPA]:
+    conn.execute(f'DROP TABLE IF EXISTS "{tabla}"')
+
 # Crear también una vista con solo datos recientes (último año)
 if 'Anio' in df.columns:
     año_max = df['Anio'].max()
@@ -1,6 +1,25 @@
 import pandas as pd
 import sqlite3
-import numpy as np
+import os
+import sys
+
+# Paquete compartido scripts/utilidades
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utilidades.matriz_nutrientes import MatrizNutrientes, resumen_matriz
+from utilidades.nutrientes_fdc import (
+    TABLA_NUTRIENTES_FDC, VERSION_NUTRIENTES_FDC, registrar_hashes, artefacto_vigente,
+    construir_nutrientes_fdc, cargar_nutrientes_fdc, cargar_matriz_fdc
+)
+from utilidades.limpieza_fdc import limpiar_food_nutrient_por_bloques, eliminar_columnas_vacias
+from utilidades.integridad_referencial import RELACIONES_FDC, eliminar_huerfanos, validar_relaciones
+from utilidades.carga import leer_por_bloques, columnas_tabla
+from utilidades.busqueda_fdc import TABLA_BUSQUEDA_FDC, construir_indice_busqueda
+from utilidades.porciones_fdc import TABLA_PORCIONES_FDC, expandir_porciones, guardar_indexada
+
+# Modo por bloques: memoria acotada para Branded Foods (millones de registros
+# en FDC_FOOD_NUTRIENT). La tabla se limpia bloque a bloque y no se carga entera
+MODO_BLOQUES = os.environ.get("FDC_MODO_BLOQUES", "0") == "1"
+TAMANO_BLOQUE = int(os.environ.get("FDC_TAMANO_BLOQUE", "500000"))
 
 conn = sqlite3.connect("pipeline.db")
 
@@ -81,37 +100,44 @@ df_nutrient_clean.to_sql("FDC_NUTRIENT_CLEAN", conn, if_exists="replace", index=
 print("\n4. Limpieza FDC_FOOD_NUTRIENT")
 print("-" * 80)
 
-df_food_nutrient = pd.read_sql("SELECT * FROM FDC_FOOD_NUTRIENT", conn)
-print(f"Dimensiones originales: {df_food_nutrient.shape[0]:,} filas x {df_food_nutrient.shape[1]} columnas")
+if MODO_BLOQUES:
+    print(f"Modo por bloques: {TAMANO_BLOQUE:,} registros por bloque")
+    n_original, _ = limpiar_food_nutrient_por_bloques(
+        conn, "FDC_FOOD_NUTRIENT", "FDC_FOOD_NUTRIENT_CLEAN", TAMANO_BLOQUE
+    )
+    print(f"Dimensiones originales: {n_original:,} filas")
+else:
+    df_food_nutrient = pd.read_sql("SELECT * FROM FDC_FOOD_NUTRIENT", conn)
+    n_original = df_food_nutrient.shape[0]
+    print(f"Dimensiones originales: {df_food_nutrient.shape[0]:,} filas x {df_food_nutrient.shape[1]} columnas")
 
-# Eliminar registros sin amount
-df_fn_clean = df_food_nutrient[df_food_nutrient['amount'].notna()].copy()
+    # Eliminar registros sin amount
+    df_fn_clean = df_food_nutrient[df_food_nutrient['amount'].notna()].copy()
 
-# Convertir amount a numérico
-df_fn_clean['amount'] = pd.to_numeric(df_fn_clean['amount'], errors='coerce')
+    # Convertir amount a numérico
+    df_fn_clean['amount'] = pd.to_numeric(df_fn_clean['amount'], errors='coerce')
 
-# Eliminar valores negativos
-df_fn_clean = df_fn_clean[df_fn_clean['amount'] >= 0]
+    # Eliminar valores negativos
+    df_fn_clean = df_fn_clean[df_fn_clean['amount'] >= 0]
 
-# Verificar que fdc_id y nutrient_id existan en tablas relacionadas
-valid_fdc_ids = set(df_food_clean['fdc_id'])
-valid_nutrient_ids = set(df_nutrient_clean['id'])
+    # Eliminar duplicados (mismo alimento, mismo nutriente)
+    df_fn_clean = df_fn_clean.drop_duplicates(subset=['fdc_id', 'nutrient_id'], keep='first')
 
-df_fn_clean = df_fn_clean[
-    df_fn_clean['fdc_id'].isin(valid_fdc_ids) & 
-    df_fn_clean['nutrient_id'].isin(valid_nutrient_ids)
-]
+    df_fn_clean.to_sql("FDC_FOOD_NUTRIENT_CLEAN", conn, if_exists="replace", index=False)
+    del df_food_nutrient, df_fn_clean
 
-# Eliminar duplicados (mismo alimento, mismo nutriente)
-df_fn_clean = df_fn_clean.drop_duplicates(subset=['fdc_id', 'nutrient_id'], keep='first')
+# Verificar que fdc_id y nutrient_id existan en tablas relacionadas (anti-join en SQLite)
+for columna, padre, columna_padre in [('fdc_id', 'FDC_FOOD_CLEAN', 'fdc_id'),
+                                      ('nutrient_id', 'FDC_NUTRIENT_CLEAN', 'id')]:
+    eliminar_huerfanos(conn, "FDC_FOOD_NUTRIENT_CLEAN", columna, padre, columna_padre)
 
 # Eliminar columnas vacías
-df_fn_clean = df_fn_clean.dropna(axis=1, how='all')
-
-print(f"Dimensiones finales: {df_fn_clean.shape[0]:,} filas x {df_fn_clean.shape[1]} columnas")
-print(f"Registros eliminados: {df_food_nutrient.shape[0] - df_fn_clean.shape[0]:,}")
+eliminar_columnas_vacias(conn, "FDC_FOOD_NUTRIENT_CLEAN")
 
-df_fn_clean.to_sql("FDC_FOOD_NUTRIENT_CLEAN", conn, if_exists="replace", index=False)
+n_final = cursor.execute("SELECT COUNT(*) FROM FDC_FOOD_NUTRIENT_CLEAN").fetchone()[0]
+n_columnas = len(columnas_tabla(conn, "FDC_FOOD_NUTRIENT_CLEAN"))
+print(f"Dimensiones finales: {n_final:,} filas x {n_columnas} columnas")
+print(f"Registros eliminados: {n_original - n_final:,}")
 
 # ----------------------------------------------------------------------------
 # Limpieza FDC_FOOD_CATEGORY
@@ -158,14 +184,13 @@ df_portion_clean = df_portion[df_portion['gram_weight'].notna()].copy()
 # Eliminar valores negativos o cero
 df_portion_clean = df_portion_clean[df_portion_clean['gram_weight'] > 0]
 
-# Verificar fdc_id válidos
-df_portion_clean = df_portion_clean[df_portion_clean['fdc_id'].isin(valid_fdc_ids)]
+# Guardar tabla limpia en SQLite y verificar fdc_id válidos (anti-join contra FDC_FOOD_CLEAN)
+df_portion_clean.to_sql("FDC_FOOD_PORTION_CLEAN", conn, if_exists="replace", index=False)
+eliminar_huerfanos(conn, "FDC_FOOD_PORTION_CLEAN", "fdc_id", "FDC_FOOD_CLEAN", "fdc_id")
 
 # Eliminar columnas vacías
-df_portion_clean = df_portion_clean.dropna(axis=1, how='all')
-
-# Guardar tabla limpia en SQLite
-df_portion_clean.to_sql("FDC_FOOD_PORTION_CLEAN", conn, if_exists="replace", index=False)
+eliminar_columnas_vacias(conn, "FDC_FOOD_PORTION_CLEAN")
+df_portion_clean = pd.read_sql("SELECT * FROM FDC_FOOD_PORTION_CLEAN", conn)
 
 # Mostrar resumen de limpieza
 print(f"Dimensiones finales: {df_portion_clean.shape[0]:,} filas x {df_portion_clean.shape[1]} columnas")
@@ -176,39 +201,34 @@ print(f"Registros eliminados: {df_portion.shape[0] - df_portion_clean.shape[0]:,
 # TRANSFORMACIÓN DE NUTRIENTES CLAVE (fdc_nutrientes)  
 # ============================================================================  
 
-# Definir nutrientes clave si no lo hiciste antes
-nutrientes_clave = {
-    1003: 'Proteina', 1004: 'Grasa_Total', 1005: 'Carbohidratos', 1079: 'Fibra',
-    1087: 'Calcio', 1089: 'Hierro', 1095: 'Zinc', 1253: 'Colesterol_Dietetico',
-    1258: 'Acidos_Grasos_Saturados', 1292: 'Acidos_Grasos_Monoinsaturados',
-    1293: 'Acidos_Grasos_Poliinsaturados', 2000: 'Azucares_Totales', 1008: 'Energia'
-}
-
-# Filtrado de nutrientes clave usando la tabla limpia
-fn_filtrado = df_fn_clean[df_fn_clean['nutrient_id'].isin(nutrientes_clave.keys())].copy()
-
-# Pivot para tener nutrientes como columnas
-nutrientes_pivot = fn_filtrado.pivot_table(
-    index='fdc_id',
-    columns='nutrient_id',
-    values='amount',
-    aggfunc='first'
-).reset_index()
-
-# Renombrar columnas con nombres legibles
-nutrientes_pivot.columns = ['fdc_id'] + [nutrientes_clave.get(col, f'nutrient_{col}') for col in nutrientes_pivot.columns[1:]]
-
-fdc_nutrientes = df_food_clean[['fdc_id', 'description', 'food_category_id']].merge(
-    nutrientes_pivot, on='fdc_id', how='inner'
-)
-
-
-# Calcular índices nutricionales
-fdc_nutrientes['Carb_Netos'] = fdc_nutrientes['Carbohidratos'] - fdc_nutrientes['Fibra'].fillna(0)
-fdc_nutrientes['Indice_Glicemico_Est'] = fdc_nutrientes['Carb_Netos'] / (fdc_nutrientes['Fibra'].fillna(0.1) + 1)
-fdc_nutrientes['Grasas_Saludables'] = fdc_nutrientes['Acidos_Grasos_Monoinsaturados'].fillna(0) + fdc_nutrientes['Acidos_Grasos_Poliinsaturados'].fillna(0)
-fdc_nutrientes['Ratio_Grasas'] = fdc_nutrientes['Grasas_Saludables'] / (fdc_nutrientes['Acidos_Grasos_Saturados'].fillna(0.1) + 1)
-fdc_nutrientes['Densidad_Fibra'] = (fdc_nutrientes['Fibra'].fillna(0) / fdc_nutrientes['Energia'].replace(0, np.nan)) * 100
+# Artefacto versionado (FDC_NUTRIENTES_CLAVE + matriz): solo se reconstruye si
+# cambió el contenido de FDC_FOOD_CLEAN / FDC_FOOD_NUTRIENT_CLEAN o la versión
+print("\nNutrientes clave FDC")
+registrar_hashes(conn)
+if artefacto_vigente(conn):
+    fdc_nutrientes = cargar_nutrientes_fdc(conn)
+    matriz_nutrientes = cargar_matriz_fdc(conn)
+    print(f"✓ {TABLA_NUTRIENTES_FDC} sin cambios en FDC: se reutiliza ({len(fdc_nutrientes):,} alimentos)")
+else:
+    matriz_nutrientes = MatrizNutrientes.desde_bloques(
+        leer_por_bloques(conn, "FDC_FOOD_NUTRIENT_CLEAN", TAMANO_BLOQUE)
+    )
+    fdc_nutrientes = construir_nutrientes_fdc(conn, matriz_nutrientes, df_food_clean)
+    print(f"✓ {TABLA_NUTRIENTES_FDC} construida: {len(fdc_nutrientes):,} alimentos "
+          f"(versión {VERSION_NUTRIENTES_FDC})")
+print(f"Matriz de nutrientes: {resumen_matriz(matriz_nutrientes)}")
+
+# Nutrientes por porción: nutrientes por 100 g × gram_weight / 100 para cada
+# (alimento, porción) de FDC_FOOD_PORTION_CLEAN, en una tabla indexada
+nutrientes_porcion = expandir_porciones(df_portion_clean, fdc_nutrientes)
+guardar_indexada(conn, nutrientes_porcion, TABLA_PORCIONES_FDC, ['fdc_id', 'portion_id'])
+print(f"✓ {TABLA_PORCIONES_FDC}: {len(nutrientes_porcion):,} porciones de "
+      f"{nutrientes_porcion['fdc_id'].nunique():,} alimentos")
+
+# Búsqueda de texto: índice FTS5 sobre descripción y categoría
+# (uso: buscar_alimentos(conn, "chicken brea") en lugar de LIKE '%...%')
+n_indexados = construir_indice_busqueda(conn)
+print(f"✓ {TABLA_BUSQUEDA_FDC}: {n_indexados:,} alimentos indexados para búsqueda")
 
 
 # ============================================================================  
@@ -217,14 +237,14 @@ fdc_nutrientes['Densidad_Fibra'] = (fdc_nutrientes['Fibra'].fillna(0) / fdc_nutr
 
 print("\n7. Verificación de Integridad Referencial")
 
-# Verificar relaciones entre tablas
-fdc_ids_food = set(df_food_clean['fdc_id'])
-fdc_ids_nutrient = set(df_fn_clean['fdc_id'])
-nutrient_ids_nutrient = set(df_nutrient_clean['id'])
-nutrient_ids_fn = set(df_fn_clean['nutrient_id'])
-
-print(f"IDs comunes FOOD <-> FOOD_NUTRIENT: {len(fdc_ids_food & fdc_ids_nutrient):,}")
-print(f"IDs comunes NUTRIENT <-> FOOD_NUTRIENT: {len(nutrient_ids_nutrient & nutrient_ids_fn):,}")
+# Claves foráneas validadas con anti-joins en SQLite: solo conteos y ejemplos
+integridad = validar_relaciones(conn, RELACIONES_FDC)
+for _, fila in integridad.iterrows():
+    marca = "✓" if fila['n_filas_huerfanas'] == 0 else "⚠"
+    print(f"{marca} {fila['tabla']}.{fila['columna']} -> {fila['referencia']}: "
+          f"{fila['n_claves_comunes']:,} ids comunes, {fila['n_filas_huerfanas']:,} filas huérfanas")
+    if fila['n_filas_huerfanas']:
+        print(f"    {fila['n_claves_huerfanas']:,} claves huérfanas, p. ej.: {fila['ejemplos_huerfanos']}")
 
 
 # ============================================================================  
@@ -1,7 +1,20 @@
 import pandas as pd
 import sqlite3
 import numpy as np
-from rapidfuzz import fuzz, process
+from utilidades.carga import leer_columnas, columnas_tabla
+from utilidades.cubo_prevalencia import leer_cubo
+from utilidades.encuesta import leer_ponderada, leer_indicador
+from utilidades.tipos_compactos import optimizar_tipos, restaurar_tipos, imprimir_reporte_memoria
+from utilidades.perfil_nutricional import clasificar_perfil, puntaje_perfil
+from utilidades.sustitutos_fdc import IndiceSustitutos, K_SUSTITUTOS, guardar_indice, cargar_indice
+from utilidades.particiones_odepa import (
+    TABLA_PARCIALES_ODEPA, TABLA_ODEPA_RECIENTES, leer_parciales_ultimo_anio, combinar_parciales
+)
+from utilidades.emparejamiento import emparejar_productos
+from utilidades.porciones_fdc import TABLA_PORCIONES_FDC, TABLA_COSTO_PORCION, costo_por_porcion, guardar_indexada
+from utilidades.nutrientes_fdc import (
+    TABLA_NUTRIENTES_FDC, VERSION_NUTRIENTES_FDC, cargar_nutrientes_fdc, construir_nutrientes_fdc, firma_artefacto
+)
 
 # CONFIGURACIÓN INICIAL
 conn = sqlite3.connect("pipeline.db")
@@ -9,6 +22,27 @@ print("="*80)
 print("INTEGRACIÓN COMPLETA DE DATASETS - ANÁLISIS DIABETES/COLESTEROL")
 print("="*80)
 
+# Columnas que lee cada etapa (proyección: no se usa SELECT * en tablas anchas)
+COLUMNAS_ODEPA = ['Producto', 'Precio promedio', 'Grupo', 'Unidad_normalizada']
+
+# NHANES_MASTER: comparaciones de la Parte 4 y tabla final de la Parte 5
+COLUMNAS_NHANES_COMPARACION = [
+    'tiene_diabetes', 'edad_grupo_brfss', 'categoria_imc',
+    'categoria_fibra', 'categoria_azucar', 'BMXBMI', 'RIDAGEYR'
+]
+VARS_NHANES_ANALISIS = [
+    'SEQN', 'ciclo', 'RIDAGEYR', 'RIAGENDR', 'RIDRETH3', 'DMDEDUC2', 'INDFMPIR',
+    'BMXBMI', 'BMXWAIST', 'categoria_imc', 'ratio_cintura_cadera',
+    'LBXGH', 'LBXGLU', 'LBXTC', 'LBDHDD', 'LBDLDL_calc',
+    'tiene_diabetes', 'diabetes_hba1c', 'diabetes_glucosa',
+    'colesterol_alto', 'hdl_bajo', 'trigliceridos_altos',
+    'sindrome_metabolico', 'sm_score', 'riesgo_cardiovascular', 'categoria_riesgo_cv',
+    'promedio_tkcal', 'promedio_tcarb', 'promedio_tsugr', 'promedio_tfibe',
+    'promedio_ttfat', 'promedio_tsfat', 'promedio_tchol', 'promedio_tsodi',
+    'pct_calorias_azucar', 'categoria_azucar', 'categoria_fibra',
+    'grupo_edad', 'categoria_ingreso', 'edad_grupo_brfss'
+]
+
 # ============================================================================
 # PARTE 1: CREAR TABLA FDC PIVOTEADA CON NUTRIENTES CLAVE
 # ============================================================================
@@ -16,109 +50,21 @@ print("\n" + "="*80)
 print("PARTE 1: PREPARAR TABLA FDC CON NUTRIENTES CLAVE")
 print("="*80)
 
-# Definir nutrientes críticos para análisis de diabetes/colesterol
-nutrientes_clave = {
-    1003: 'Proteina',
-    1004: 'Grasa_Total',
-    1005: 'Carbohidratos',
-    1079: 'Fibra',
-    1087: 'Calcio',
-    1089: 'Hierro',
-    1095: 'Zinc',
-    1253: 'Colesterol_Dietetico',
-    1258: 'Acidos_Grasos_Saturados',
-    1292: 'Acidos_Grasos_Monoinsaturados',
-    1293: 'Acidos_Grasos_Poliinsaturados',
-    2000: 'Azucares_Totales',
-    1008: 'Energia',
-    1093: 'Sodio'
-}
-
 try:
-    # Cargar tablas limpias de FDC
-    df_food = pd.read_sql("SELECT * FROM FDC_FOOD_CLEAN", conn)
-    df_fn = pd.read_sql("SELECT * FROM FDC_FOOD_NUTRIENT_CLEAN", conn)
-    
-    print(f"✓ FDC_FOOD_CLEAN cargado: {len(df_food):,} alimentos")
-    print(f"✓ FDC_FOOD_NUTRIENT_CLEAN cargado: {len(df_fn):,} registros")
-    
-    # Filtrar solo nutrientes clave
-    df_fn_filtrado = df_fn[df_fn['nutrient_id'].isin(nutrientes_clave.keys())].copy()
-    print(f"✓ Nutrientes clave filtrados: {len(df_fn_filtrado):,} registros")
-    
-    # Pivotar: nutrientes como columnas
-    nutrientes_pivot = df_fn_filtrado.pivot_table(
-        index='fdc_id',
-        columns='nutrient_id',
-        values='amount',
-        aggfunc='first'
-    ).reset_index()
-    
-    # Renombrar columnas con nombres legibles
-    nutrientes_pivot.columns = ['fdc_id'] + [
-        nutrientes_clave.get(col, f'nutrient_{col}') 
-        for col in nutrientes_pivot.columns[1:]
-    ]
-    
-    # Unir con información del alimento
-    fdc_nutrientes = df_food[['fdc_id', 'description', 'food_category_id']].merge(
-        nutrientes_pivot, 
-        on='fdc_id', 
-        how='inner'
-    )
-    
-    # Crear variables derivadas nutricionales
-    print("\nCreando variables derivadas nutricionales...")
-    
-    # Carbohidratos netos (importantes para diabetes)
-    fdc_nutrientes['Carb_Netos'] = (
-        fdc_nutrientes['Carbohidratos'] - fdc_nutrientes['Fibra'].fillna(0)
-    )
-    
-    # Índice glicémico estimado (aproximación)
-    fdc_nutrientes['Indice_Glicemico_Est'] = (
-        fdc_nutrientes['Carb_Netos'] / (fdc_nutrientes['Fibra'].fillna(0.1) + 1)
-    )
-    
-    # Grasas saludables vs saturadas
-    fdc_nutrientes['Grasas_Saludables'] = (
-        fdc_nutrientes['Acidos_Grasos_Monoinsaturados'].fillna(0) + 
-        fdc_nutrientes['Acidos_Grasos_Poliinsaturados'].fillna(0)
-    )
-    
-    fdc_nutrientes['Ratio_Grasas_Saludables'] = (
-        fdc_nutrientes['Grasas_Saludables'] / 
-        (fdc_nutrientes['Acidos_Grasos_Saturados'].fillna(0.1) + 1)
-    )
-    
-    # Densidad de fibra (g fibra / 100 kcal)
-    fdc_nutrientes['Densidad_Fibra'] = (
-        (fdc_nutrientes['Fibra'].fillna(0) / 
-         fdc_nutrientes['Energia'].replace(0, np.nan)) * 100
-    )
-    
-    # Clasificación nutricional básica
-    def clasificar_alimento_salud(row):
-        """Clasificar alimento según perfil nutricional"""
-        # Alto en azúcar
-        if row.get('Azucares_Totales', 0) > 15:
-            return 'Alto_Azucar'
-        # Alto en grasa saturada
-        elif row.get('Acidos_Grasos_Saturados', 0) > 5:
-            return 'Alto_Grasa_Sat'
-        # Alto en sodio
-        elif row.get('Sodio', 0) > 400:
-            return 'Alto_Sodio'
-        # Alto en fibra (saludable)
-        elif row.get('Fibra', 0) > 5:
-            return 'Alto_Fibra'
-        # Perfil balanceado
-        else:
-            return 'Balanceado'
-    
-    fdc_nutrientes['clasificacion_salud'] = fdc_nutrientes.apply(
-        clasificar_alimento_salud, axis=1
-    )
+    # Artefacto de nutrientes clave armado por LyT_OFDC (tabla + matriz, con hash
+    # de FDC_*_CLEAN); solo se reconstruye si FDC cambió desde que se guardó
+    fdc_nutrientes = cargar_nutrientes_fdc(conn)
+    artefacto_sin_cambios = fdc_nutrientes is not None
+    if fdc_nutrientes is None:
+        print("⚠ Artefacto de nutrientes FDC ausente o desactualizado: reconstruyendo...")
+        fdc_nutrientes = construir_nutrientes_fdc(conn)
+    print(f"✓ {TABLA_NUTRIENTES_FDC} cargado: {len(fdc_nutrientes):,} alimentos "
+          f"(versión {VERSION_NUTRIENTES_FDC})")
+    
+    # Clasificación nutricional básica (reglas por prioridad, vectorizada) y
+    # puntaje ponderado del perfil (% valor diario, ver utilidades/perfil_nutricional.py)
+    fdc_nutrientes['clasificacion_salud'] = clasificar_perfil(fdc_nutrientes)
+    fdc_nutrientes['puntaje_perfil'] = puntaje_perfil(fdc_nutrientes)
     
     # Guardar tabla integrada FDC
     fdc_nutrientes.to_sql("FDC_NUTRIENTES_INTEGRADO", conn, if_exists="replace", index=False)
@@ -128,6 +74,27 @@ try:
     print("\n Distribución por clasificación de salud:")
     print(fdc_nutrientes['clasificacion_salud'].value_counts())
     
+    # Índice de sustitutos saludables (KD-tree por categoría sobre macros
+    # estandarizados); consultas en lote con IndiceSustitutos.buscar(fdc_ids, k).
+    # Si el artefacto FDC no cambió se carga el índice guardado con su firma
+    firma_fdc = firma_artefacto(conn)
+    indice_sustitutos = (cargar_indice(conn, "FDC_NUTRIENTES_INTEGRADO", firma_fdc)
+                         if artefacto_sin_cambios else None)
+    if indice_sustitutos is None:
+        indice_sustitutos = IndiceSustitutos.construir(fdc_nutrientes)
+        guardar_indice(conn, "FDC_NUTRIENTES_INTEGRADO", indice_sustitutos, firma_fdc)
+        origen_indice = "construido"
+    else:
+        origen_indice = "cargado (FDC sin cambios)"
+    print(f"\n✓ Índice de sustitutos {origen_indice}: {indice_sustitutos.n_alimentos:,} alimentos "
+          f"en {len(indice_sustitutos.arboles)} categorías")
+    altos = fdc_nutrientes.loc[
+        fdc_nutrientes['clasificacion_salud'].isin(['Alto_Azucar', 'Alto_Grasa_Sat']), 'fdc_id'
+    ]
+    sustitutos = indice_sustitutos.buscar(altos, k=K_SUSTITUTOS)
+    print(f"   Sustitutos para alimentos altos en azúcar/grasa saturada: "
+          f"{sustitutos['fdc_id'].nunique():,} de {len(altos):,} con al menos uno")
+    
 except Exception as e:
     print(f" Error en preparación FDC: {e}")
     fdc_nutrientes = None
@@ -140,22 +107,33 @@ print("PARTE 2: PREPARAR TABLA ODEPA AGREGADA")
 print("="*80)
 
 try:
-    df_odepa = pd.read_sql("SELECT * FROM ODEPA_PRECIOS_CLEAN", conn)
-    print(f"✓ ODEPA_PRECIOS_CLEAN cargado: {len(df_odepa):,} registros")
-    
-    # Agregar por producto (promedio de todos los precios)
-    odepa_agregado = df_odepa.groupby('Producto').agg({
-        'Precio promedio': ['mean', 'min', 'max', 'std', 'count'],
-        'Grupo': 'first',
-        'Unidad_normalizada': 'first'
-    }).reset_index()
-    
-    # Aplanar columnas multi-nivel
-    odepa_agregado.columns = [
-        'Producto', 'Precio_Promedio_CLP', 'Precio_Min_CLP', 
-        'Precio_Max_CLP', 'Precio_Std_CLP', 'N_Observaciones',
-        'Grupo', 'Unidad'
-    ]
+    # Solo precios del último año: con el historial completo (ODEPA_ANIOS) los
+    # precios nominales de años distintos no se promedian entre sí
+    if columnas_tabla(conn, TABLA_PARCIALES_ODEPA):
+        # Modo incremental: combinar los agregados parciales por partición
+        # (n, media, M2, mín, máx) sin volver a leer los precios
+        parciales_odepa = leer_parciales_ultimo_anio(conn)
+        odepa_agregado = combinar_parciales(parciales_odepa)
+        print(f"✓ {TABLA_PARCIALES_ODEPA} cargado (año {parciales_odepa['particion'].max() // 100}): "
+              f"{parciales_odepa['particion'].nunique():,} particiones, {len(parciales_odepa):,} agregados")
+    else:
+        tabla_odepa = TABLA_ODEPA_RECIENTES if columnas_tabla(conn, TABLA_ODEPA_RECIENTES) else "ODEPA_PRECIOS_CLEAN"
+        df_odepa = leer_columnas(conn, tabla_odepa, COLUMNAS_ODEPA)
+        print(f"✓ {tabla_odepa} cargado: {len(df_odepa):,} registros")
+        
+        # Agregar por producto (promedio de todos los precios)
+        odepa_agregado = df_odepa.groupby('Producto').agg({
+            'Precio promedio': ['mean', 'min', 'max', 'std', 'count'],
+            'Grupo': 'first',
+            'Unidad_normalizada': 'first'
+        }).reset_index()
+        
+        # Aplanar columnas multi-nivel
+        odepa_agregado.columns = [
+            'Producto', 'Precio_Promedio_CLP', 'Precio_Min_CLP', 
+            'Precio_Max_CLP', 'Precio_Std_CLP', 'N_Observaciones',
+            'Grupo', 'Unidad'
+        ]
     
     # Normalizar nombre de producto para matching
     odepa_agregado['producto_normalizado'] = (
@@ -201,40 +179,8 @@ if fdc_nutrientes is not None and odepa_agregado is not None:
     try:
         print(" Realizando fuzzy matching entre productos ODEPA y FDC...")
         
-        # Preparar listas para matching
-        fdc_descripciones = fdc_nutrientes['description'].str.lower().tolist()
-        
-        correspondencias = []
-        
-        # Para cada producto ODEPA, buscar el mejor match en FDC
-        for idx, row in odepa_agregado.iterrows():
-            producto_odepa = row['producto_normalizado']
-            
-        matches = get_close_matches(producto_odepa, fdc_descripciones, n=1, cutoff=0.5)
-
-        if matches:
-            fdc_match = matches[0]
-            fdc_idx = fdc_descripciones.index(fdc_match)
-            fdc_id = fdc_nutrientes.iloc[fdc_idx]['fdc_id']
-                
-        correspondencias.append({
-        'producto_odepa': row['Producto'],
-        'producto_odepa_norm': producto_odepa,
-        'fdc_id': fdc_id,
-        'fdc_description': fdc_match,
-        'match_score': np.nan,  # No hay score con difflib
-        'precio_promedio_clp': row['Precio_Promedio_CLP'],
-        'grupo_odepa': row['Grupo'],
-        'categoria_precio': row['categoria_precio']
-         })
-
-            
-        # Mostrar progreso cada 50 productos
-        if (idx + 1) % 50 == 0:
-            print(f"   Procesados: {idx + 1}/{len(odepa_agregado)}")
-        
-        # Crear DataFrame de correspondencias
-        df_correspondencias = pd.DataFrame(correspondencias)
+        # Mejor alimento FDC para cada producto ODEPA (rapidfuzz, puntaje 0-100)
+        df_correspondencias = emparejar_productos(odepa_agregado, fdc_nutrientes)
         
         # Unir con datos nutricionales de FDC
         odepa_fdc_integrado = df_correspondencias.merge(
@@ -252,10 +198,17 @@ if fdc_nutrientes is not None and odepa_agregado is not None:
         )
         
         print(f"\n Tabla ODEPA_FDC_INTEGRADO creada")
-        print(f"   Total matches: {len(df_correspondencias):,}")
+        print(f"   Total matches: {df_correspondencias['fdc_id'].notna().sum():,} de {len(df_correspondencias):,} productos")
         print(f"   Score promedio: {df_correspondencias['match_score'].mean():.1f}")
         print(f"   Matches con score >80: {(df_correspondencias['match_score'] > 80).sum()}")
         
+        # Costo por porción (precio ODEPA por kilo × gram_weight de cada porción FDC)
+        porciones = leer_columnas(conn, TABLA_PORCIONES_FDC, ['fdc_id', 'portion_id', 'gram_weight'])
+        costos_porcion = costo_por_porcion(porciones, df_correspondencias)
+        guardar_indexada(conn, costos_porcion, TABLA_COSTO_PORCION, ['fdc_id', 'portion_id'])
+        print(f"   Tabla {TABLA_COSTO_PORCION}: {costos_porcion['costo_porcion_clp'].notna().sum():,} "
+              f"porciones con costo")
+        
         # Análisis de precios vs perfil nutricional
         print("\n ANÁLISIS: Precio vs Perfil Nutricional")
         if 'clasificacion_salud' in odepa_fdc_integrado.columns:
@@ -280,11 +233,34 @@ print("="*80)
 
 try:
     # Cargar tablas maestras
-    nhanes = pd.read_sql("SELECT * FROM NHANES_MASTER", conn)
-    brfss = pd.read_sql("SELECT * FROM BRFSS_2024_LIMPIO", conn)
+    # Solo las columnas que usan las Partes 4 y 5
+    nhanes = leer_columnas(conn, "NHANES_MASTER", VARS_NHANES_ANALISIS + COLUMNAS_NHANES_COMPARACION)
+    # Tipos compactos en memoria (float32, enteros chicos, category)
+    nhanes, reporte_tipos_nhanes = optimizar_tipos(nhanes, excluir=['SEQN'])
+    # BRFSS: las prevalencias se leen del cubo precalculado, sin cargar la tabla completa
+    brfss_total = leer_cubo(conn, [])
+    brfss_ponderada = leer_ponderada(conn, [])
+    nhanes_ponderada = leer_indicador(conn, 'tiene_diabetes', [])
+    
+    def agregar_ponderada(tabla, dimension, columna, fuente='BRFSS'):
+        """Agrega prevalencia ponderada y EE (tablas *_PONDERADA(S)) a una tabla sin ponderar"""
+        if fuente == 'BRFSS':
+            ponderada = leer_ponderada(conn, [dimension])
+        else:
+            ponderada = leer_indicador(conn, 'tiene_diabetes', [dimension])
+            if ponderada is not None:
+                ponderada = ponderada.rename(columns={'estimacion': 'prevalencia_pct', 'ee': 'ee_pct'})
+        if ponderada is None:
+            return tabla
+        ponderada = ponderada[[dimension, 'prevalencia_pct', 'ee_pct']].rename(columns={
+            dimension: columna, 'prevalencia_pct': 'prevalencia_ponderada_pct'
+        })
+        return tabla.merge(ponderada, on=columna, how='left')
     
     print(f"✓ NHANES_MASTER cargado: {len(nhanes):,} participantes")
-    print(f"✓ BRFSS_2024_LIMPIO cargado: {len(brfss):,} participantes")
+    imprimir_reporte_memoria(reporte_tipos_nhanes, "NHANES_MASTER")
+    if brfss_total is not None:
+        print(f"✓ BRFSS_CUBO_PREVALENCIA cargado: {brfss_total['n_registros'].iloc[0]:,} participantes")
     
     # -------------------------------------------------------------------
     # 4.1: PREVALENCIAS POR GRUPO DE EDAD (AGREGADO)
@@ -293,31 +269,30 @@ try:
     
     # NHANES - Prevalencia de diabetes por edad
     if 'edad_grupo_brfss' in nhanes.columns and 'tiene_diabetes' in nhanes.columns:
-        nhanes_prev_edad = nhanes.groupby('edad_grupo_brfss')['tiene_diabetes'].agg([
+        nhanes_prev_edad = nhanes.groupby('edad_grupo_brfss', observed=True)['tiene_diabetes'].agg([
             ('total', 'count'),
             ('con_diabetes', 'sum'),
             ('prevalencia_pct', lambda x: (x.sum() / x.count() * 100) if x.count() > 0 else 0)
         ]).reset_index()
+        nhanes_prev_edad = agregar_ponderada(nhanes_prev_edad, 'edad_grupo_brfss', 'edad_grupo_brfss', 'NHANES')
         nhanes_prev_edad['fuente'] = 'NHANES'
         
         print("\nNHANES - Diabetes por edad:")
         print(nhanes_prev_edad)
     
     # BRFSS - Prevalencia de diabetes por edad
-    if '_AGE_G' in brfss.columns and 'tiene_diabetes' in brfss.columns:
-        brfss_prev_edad = brfss.groupby('_AGE_G')['tiene_diabetes'].agg([
-            ('total', 'count'),
-            ('con_diabetes', 'sum'),
-            ('prevalencia_pct', lambda x: (x.sum() / x.count() * 100) if x.count() > 0 else 0)
-        ]).reset_index()
+    brfss_prev_edad = leer_cubo(conn, ['_AGE_G'])
+    if brfss_prev_edad is not None:
+        brfss_prev_edad = brfss_prev_edad.drop(columns='n_registros')
         brfss_prev_edad.columns = ['edad_grupo_brfss', 'total', 'con_diabetes', 'prevalencia_pct']
+        brfss_prev_edad = agregar_ponderada(brfss_prev_edad, '_AGE_G', 'edad_grupo_brfss')
         brfss_prev_edad['fuente'] = 'BRFSS'
         
         print("\nBRFSS - Diabetes por edad:")
         print(brfss_prev_edad)
     
     # Combinar ambas para comparación
-    if 'nhanes_prev_edad' in locals() and 'brfss_prev_edad' in locals():
+    if 'nhanes_prev_edad' in locals() and brfss_prev_edad is not None:
         comparacion_edad = pd.concat([nhanes_prev_edad, brfss_prev_edad], ignore_index=True)
         comparacion_edad.to_sql("COMPARACION_DIABETES_EDAD", conn, if_exists="replace", index=False)
         print("\n Tabla COMPARACION_DIABETES_EDAD creada")
@@ -329,31 +304,30 @@ try:
     
     # NHANES
     if 'categoria_imc' in nhanes.columns and 'tiene_diabetes' in nhanes.columns:
-        nhanes_prev_imc = nhanes.groupby('categoria_imc')['tiene_diabetes'].agg([
+        nhanes_prev_imc = nhanes.groupby('categoria_imc', observed=True)['tiene_diabetes'].agg([
             ('total', 'count'),
             ('con_diabetes', 'sum'),
             ('prevalencia_pct', lambda x: (x.sum() / x.count() * 100) if x.count() > 0 else 0)
         ]).reset_index()
+        nhanes_prev_imc = agregar_ponderada(nhanes_prev_imc, 'categoria_imc', 'categoria_imc', 'NHANES')
         nhanes_prev_imc['fuente'] = 'NHANES'
         
         print("\nNHANES - Diabetes por IMC:")
         print(nhanes_prev_imc)
     
     # BRFSS
-    if 'categoria_IMC' in brfss.columns and 'tiene_diabetes' in brfss.columns:
-        brfss_prev_imc = brfss.groupby('categoria_IMC')['tiene_diabetes'].agg([
-            ('total', 'count'),
-            ('con_diabetes', 'sum'),
-            ('prevalencia_pct', lambda x: (x.sum() / x.count() * 100) if x.count() > 0 else 0)
-        ]).reset_index()
+    brfss_prev_imc = leer_cubo(conn, ['categoria_IMC'])
+    if brfss_prev_imc is not None:
+        brfss_prev_imc = brfss_prev_imc.drop(columns='n_registros')
         brfss_prev_imc.columns = ['categoria_imc', 'total', 'con_diabetes', 'prevalencia_pct']
+        brfss_prev_imc = agregar_ponderada(brfss_prev_imc, 'categoria_IMC', 'categoria_imc')
         brfss_prev_imc['fuente'] = 'BRFSS'
         
         print("\nBRFSS - Diabetes por IMC:")
         print(brfss_prev_imc)
     
     # Combinar
-    if 'nhanes_prev_imc' in locals() and 'brfss_prev_imc' in locals():
+    if 'nhanes_prev_imc' in locals() and brfss_prev_imc is not None:
         comparacion_imc = pd.concat([nhanes_prev_imc, brfss_prev_imc], ignore_index=True)
         comparacion_imc.to_sql("COMPARACION_DIABETES_IMC", conn, if_exists="replace", index=False)
         print("\n Tabla COMPARACION_DIABETES_IMC creada")
@@ -364,12 +338,10 @@ try:
     print("\n📊 4.3. Factores de riesgo: Conductuales vs Laboratorio")
     
     # BRFSS - Prevalencia por estilo de vida
-    if 'estilo_vida_saludable' in brfss.columns and 'tiene_diabetes' in brfss.columns:
-        brfss_estilo = brfss.groupby('estilo_vida_saludable')['tiene_diabetes'].agg([
-            ('total', 'count'),
-            ('con_diabetes', 'sum'),
-            ('prevalencia_pct', lambda x: (x.sum() / x.count() * 100) if x.count() > 0 else 0)
-        ]).reset_index()
+    brfss_estilo = leer_cubo(conn, ['estilo_vida_saludable'])
+    if brfss_estilo is not None:
+        brfss_estilo = brfss_estilo.drop(columns='n_registros')
+        brfss_estilo = agregar_ponderada(brfss_estilo, 'estilo_vida_saludable', 'estilo_vida_saludable')
         brfss_estilo['estilo_vida_saludable'] = brfss_estilo['estilo_vida_saludable'].map({
             0: 'No Saludable', 1: 'Saludable'
         })
@@ -379,7 +351,7 @@ try:
     
     # NHANES - Prevalencia por ingesta de fibra (factor protector)
     if 'categoria_fibra' in nhanes.columns and 'tiene_diabetes' in nhanes.columns:
-        nhanes_fibra = nhanes.groupby('categoria_fibra')['tiene_diabetes'].agg([
+        nhanes_fibra = nhanes.groupby('categoria_fibra', observed=True)['tiene_diabetes'].agg([
             ('total', 'count'),
             ('con_diabetes', 'sum'),
             ('prevalencia_pct', lambda x: (x.sum() / x.count() * 100) if x.count() > 0 else 0)
@@ -392,7 +364,7 @@ try:
     
     # NHANES - Prevalencia por consumo de azúcar
     if 'categoria_azucar' in nhanes.columns and 'tiene_diabetes' in nhanes.columns:
-        nhanes_azucar = nhanes.groupby('categoria_azucar')['tiene_diabetes'].agg([
+        nhanes_azucar = nhanes.groupby('categoria_azucar', observed=True)['tiene_diabetes'].agg([
             ('total', 'count'),
             ('con_diabetes', 'sum'),
             ('prevalencia_pct', lambda x: (x.sum() / x.count() * 100) if x.count() > 0 else 0)
@@ -408,18 +380,31 @@ try:
     # -------------------------------------------------------------------
     print("\n 4.4. Resumen comparativo general")
     
+    # IMC promedio de BRFSS: una sola columna agregada en SQL
+    try:
+        brfss_imc_promedio = conn.execute("SELECT AVG(IMC_REAL) FROM BRFSS_2024_LIMPIO").fetchone()[0]
+    except Exception:
+        brfss_imc_promedio = None
+    
     resumen_comparativo = {
         'dataset': ['NHANES', 'BRFSS'],
-        'n_participantes': [len(nhanes), len(brfss)],
+        'n_participantes': [
+            len(nhanes),
+            brfss_total['n_registros'].iloc[0] if brfss_total is not None else np.nan
+        ],
         'prevalencia_diabetes_pct': [
             (nhanes['tiene_diabetes'].sum() / nhanes['tiene_diabetes'].notna().sum() * 100) 
             if 'tiene_diabetes' in nhanes.columns else np.nan,
-            (brfss['tiene_diabetes'].sum() / brfss['tiene_diabetes'].notna().sum() * 100)
-            if 'tiene_diabetes' in brfss.columns else np.nan
+            (brfss_total['con_diabetes'].iloc[0] / brfss_total['total'].iloc[0] * 100)
+            if brfss_total is not None else np.nan
+        ],
+        'prevalencia_ponderada_pct': [
+            nhanes_ponderada['estimacion'].iloc[0] if nhanes_ponderada is not None else np.nan,
+            brfss_ponderada['prevalencia_pct'].iloc[0] if brfss_ponderada is not None else np.nan
         ],
         'imc_promedio': [
             nhanes['BMXBMI'].mean() if 'BMXBMI' in nhanes.columns else np.nan,
-            (brfss['IMC_REAL'].mean() if 'IMC_REAL' in brfss.columns else np.nan)
+            brfss_imc_promedio if brfss_imc_promedio is not None else np.nan
         ],
         'edad_promedio': [
             nhanes['RIDAGEYR'].mean() if 'RIDAGEYR' in nhanes.columns else np.nan,
@@ -445,19 +430,8 @@ print("PARTE 5: CREAR TABLA MAESTRA PARA ANÁLISIS")
 print("="*80)
 
 try:
-    # Seleccionar variables clave de NHANES
-    vars_nhanes = [
-        'SEQN', 'RIDAGEYR', 'RIAGENDR', 'RIDRETH3', 'DMDEDUC2', 'INDFMPIR',
-        'BMXBMI', 'BMXWAIST', 'categoria_imc', 'ratio_cintura_cadera',
-        'LBXGH', 'LBXGLU', 'LBXTC', 'LBDHDD', 'LBDLDL_calc',
-        'tiene_diabetes', 'diabetes_hba1c', 'diabetes_glucosa',
-        'colesterol_alto', 'hdl_bajo', 'trigliceridos_altos',
-        'sindrome_metabolico', 'sm_score', 'riesgo_cardiovascular', 'categoria_riesgo_cv',
-        'promedio_tkcal', 'promedio_tcarb', 'promedio_tsugr', 'promedio_tfibe',
-        'promedio_ttfat', 'promedio_tsfat', 'promedio_tchol', 'promedio_tsodi',
-        'pct_calorias_azucar', 'categoria_azucar', 'categoria_fibra',
-        'grupo_edad', 'categoria_ingreso', 'edad_grupo_brfss'
-    ]
+    # Variables clave de NHANES (ya proyectadas al cargar en la Parte 4)
+    vars_nhanes = VARS_NHANES_ANALISIS
     
     # Filtrar solo columnas existentes
     vars_nhanes_existentes = [v for v in vars_nhanes if v in nhanes.columns]
@@ -466,7 +440,7 @@ try:
     nhanes_analisis['fuente_datos'] = 'NHANES'
     
     # Guardar tabla final
-    nhanes_analisis.to_sql("DATOS_ANALISIS_FINAL", conn, if_exists="replace", index=False)
+    restaurar_tipos(nhanes_analisis, reporte_tipos_nhanes).to_sql("DATOS_ANALISIS_FINAL", conn, if_exists="replace", index=False)
     
     print(f" Tabla DATOS_ANALISIS_FINAL creada")
     print(f"   Participantes: {len(nhanes_analisis):,}")
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Paquete compartido scripts/utilidades (igual que en los scripts del pipeline)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def brfss_crudo():
+    """Registros BRFSS con los códigos del CDC (incluida no respuesta) y diseño muestral"""
+    n = 3000
+    rng = np.random.default_rng(0)
+
+    def codigos(valores, faltantes=0.03):
+        serie = rng.choice(valores, n).astype(float)
+        serie[rng.random(n) < faltantes] = np.nan
+        return serie
+
+    return pd.DataFrame({
+        '_STATE': codigos([1, 2, 4, 6, 12, 48]),
+        '_AGE_G': codigos([1, 2, 3, 4, 5, 6]),
+        '_SEX': codigos([1, 2]),
+        '_EDUCAG': codigos([1, 2, 3, 4, 9]),
+        '_INCOMG1': codigos([1, 2, 3, 4, 5, 6, 7, 9, 77]),
+        'MEDCOST1': codigos([1, 2, 7, 9]),
+        'DIABETE4': codigos([1, 2, 3, 4, 7, 9]),
+        'EXERANY2': codigos([1, 2, 7, 9]),
+        '_SMOKER3': codigos([1, 2, 3, 4, 9]),
+        'DRNK3GE5': codigos([1, 2, 7, 9, 88]),
+        '_BMI5': np.where(rng.random(n) < 0.05, np.nan, rng.normal(2800, 600, n).round()),
+        '_LLCPWT': rng.uniform(50, 2000, n),
+        '_STSTR': rng.integers(1, 20, n).astype(float),
+        '_PSU': rng.integers(1, 100, n).astype(float),
+    })
@@ -0,0 +1,36 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from utilidades.busqueda_fdc import (PREFIJO_MINIMO, PREFIJOS_INDEXADOS, TABLA_BUSQUEDA_FDC,
+                                     buscar_alimentos, consulta_fts, construir_indice_busqueda)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    pd.DataFrame({
+        'fdc_id': [1, 2, 3],
+        'description': ['Azúcar blanca', 'Manzana roja', 'Manjar casero'],
+        'food_category_id': [10, 20, 10],
+    }).to_sql('FDC_FOOD_CLEAN', conn, index=False)
+    pd.DataFrame({'id': [10, 20], 'description': ['Dulces', 'Frutas']}).to_sql(
+        'FDC_FOOD_CATEGORY_CLEAN', conn, index=False)
+    yield conn
+    conn.close()
+
+
+def test_prefijo_minimo_esta_indexado(conn):
+    assert construir_indice_busqueda(conn) == 3
+    sql = conn.execute('SELECT sql FROM sqlite_master WHERE name = ?', (TABLA_BUSQUEDA_FDC,)).fetchone()[0]
+    assert f"prefix = '{' '.join(str(n) for n in PREFIJOS_INDEXADOS)}'" in sql
+    assert PREFIJO_MINIMO == min(PREFIJOS_INDEXADOS)
+
+
+def test_consulta_de_prefijo(conn):
+    construir_indice_busqueda(conn)
+    assert consulta_fts('ma') == '"ma"'
+    assert consulta_fts('man') == '"man"*'
+    assert sorted(buscar_alimentos(conn, 'man')['fdc_id']) == [2, 3]
+    assert list(buscar_alimentos(conn, 'azucar')['fdc_id']) == [1]
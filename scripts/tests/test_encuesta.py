@@ -0,0 +1,108 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilidades.encuesta import (
+    DOMINIOS_BRFSS, PESO_BRFSS, ESTRATO_BRFSS, PSU_BRFSS, FACTOR_ORIGEN, agregar_psu, combinar_psu,
+    codificar_estratos, acumular_psu, leer_psu_acumulado, estimar_dominios, estimar_prevalencias,
+    consultar_ponderada
+)
+from utilidades.limpieza_brfss import limpiar_bloque
+
+
+def estimar_dominio_referencia(df, mascara, variable='tiene_diabetes',
+                               peso=PESO_BRFSS, estrato=ESTRATO_BRFSS, psu=PSU_BRFSS):
+    """Mismo estimador para un solo dominio, calculado de forma directa"""
+    w = pd.to_numeric(df[peso], errors='coerce')
+    y = pd.to_numeric(df[variable], errors='coerce')
+    z = (mascara & y.notna() & w.notna()).astype(float)
+    W = (w * z).sum()
+    p = (w * z * y.fillna(0)).sum() / W
+    e = w.fillna(0) * z * (y.fillna(0) - p) / W
+
+    var = 0.0
+    for h, grupo in e.groupby(df[estrato]):
+        u = grupo.groupby(df.loc[grupo.index, psu]).sum()
+        if len(u) > 1:
+            var += len(u) / (len(u) - 1) * ((u - u.mean()) ** 2).sum()
+    return p * 100, np.sqrt(var) * 100
+
+
+@pytest.fixture(scope='module')
+def brfss_limpio(brfss_crudo):
+    return limpiar_bloque(brfss_crudo.copy(), (10.0, 60.0))
+
+
+@pytest.fixture(scope='module')
+def estimaciones(brfss_limpio):
+    return estimar_prevalencias(brfss_limpio)
+
+
+@pytest.mark.parametrize('dimension', ['_AGE_G', '_SEX', 'ses_score', 'estilo_vida_saludable'])
+def test_estimador_igual_a_referencia(brfss_limpio, estimaciones, dimension):
+    filas = consultar_ponderada(estimaciones, [dimension])
+    assert len(filas)
+    for _, fila in filas.iterrows():
+        p_ref, ee_ref = estimar_dominio_referencia(brfss_limpio, brfss_limpio[dimension] == fila[dimension])
+        assert fila['prevalencia_pct'] == pytest.approx(p_ref, abs=1e-9)
+        assert fila['ee_pct'] == pytest.approx(ee_ref, abs=1e-9)
+
+
+def test_general_igual_a_referencia(brfss_limpio, estimaciones):
+    fila = consultar_ponderada(estimaciones, []).iloc[0]
+    p_ref, ee_ref = estimar_dominio_referencia(brfss_limpio, pd.Series(True, index=brfss_limpio.index))
+    assert fila['prevalencia_pct'] == pytest.approx(p_ref, abs=1e-9)
+    assert fila['ee_pct'] == pytest.approx(ee_ref, abs=1e-9)
+
+
+def test_agregado_por_bloques_igual_a_completo(brfss_limpio, estimaciones):
+    finas = list(dict.fromkeys(d for conjunto in DOMINIOS_BRFSS for d in conjunto))
+    agregado = None
+    for inicio in range(0, len(brfss_limpio), 700):
+        agregado = combinar_psu([agregado, agregar_psu(brfss_limpio.iloc[inicio:inicio + 700], finas)])
+    por_bloques = estimar_dominios(agregado)
+    pd.testing.assert_frame_equal(
+        por_bloques.sort_values(list(por_bloques.columns[:2])).reset_index(drop=True),
+        estimaciones.sort_values(list(estimaciones.columns[:2])).reset_index(drop=True),
+        check_exact=False, rtol=1e-9
+    )
+
+
+def test_acumulado_en_sqlite_igual_a_completo(brfss_limpio, estimaciones):
+    finas = list(dict.fromkeys(d for conjunto in DOMINIOS_BRFSS for d in conjunto))
+    conn = sqlite3.connect(':memory:')
+    for inicio in range(0, len(brfss_limpio), 700):
+        acumular_psu(conn, agregar_psu(brfss_limpio.iloc[inicio:inicio + 700], finas), primero=inicio == 0)
+    agregado = leer_psu_acumulado(conn)
+    assert not conn.execute("SELECT name FROM sqlite_master").fetchall()
+    conn.close()
+
+    por_bloques = estimar_dominios(agregado)
+    columnas = list(por_bloques.columns[:2])
+    pd.testing.assert_frame_equal(
+        por_bloques.sort_values(columnas).reset_index(drop=True),
+        estimaciones.sort_values(columnas).reset_index(drop=True),
+        check_exact=False, rtol=1e-9, check_dtype=False
+    )
+
+
+def test_estratos_de_cada_origen_quedan_separados(brfss_limpio):
+    # Dos "años" con los mismos códigos de estrato: con código por origen son el doble de estratos
+    mitad = len(brfss_limpio) // 2
+    partes = [brfss_limpio.iloc[:mitad], brfss_limpio.iloc[mitad:]]
+    agregado = combinar_psu([
+        codificar_estratos(agregar_psu(parte, []), origen) for origen, parte in enumerate(partes)
+    ])
+    estratos = [agregar_psu(parte, [])['_estrato'].nunique() for parte in partes]
+    assert agregado['_estrato'].dtype == 'int64'
+    assert agregado['_estrato'].nunique() == sum(estratos)
+
+    # La referencia con estratos por año da el mismo error estándar
+    anio = np.repeat([0, 1], [mitad, len(brfss_limpio) - mitad])
+    df = brfss_limpio.assign(**{ESTRATO_BRFSS: anio * FACTOR_ORIGEN + brfss_limpio[ESTRATO_BRFSS]})
+    p_ref, ee_ref = estimar_dominio_referencia(df, pd.Series(True, index=df.index))
+    fila = estimar_dominios(agregado, [[]]).iloc[0]
+    assert fila['prevalencia_pct'] == pytest.approx(p_ref, abs=1e-9)
+    assert fila['ee_pct'] == pytest.approx(ee_ref, abs=1e-9)
@@ -0,0 +1,39 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from utilidades.integridad_referencial import eliminar_huerfanos, validar_relaciones
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    pd.DataFrame({'fdc_id': [1, 2, 3]}).to_sql('FDC_FOOD_CLEAN', conn, index=False)
+    pd.DataFrame({
+        'fdc_id': [1, 2, 9, None, 3, 9],
+        'amount': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    }).to_sql('FDC_FOOD_PORTION_CLEAN', conn, index=False)
+    yield conn
+    conn.close()
+
+
+def test_elimina_huerfanos_y_claves_nulas(conn):
+    borradas = eliminar_huerfanos(conn, 'FDC_FOOD_PORTION_CLEAN', 'fdc_id', 'FDC_FOOD_CLEAN', 'fdc_id')
+    assert borradas == 3
+    restantes = [fila[0] for fila in conn.execute('SELECT fdc_id FROM FDC_FOOD_PORTION_CLEAN ORDER BY rowid')]
+    assert restantes == [1, 2, 3]
+
+
+def test_conservar_nulos(conn):
+    borradas = eliminar_huerfanos(conn, 'FDC_FOOD_PORTION_CLEAN', 'fdc_id', 'FDC_FOOD_CLEAN', 'fdc_id',
+                                  conservar_nulos=True)
+    assert borradas == 2
+    assert conn.execute('SELECT COUNT(*) FROM FDC_FOOD_PORTION_CLEAN WHERE fdc_id IS NULL').fetchone()[0] == 1
+
+
+def test_validar_relaciones_no_cuenta_nulos(conn):
+    relacion = [('FDC_FOOD_PORTION_CLEAN', 'fdc_id', 'FDC_FOOD_CLEAN', 'fdc_id')]
+    fila = validar_relaciones(conn, relacion).iloc[0]
+    assert (fila['n_filas_huerfanas'], fila['n_claves_huerfanas'], fila['n_claves_comunes']) == (2, 1, 3)
+    assert float(fila['ejemplos_huerfanos']) == 9
@@ -0,0 +1,114 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from utilidades.carga import guardar_particion
+from utilidades.particiones_odepa import (
+    TABLA_ODEPA, TABLA_ODEPA_CLEAN, TABLA_PARCIALES_ODEPA, procesar_odepa_incremental,
+    registrar_archivo_odepa, leer_parciales_ultimo_anio, combinar_parciales
+)
+
+PRODUCTOS = [('Tomate', 'Hortalizas'), ('Manzana', 'Frutas'), ('Pan', 'Panaderia')]
+
+
+def csv_odepa(anio, semanas=(1, 2, 3), ajuste=None):
+    """Registros de un año con el formato del CSV de ODEPA (precios con coma decimal)"""
+    filas = []
+    for semana in semanas:
+        for i, (producto, grupo) in enumerate(PRODUCTOS):
+            precio = 1000 + 100 * i + 10 * semana + anio % 100
+            if ajuste and (semana, producto) in ajuste:
+                precio = ajuste[(semana, producto)]
+            filas.append({
+                'Anio': anio, 'Mes': 1, 'Semana': semana,
+                'Fecha inicio': f'{anio}-01-{semana:02d}', 'Fecha termino': f'{anio}-01-{semana + 6:02d}',
+                'ID region': 13, 'Region': 'Metropolitana', 'Sector': 'Santiago',
+                'Tipo de punto monitoreo': 'Feria', 'Grupo': grupo, 'Producto': producto,
+                'Unidad': '$/kilo', 'Precio minimo': f'{precio - 50},0',
+                'Precio maximo': f'{precio + 50},0', 'Precio promedio': f'{precio},0',
+            })
+    return pd.DataFrame(filas)
+
+
+def ingestar(conn, df):
+    """Misma escritura que 1_ingesta: reemplaza el año y registra el hash del archivo"""
+    anio = int(df['Anio'].iloc[0])
+    guardar_particion(conn, df, TABLA_ODEPA, columna='Anio')
+    registrar_archivo_odepa(conn, anio, df.to_csv(index=False).encode(), len(df))
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    ingestar(conn, csv_odepa(2024))
+    ingestar(conn, csv_odepa(2025))
+    procesar_odepa_incremental(conn)
+    yield conn
+    conn.close()
+
+
+def precio_limpio(conn, semana, producto, anio=2025):
+    return conn.execute(
+        f'SELECT "Precio promedio" FROM "{TABLA_ODEPA_CLEAN}" '
+        f'WHERE "Anio" = ? AND "Semana" = ? AND "Producto" = ?', (anio, semana, producto)
+    ).fetchone()[0]
+
+
+def test_sin_cambios_no_reprocesa(conn):
+    assert procesar_odepa_incremental(conn) == []
+
+
+def test_reingesta_mismo_archivo_no_reprocesa(conn):
+    ingestar(conn, csv_odepa(2025))
+    assert procesar_odepa_incremental(conn) == []
+
+
+def test_reingesta_con_precios_revisados(conn):
+    rowids = conn.execute(f'SELECT MIN(rowid), MAX(rowid), COUNT(*) FROM "{TABLA_ODEPA}" WHERE "Anio" = 2025').fetchone()
+
+    # Mismas filas y semanas, solo cambian precios de la semana 2
+    ingestar(conn, csv_odepa(2025, ajuste={(2, 'Tomate'): 1500, (2, 'Pan'): 2000}))
+    assert conn.execute(
+        f'SELECT MIN(rowid), MAX(rowid), COUNT(*) FROM "{TABLA_ODEPA}" WHERE "Anio" = 2025'
+    ).fetchone() == rowids
+
+    assert procesar_odepa_incremental(conn) == [202502]
+    assert precio_limpio(conn, 2, 'Tomate') == 1500
+    assert precio_limpio(conn, 2, 'Pan') == 2000
+    assert precio_limpio(conn, 1, 'Tomate') == 1000 + 10 + 25
+
+    parcial = conn.execute(
+        f'SELECT media FROM "{TABLA_PARCIALES_ODEPA}" WHERE particion = 202502 AND "Producto" = ?', ('Tomate',)
+    ).fetchone()[0]
+    assert parcial == 1500
+
+
+def test_semana_nueva_y_semana_eliminada(conn):
+    ingestar(conn, csv_odepa(2025, semanas=(2, 3, 4)))
+    assert procesar_odepa_incremental(conn) == [202504]
+    semanas = [s for (s,) in conn.execute(
+        f'SELECT DISTINCT "Semana" FROM "{TABLA_ODEPA_CLEAN}" WHERE "Anio" = 2025 ORDER BY 1'
+    )]
+    assert semanas == [2, 3, 4]
+
+
+def test_sin_hash_de_archivo_compara_contenido(conn):
+    # Años escritos sin pasar por la ingesta: se revisan por contenido
+    conn.execute("DELETE FROM ODEPA_ARCHIVOS")
+    conn.commit()
+    assert procesar_odepa_incremental(conn) == []
+    conn.execute(f'UPDATE "{TABLA_ODEPA}" SET "Precio promedio" = \'1234,0\' '
+                 f'WHERE "Anio" = 2024 AND "Semana" = 3 AND "Producto" = \'Pan\'')
+    conn.commit()
+    assert procesar_odepa_incremental(conn) == [202403]
+    assert precio_limpio(conn, 3, 'Pan', anio=2024) == 1234
+
+
+def test_agregado_solo_del_ultimo_anio(conn):
+    parciales = leer_parciales_ultimo_anio(conn)
+    assert sorted(parciales['particion'].unique()) == [202501, 202502, 202503]
+    agregado = combinar_parciales(parciales).set_index('Producto')
+    # Tomate 2025: 1000 + 10·semana + 25
+    assert agregado.loc['Tomate', 'Precio_Promedio_CLP'] == pytest.approx(1045.0)
+    assert agregado.loc['Tomate', 'N_Observaciones'] == 3
@@ -0,0 +1,58 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilidades.porciones_fdc import TABLA_COSTO_PORCION, costo_por_porcion, guardar_indexada
+
+pytest.importorskip('rapidfuzz')
+from utilidades.emparejamiento import emparejar_productos  # noqa: E402
+
+
+@pytest.fixture
+def odepa_agregado():
+    return pd.DataFrame({
+        'Producto': ['Tomate', 'Leche entera', 'Huevo'],
+        'producto_normalizado': ['tomato', 'milk whole', 'xyz'],
+        'Precio_Promedio_CLP': [1200.0, 1000.0, 300.0],
+        'Grupo': ['Hortalizas', 'Lacteos', 'Huevos'],
+        'Unidad': ['CLP/kg', 'CLP/L', 'CLP/unidad'],
+        'categoria_precio': ['Alto', 'Medio-Alto', 'Bajo'],
+    })
+
+
+@pytest.fixture
+def fdc_nutrientes():
+    return pd.DataFrame({
+        'fdc_id': [10, 20, 30],
+        'description': ['TOMATOES, RED, RAW', 'MILK, WHOLE', None],
+    })
+
+
+def test_emparejar_productos(odepa_agregado, fdc_nutrientes):
+    correspondencias = emparejar_productos(odepa_agregado, fdc_nutrientes)
+    assert len(correspondencias) == 3
+    assert correspondencias['fdc_id'].iloc[:2].tolist() == [10, 20]
+    assert correspondencias['match_score'].iloc[:2].between(50, 100).all()
+    assert pd.isna(correspondencias['fdc_id'].iloc[2])
+    assert np.isnan(correspondencias['match_score'].iloc[2])
+
+
+def test_costo_por_porcion_desde_emparejamiento(odepa_agregado, fdc_nutrientes):
+    porciones = pd.DataFrame({
+        'fdc_id': [10, 10, 20, 40],
+        'portion_id': [1, 2, 3, 4],
+        'gram_weight': [250.0, 50.0, 244.0, 100.0],
+    })
+    costos = costo_por_porcion(porciones, emparejar_productos(odepa_agregado, fdc_nutrientes))
+
+    # Tomate (CLP/kg): precio × gramos / 1000; leche (CLP/L) queda sin costo
+    assert costos['portion_id'].tolist() == [1, 2, 3]
+    assert costos['costo_porcion_clp'].iloc[:2].tolist() == pytest.approx([300.0, 60.0])
+    assert np.isnan(costos['costo_porcion_clp'].iloc[2])
+
+    conn = sqlite3.connect(':memory:')
+    guardar_indexada(conn, costos, TABLA_COSTO_PORCION, ['fdc_id', 'portion_id'])
+    assert conn.execute(f'SELECT COUNT(*) FROM "{TABLA_COSTO_PORCION}"').fetchone()[0] == 3
+    conn.close()
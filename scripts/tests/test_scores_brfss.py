@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilidades.limpieza_brfss import limpiar_bloque
+from utilidades.scores_brfss import (
+    DIABETES_SI, EDAD_RIESGO_ALTO, FUMADOR_ACTUAL, INGRESO_ALTO,
+    calcular_tiene_diabetes, calcular_riesgo_metabolico, evaluar_estilo_vida, calcular_ses
+)
+
+# ========================================
+# IMPLEMENTACIÓN DE REFERENCIA (POR FILA)
+# ========================================
+# Cálculo original fila a fila (apply); los scores vectorizados deben coincidir.
+
+def tiene_diabetes_fila(x):
+    return 1 if x in DIABETES_SI else (0 if x == 'No' else np.nan)
+
+
+def riesgo_metabolico_fila(row):
+    score = 0
+    if pd.notna(row.get('IMC_REAL')):
+        if row['IMC_REAL'] >= 30:
+            score += 3
+        elif row['IMC_REAL'] >= 25:
+            score += 2
+    if row.get('tiene_diabetes') == 1:
+        score += 3
+    if row.get('_AGE_G') in EDAD_RIESGO_ALTO:
+        score += 2
+    elif row.get('_AGE_G') == '45-54':
+        score += 1
+    return score
+
+
+def estilo_vida_fila(row):
+    saludable = True
+    if row.get('EXERANY2') == 'No':
+        saludable = False
+    if row.get('_SMOKER3') in FUMADOR_ACTUAL:
+        saludable = False
+    if row.get('DRNK3GE5') == 'Sí':
+        saludable = False
+    return 1 if saludable else 0
+
+
+def ses_fila(row):
+    score = 0
+    if row.get('_EDUCAG') == 'Graduado de universidad o escuela técnica':
+        score += 2
+    elif row.get('_EDUCAG') == 'Asistió a universidad o escuela técnica':
+        score += 1
+    if row.get('_INCOMG1') in INGRESO_ALTO:
+        score += 2
+    elif row.get('_INCOMG1') == '$50,000 a < $100,000':
+        score += 1
+    if row.get('MEDCOST1') == 'Sí, no pudo pagar':
+        score -= 1
+    return max(0, score)
+
+
+# ========================================
+# DATOS: BLOQUE BRFSS CODIFICADO → LIMPIEZA REAL
+# ========================================
+
+@pytest.fixture(scope='module')
+def brfss_limpio(brfss_crudo):
+    return limpiar_bloque(brfss_crudo.copy(), (10.0, 60.0))
+
+
+@pytest.fixture(scope='module')
+def brfss_sin_columnas(brfss_crudo):
+    """Bloque sin las columnas opcionales de los scores (row.get → None)"""
+    return limpiar_bloque(brfss_crudo[['_AGE_G', 'DIABETE4', '_BMI5']].head(500).copy(), (10.0, 60.0))
+
+
+def test_datos_cubren_los_casos(brfss_limpio):
+    assert brfss_limpio['tiene_diabetes'].isna().any()
+    assert set(brfss_limpio['_AGE_G'].dropna()) >= set(EDAD_RIESGO_ALTO) | {'45-54'}
+    assert (brfss_limpio['IMC_REAL'] >= 30).any() and brfss_limpio['IMC_REAL'].isna().any()
+
+
+def test_tiene_diabetes(brfss_limpio):
+    esperado = brfss_limpio['DIABETE4'].apply(tiene_diabetes_fila)
+    pd.testing.assert_series_equal(
+        calcular_tiene_diabetes(brfss_limpio), esperado.astype('float64'), check_names=False
+    )
+
+
+@pytest.mark.parametrize('fila, vectorizado', [
+    (riesgo_metabolico_fila, calcular_riesgo_metabolico),
+    (estilo_vida_fila, evaluar_estilo_vida),
+    (ses_fila, calcular_ses),
+])
+@pytest.mark.parametrize('datos', ['brfss_limpio', 'brfss_sin_columnas'])
+def test_scores_igual_a_referencia(request, datos, fila, vectorizado):
+    df = request.getfixturevalue(datos)
+    esperado = df.apply(fila, axis=1)
+    obtenido = vectorizado(df)
+    assert obtenido.dtype == 'int64'
+    np.testing.assert_array_equal(obtenido.to_numpy(), esperado.to_numpy())
@@ -0,0 +1,43 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilidades.sustitutos_fdc import (
+    VARIABLES_PERFIL, IndiceSustitutos, cargar_indice, guardar_indice
+)
+
+
+@pytest.fixture
+def nutrientes():
+    rng = np.random.default_rng(0)
+    n = 400
+    df = pd.DataFrame({v: rng.gamma(2.0, 10.0, n) for v in VARIABLES_PERFIL})
+    df.insert(0, 'fdc_id', np.arange(100000, 100000 + n))
+    df['food_category_id'] = rng.choice([1.0, 2.0, 3.0, np.nan], n)
+    df['Azucares_Totales'] = np.where(rng.random(n) < 0.1, np.nan, rng.gamma(2.0, 5.0, n))
+    df['Acidos_Grasos_Saturados'] = rng.gamma(1.5, 2.0, n)
+    return df
+
+
+def test_ida_y_vuelta_sin_pickle(nutrientes):
+    indice = IndiceSustitutos.construir(nutrientes)
+    datos = indice.a_bytes()
+    assert datos[:2] == b'PK'  # archivo .npz (zip), no pickle
+
+    cargado = IndiceSustitutos.desde_bytes(datos)
+    assert set(cargado.arboles) == set(indice.arboles)
+    consulta = nutrientes['fdc_id'].iloc[::7]
+    pd.testing.assert_frame_equal(cargado.buscar(consulta, k=5), indice.buscar(consulta, k=5))
+
+
+def test_cargar_indice_respeta_la_firma(nutrientes):
+    conn = sqlite3.connect(':memory:')
+    indice = IndiceSustitutos.construir(nutrientes)
+    guardar_indice(conn, 'FDC', indice, 'hash-a:1')
+
+    assert cargar_indice(conn, 'FDC', 'hash-a:1').n_alimentos == indice.n_alimentos
+    assert cargar_indice(conn, 'FDC', 'hash-b:1') is None
+    assert cargar_indice(conn, 'OTRO') is None
+    conn.close()
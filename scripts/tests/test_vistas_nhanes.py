@@ -0,0 +1,55 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilidades.tipos_compactos import optimizar_tipos
+from utilidades.vistas_nhanes import SUFIJO_DELTA, columnas_desde_maestra, guardar_como_vista
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def master():
+    return pd.DataFrame({
+        'SEQN': [3, 1, 2, 4, 5],
+        'ciclo': ['2017-2018'] * 5,
+        'RIDAGEYR': [40, 25, 61, 33, 70],
+        'LBXGH': [5.4, np.nan, 6.8, 5.1, 7.2],
+    })
+
+
+def test_vista_conserva_valores_y_orden(conn, master):
+    master.to_sql('NHANES_MASTER', conn, index=False)
+    # Orden distinto al de la maestra y una columna modificada (va a la delta)
+    df = pd.DataFrame({
+        'SEQN': [5, 2, 4, 1, 3],
+        'RIDAGEYR': [70, 61, 33, 25, 40],
+        'LBXGH': [7.2, 6.8, 5.1, np.nan, 5.4],
+        'diabetes_hba1c': [1, 1, 0, np.nan, 0],
+    })
+    n_maestra, n_delta = guardar_como_vista(conn, 'DEMO_LIMPIO', df, master, 'DEMO', '2017-2018')
+    assert (n_maestra, n_delta) == (2, 2)
+
+    vista = pd.read_sql('SELECT * FROM "DEMO_LIMPIO"', conn)
+    pd.testing.assert_frame_equal(vista, df, check_dtype=False)
+
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'DEMO_LIMPIO'").fetchone()[0]
+    assert 'rowid' not in sql.lower()
+    assert '_orden' in [fila[1] for fila in conn.execute(f'PRAGMA table_info("DEMO_LIMPIO{SUFIJO_DELTA}")')]
+
+
+def test_maestra_compacta_da_el_mismo_mapa(master):
+    # Con tipos compactos (LBXGH en float32) y su reporte, el mapa es el mismo que con la maestra completa
+    df = master.drop(columns='ciclo').iloc[::-1].reset_index(drop=True)
+    compacta, tipos = optimizar_tipos(master, excluir=['SEQN'])
+    assert compacta['LBXGH'].dtype == 'float32'
+    esperado = columnas_desde_maestra(df, master, 'DEMO', '2017-2018')
+    assert esperado == {'RIDAGEYR': 'RIDAGEYR', 'LBXGH': 'LBXGH'}
+    assert columnas_desde_maestra(df, compacta, 'DEMO', '2017-2018', tipos=tipos) == esperado
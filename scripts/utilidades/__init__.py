@@ -0,0 +1 @@
+"""Funciones compartidas por los scripts del pipeline (limpieza, integración)"""
@@ -0,0 +1,100 @@
+import re
+import pandas as pd
+
+from utilidades.carga import columnas_tabla
+from utilidades.nutrientes_fdc import TABLA_NUTRIENTES_FDC
+
+# ========================================
+# BÚSQUEDA DE TEXTO EN ALIMENTOS FDC (FTS5)
+# ========================================
+# Índice FTS5 sobre FDC_FOOD_CLEAN.description y el nombre de su categoría,
+# con rowid = fdc_id para unir sin columna extra. Reemplaza LIKE '%...%'
+# (recorrido completo por consulta) por búsqueda en el índice invertido:
+#   - tokenizer unicode61 sin tildes ("azucar" encuentra "azúcar")
+#   - prefijos de PREFIJOS_INDEXADOS letras indexados: la última palabra
+#     (desde PREFIJO_MINIMO, el menor de ellos) se busca como prefijo, para
+#     búsqueda mientras se escribe; así cada consulta de prefijo usa el índice
+#   - ranking bm25, la descripción pesa más que la categoría
+# El costo depende de cuántos alimentos calzan (bm25 puntúa todos antes del
+# LIMIT): términos específicos responden en menos de 1 ms con 1M alimentos;
+# un prefijo muy común (100k coincidencias) toma del orden de 0,2 s.
+# El nombre no empieza con FDC_ para no mezclarse con las tablas FDC_* (FTS5
+# crea tablas internas BUSQUEDA_ALIMENTOS_FDC_data, _idx, ...).
+
+TABLA_BUSQUEDA_FDC = "BUSQUEDA_ALIMENTOS_FDC"
+PESOS_BUSQUEDA = (10.0, 2.0)  # bm25: description, categoria
+LIMITE_RESULTADOS = 20
+PREFIJOS_INDEXADOS = (3, 4)  # opción prefix de FTS5
+PREFIJO_MINIMO = PREFIJOS_INDEXADOS[0]
+
+# Resumen de nutrientes por 100 g que acompaña cada resultado
+RESUMEN_NUTRIENTES = ['Energia', 'Proteina', 'Grasa_Total', 'Carbohidratos', 'Fibra',
+                      'Azucares_Totales', 'Sodio', 'Carb_Netos']
+
+
+def construir_indice_busqueda(conn, tabla=TABLA_BUSQUEDA_FDC):
+    """Crea (de cero) el índice FTS5 de alimentos; devuelve cuántos se indexaron"""
+    conn.execute(f'DROP TABLE IF EXISTS "{tabla}"')
+    prefijos = ' '.join(str(n) for n in PREFIJOS_INDEXADOS)
+    conn.execute(
+        f'CREATE VIRTUAL TABLE "{tabla}" USING fts5('
+        f"description, categoria, tokenize = 'unicode61 remove_diacritics 2', prefix = '{prefijos}')"
+    )
+
+    # La categoría puede no estar (columna vacía eliminada en la limpieza)
+    if ('food_category_id' in columnas_tabla(conn, "FDC_FOOD_CLEAN")
+            and columnas_tabla(conn, "FDC_FOOD_CATEGORY_CLEAN")):
+        categoria = "c.description"
+        union = "LEFT JOIN FDC_FOOD_CATEGORY_CLEAN c ON c.id = f.food_category_id"
+    else:
+        categoria, union = "NULL", ""
+    conn.execute(
+        f'INSERT INTO "{tabla}" (rowid, description, categoria) '
+        f"SELECT f.fdc_id, f.description, {categoria} FROM FDC_FOOD_CLEAN f {union}"
+    )
+    conn.execute(f'INSERT INTO "{tabla}"("{tabla}") VALUES (\'optimize\')')
+
+    # Índice para unir los resultados con el resumen de nutrientes
+    if columnas_tabla(conn, TABLA_NUTRIENTES_FDC):
+        conn.execute(
+            f'CREATE INDEX IF NOT EXISTS idx_{TABLA_NUTRIENTES_FDC.lower()}_fdc_id '
+            f'ON "{TABLA_NUTRIENTES_FDC}"(fdc_id)'
+        )
+    conn.commit()
+    return conn.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0]
+
+
+def consulta_fts(texto):
+    """Texto libre → consulta FTS5: todas las palabras, la última como prefijo"""
+    palabras = re.findall(r"\w+", str(texto).lower())
+    if not palabras:
+        return None
+    terminos = [f'"{p}"' for p in palabras]
+    if len(palabras[-1]) >= PREFIJO_MINIMO:
+        terminos[-1] += '*'
+    return ' '.join(terminos)
+
+
+def buscar_alimentos(conn, texto, limite=LIMITE_RESULTADOS, tabla=TABLA_BUSQUEDA_FDC,
+                     nutrientes=RESUMEN_NUTRIENTES):
+    """Alimentos que calzan con `texto`, ordenados por relevancia, con resumen de nutrientes"""
+    disponibles = columnas_tabla(conn, TABLA_NUTRIENTES_FDC)
+    nutrientes = [n for n in nutrientes if n in disponibles]
+    union = f'LEFT JOIN "{TABLA_NUTRIENTES_FDC}" n ON n.fdc_id = r.fdc_id' if disponibles else ""
+    seleccion = ''.join(f', n."{n}"' for n in nutrientes)
+
+    columnas = ['fdc_id', 'description', 'categoria', 'relevancia'] + nutrientes
+    consulta = consulta_fts(texto)
+    if consulta is None:
+        return pd.DataFrame(columns=columnas)
+
+    # Primero el top-k en el índice y después la unión, solo para esas filas
+    pesos = ', '.join(str(p) for p in PESOS_BUSQUEDA)
+    filas = conn.execute(
+        f'SELECT r.fdc_id, r.description, r.categoria, -r.puntaje{seleccion} FROM ('
+        f'SELECT rowid AS fdc_id, description, categoria, bm25("{tabla}", {pesos}) AS puntaje '
+        f'FROM "{tabla}" WHERE "{tabla}" MATCH ? ORDER BY puntaje LIMIT ?'
+        f') r {union} ORDER BY r.puntaje',
+        (consulta, limite)
+    ).fetchall()
+    return pd.DataFrame.from_records(filas, columns=columnas)
@@ -0,0 +1,88 @@
+import pandas as pd
+
+# ========================================
+# LECTURA DE TABLAS SQLITE
+# ========================================
+
+def leer_por_bloques(conn, tabla, tamano):
+    """Itera sobre `tabla` en bloques de `tamano` filas.
+
+    Pagina por rowid (WHERE rowid > último ORDER BY rowid LIMIT n), de modo que
+    cada consulta termina antes de devolver el bloque y la misma conexión puede
+    escribir resultados entre bloques.
+    """
+    ultimo = 0
+    while True:
+        bloque = pd.read_sql(
+            f'SELECT rowid AS __rowid, * FROM "{tabla}" WHERE rowid > ? ORDER BY rowid LIMIT ?',
+            conn, params=(ultimo, tamano)
+        )
+        if bloque.empty:
+            break
+        ultimo = int(bloque['__rowid'].iloc[-1])
+        yield bloque.drop(columns='__rowid')
+
+
+# ========================================
+# PROYECCIÓN DE COLUMNAS
+# ========================================
+# Cada etapa declara las columnas que usa y solo esas se leen de SQLite
+# (SELECT col1, col2, ... en vez de SELECT *). En tablas anchas como
+# NHANES_MASTER la lectura y la memoria bajan en proporción.
+
+def columnas_tabla(conn, tabla):
+    """Columnas de `tabla` en orden (lista vacía si no existe)"""
+    return [fila[1] for fila in conn.execute(f'PRAGMA table_info("{tabla}")').fetchall()]
+
+
+def leer_columnas(conn, tabla, columnas=None):
+    """Lee solo `columnas` de `tabla` (las que existan, en el orden pedido); None = todas"""
+    disponibles = columnas_tabla(conn, tabla)
+    if not disponibles:
+        raise ValueError(f"la tabla {tabla} no existe")
+    if columnas is None:
+        seleccion = disponibles
+    else:
+        seleccion = [c for c in dict.fromkeys(columnas) if c in disponibles]
+        if not seleccion:
+            raise ValueError(f"ninguna de las columnas pedidas está en {tabla}")
+    lista = ', '.join(f'"{c}"' for c in seleccion)
+    return pd.read_sql(f'SELECT {lista} FROM "{tabla}"', conn)
+
+
+# ========================================
+# ESCRITURA POR PARTICIÓN
+# ========================================
+
+def tipo_sqlite(serie):
+    """Tipo de columna SQLite para una serie de pandas"""
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_integer_dtype(serie):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(serie):
+        return 'REAL'
+    return 'TEXT'
+
+
+def guardar_particion(conn, df, tabla, columna='ciclo'):
+    """Reemplaza en `tabla` solo las particiones (valores de `columna`) presentes en df.
+
+    Si la tabla no existe o no está particionada por `columna`, se crea de cero.
+    Las columnas nuevas se agregan con ALTER TABLE; las que faltan en df quedan
+    NULL para esas filas. Devuelve las particiones escritas.
+    """
+    particiones = sorted(df[columna].dropna().unique().tolist())
+    existentes = columnas_tabla(conn, tabla)
+
+    if columna not in existentes:
+        df.to_sql(tabla, conn, if_exists="replace", index=False)
+    else:
+        for col in df.columns:
+            if col not in existentes:
+                conn.execute(f'ALTER TABLE "{tabla}" ADD COLUMN "{col}" {tipo_sqlite(df[col])}')
+        marcadores = ', '.join('?' for _ in particiones)
+        conn.execute(f'DELETE FROM "{tabla}" WHERE "{columna}" IN ({marcadores})', particiones)
+        df.to_sql(tabla, conn, if_exists="append", index=False)
+
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabla.lower()}_{columna.lower()} ON "{tabla}"("{columna}")')
+    conn.commit()
+    return particiones
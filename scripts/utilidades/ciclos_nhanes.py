@@ -0,0 +1,119 @@
+import pandas as pd
+
+from utilidades.reglas_clinicas import clasificar_por_cortes
+
+# ========================================
+# CICLOS NHANES (2011-2023)
+# ========================================
+# Cada ciclo tiene su sufijo en el nombre de archivo/tabla (DEMO_G, DEMO_H,
+# ...). 2019-2020 no tiene ciclo propio (la recolección se interrumpió y
+# se publicó como "P_" prepandemia), por eso se pasa de J a L.
+# Cada ciclo es una partición independiente: se ingiere, limpia y une por
+# separado, y NHANES_MASTER guarda la columna 'ciclo'.
+
+CICLOS_NHANES = {
+    'G': {'anios': '2011-2012', 'carpeta': 2011},
+    'H': {'anios': '2013-2014', 'carpeta': 2013},
+    'I': {'anios': '2015-2016', 'carpeta': 2015},
+    'J': {'anios': '2017-2018', 'carpeta': 2017},
+    'L': {'anios': '2021-2023', 'carpeta': 2021},
+}
+
+CICLO_ACTUAL = 'L'
+
+# Tablas NHANES por nombre base (sin sufijo de ciclo)
+TABLAS_NHANES = [
+    "DEMO", "BMX", "GLU", "HDL", "TRIGLY", "TCHOL",
+    "DR1TOT", "DR2TOT", "ALB_CR", "AGP", "CBC", "FASTQX",
+    "FERTIN", "FOLATE", "GHB", "HEPA", "HEPB_S", "HSCRP",
+    "INS", "PBCD", "IHGEM", "FOLFMS", "TST", "BIOPRO",
+    "TFR", "UCPREG", "VID", "VOCWB"
+]
+
+URL_NHANES = "https://wwwn.cdc.gov/Nchs/Data/Nhanes/Public/{carpeta}/DataFiles/{tabla}.xpt"
+
+# ========================================
+# ARMONIZACIÓN ENTRE CICLOS
+# ========================================
+# Variable de ciclos anteriores → nombre del ciclo actual y cómo recodificar:
+#   - 'mapa': códigos viejos → códigos del ciclo actual
+#   - 'cortes'/'etiquetas': variable continua → códigos por intervalos [a, b)
+ARMONIZACION = {
+    # Estado civil: 6 categorías (G-J) → 3 categorías (L)
+    'DMDMARTL': {
+        'destino': 'DMDMARTZ',
+        'mapa': {1: 1, 6: 1, 2: 2, 3: 2, 4: 2, 5: 3, 77: 77, 99: 99}
+    },
+    # Edad del jefe de hogar: años (G-J) → grupo de edad (L)
+    'DMDHRAGE': {
+        'destino': 'DMDHRAGZ',
+        'cortes': [20, 40, 60],
+        'etiquetas': [1, 2, 3, 4]
+    },
+}
+
+
+def ciclos_validos(ciclos):
+    """Sufijos conocidos, en orden cronológico y sin repetir"""
+    pedidos = {c.strip().upper() for c in ciclos if c.strip()}
+    desconocidos = pedidos - set(CICLOS_NHANES)
+    if desconocidos:
+        raise ValueError(f"ciclos NHANES desconocidos: {', '.join(sorted(desconocidos))}")
+    return [c for c in CICLOS_NHANES if c in pedidos]
+
+
+def nombre_tabla(base, ciclo):
+    """DEMO + L → DEMO_L"""
+    return f"{base}_{ciclo}"
+
+
+def separar_nombre(nombre):
+    """DEMO_L → ('DEMO', 'L'); HEPB_S_L → ('HEPB_S', 'L')"""
+    base, _, ciclo = nombre.rpartition('_')
+    if ciclo in CICLOS_NHANES and base:
+        return base, ciclo
+    return nombre, None
+
+
+def tablas_por_ciclo(bases, ciclos):
+    """Nombres de tabla de todas las bases para cada ciclo (ciclo por ciclo)"""
+    return [nombre_tabla(base, ciclo) for ciclo in ciclos for base in bases]
+
+
+def urls_nhanes(bases, ciclos):
+    """{tabla: url} para descargar las bases de cada ciclo"""
+    return {
+        nombre_tabla(base, ciclo): URL_NHANES.format(
+            carpeta=CICLOS_NHANES[ciclo]['carpeta'], tabla=nombre_tabla(base, ciclo)
+        )
+        for ciclo in ciclos for base in bases
+    }
+
+
+def armonizar_tabla(df):
+    """Renombra y recodifica variables de ciclos anteriores a la versión del ciclo actual"""
+    for origen, regla in ARMONIZACION.items():
+        if origen not in df.columns or regla['destino'] in df.columns:
+            continue
+        valores = pd.to_numeric(df[origen], errors='coerce')
+        if 'mapa' in regla:
+            armonizada = valores.map(regla['mapa'])
+        else:
+            armonizada = clasificar_por_cortes(valores, regla['cortes'], regla['etiquetas']).astype('float64')
+        posicion = df.columns.get_loc(origen)
+        df = df.drop(columns=origen)
+        df.insert(posicion, regla['destino'], armonizada.to_numpy(dtype='float64'))
+    return df
+
+
+def agregar_ciclo(df, ciclo):
+    """Agrega la columna 'ciclo' después de SEQN"""
+    df = df.copy()
+    posicion = df.columns.get_loc('SEQN') + 1 if 'SEQN' in df.columns else 0
+    df.insert(posicion, 'ciclo', ciclo)
+    return df
+
+
+def peso_combinado(df, peso, ciclos):
+    """Peso para estimaciones que combinan ciclos de 2 años (peso / n° de ciclos, guía NCHS)"""
+    return df[peso] / max(len(ciclos), 1)
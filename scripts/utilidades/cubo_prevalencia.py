@@ -0,0 +1,129 @@
+import itertools
+import pandas as pd
+
+# ========================================
+# CUBO DE PREVALENCIA (GROUPING SETS / CUBE)
+# ========================================
+# Un solo recorrido de la tabla agrega (n_registros, total, con_diabetes) al
+# nivel más fino de las dimensiones. Todos los demás conjuntos de agrupación
+# (por edad, por estado × sexo, total general, ...) se obtienen sumando esas
+# celdas base, que son pocas miles, sin volver a leer la tabla.
+#
+# grouping_id sigue la convención de SQL GROUPING_ID: el bit i (contando desde
+# la última dimensión) vale 1 si la dimensión i está agregada ("todas"). Así
+# grouping_id = 0 es el nivel más fino y 2^n - 1 es el total general.
+
+DIMENSIONES_CUBO_BRFSS = ['_STATE', '_AGE_G', '_SEX', 'categoria_IMC', 'ses_score', 'estilo_vida_saludable']
+
+TABLA_CUBO_BRFSS = "BRFSS_CUBO_PREVALENCIA"
+
+COLUMNAS_MEDIDAS = ['n_registros', 'total', 'con_diabetes', 'prevalencia_pct']
+
+
+def agregar_base(df, dimensiones, medida='tiene_diabetes'):
+    """Agregado al nivel más fino: n_registros, total (no nulos) y con_diabetes"""
+    dimensiones = [d for d in dimensiones if d in df.columns]
+    agrupado = df.groupby(dimensiones, dropna=False, observed=True)[medida]
+    base = pd.DataFrame({
+        'n_registros': agrupado.size(),
+        'total': agrupado.count(),
+        'con_diabetes': agrupado.sum()
+    }).reset_index()
+    return base
+
+
+def combinar_bases(base, otra):
+    """Suma dos agregados base (p.ej. de bloques distintos)"""
+    if base is None:
+        return otra
+    dimensiones = [c for c in base.columns if c not in ('n_registros', 'total', 'con_diabetes')]
+    return (
+        pd.concat([base, otra], ignore_index=True)
+        .groupby(dimensiones, dropna=False, observed=True)[['n_registros', 'total', 'con_diabetes']]
+        .sum()
+        .reset_index()
+    )
+
+
+def grouping_id(dimensiones, agrupadas):
+    """GROUPING_ID del conjunto `agrupadas` dentro de `dimensiones`"""
+    n = len(dimensiones)
+    return sum(1 << (n - 1 - i) for i, d in enumerate(dimensiones) if d not in agrupadas)
+
+
+def expandir_cubo(base, dimensiones=None, conjuntos=None):
+    """Expande el agregado base a todos los conjuntos de agrupación.
+
+    Por defecto genera el CUBE completo (todos los subconjuntos de dimensiones);
+    `conjuntos` permite pasar una lista explícita (GROUPING SETS).
+    """
+    if dimensiones is None:
+        dimensiones = [c for c in base.columns if c not in ('n_registros', 'total', 'con_diabetes')]
+    if conjuntos is None:
+        conjuntos = [
+            list(combinacion)
+            for r in range(len(dimensiones), -1, -1)
+            for combinacion in itertools.combinations(dimensiones, r)
+        ]
+
+    medidas = ['n_registros', 'total', 'con_diabetes']
+    partes = []
+    for conjunto in conjuntos:
+        if conjunto:
+            parte = base.groupby(list(conjunto), dropna=False, observed=True)[medidas].sum().reset_index()
+        else:
+            parte = base[medidas].sum().to_frame().T
+        parte['grouping_id'] = grouping_id(dimensiones, conjunto)
+        parte['nivel'] = len(conjunto)
+        partes.append(parte)
+
+    cubo = pd.concat(partes, ignore_index=True).reindex(
+        columns=dimensiones + ['grouping_id', 'nivel'] + medidas
+    )
+    cubo[medidas] = cubo[medidas].astype('int64')
+    cubo['prevalencia_pct'] = (cubo['con_diabetes'] / cubo['total'] * 100).fillna(0).round(2)
+    return cubo
+
+
+def construir_cubo(df, dimensiones=DIMENSIONES_CUBO_BRFSS, medida='tiene_diabetes', conjuntos=None):
+    """Cubo de prevalencia de `medida` en un solo recorrido de `df`"""
+    base = agregar_base(df, dimensiones, medida)
+    return expandir_cubo(base, conjuntos=conjuntos)
+
+
+def consultar_cubo(cubo, dimensiones, incluir_nulos=False):
+    """Filas del cubo agrupadas exactamente por `dimensiones`.
+
+    Igual que groupby(), por defecto se excluyen las celdas con dimensión nula.
+    """
+    todas = [c for c in cubo.columns if c not in ['grouping_id', 'nivel'] + COLUMNAS_MEDIDAS]
+    resultado = cubo[cubo['grouping_id'] == grouping_id(todas, dimensiones)]
+    if not incluir_nulos:
+        resultado = resultado.dropna(subset=list(dimensiones))
+    return resultado[list(dimensiones) + COLUMNAS_MEDIDAS].reset_index(drop=True)
+
+
+def leer_cubo(conn, dimensiones, tabla=TABLA_CUBO_BRFSS, incluir_nulos=False):
+    """Lee desde la base de datos solo el conjunto de agrupación pedido (None si no existe)"""
+    try:
+        todas = [fila[1] for fila in conn.execute(f'PRAGMA table_info("{tabla}")').fetchall()]
+    except Exception:
+        return None
+    todas = [c for c in todas if c not in ['grouping_id', 'nivel'] + COLUMNAS_MEDIDAS]
+    if not todas or not all(d in todas for d in dimensiones):
+        return None
+
+    columnas = ', '.join(f'"{c}"' for c in list(dimensiones) + COLUMNAS_MEDIDAS)
+    filtro = '' if incluir_nulos else ''.join(f' AND "{d}" IS NOT NULL' for d in dimensiones)
+    orden = (' ORDER BY ' + ', '.join(f'"{d}"' for d in dimensiones)) if dimensiones else ''
+    return pd.read_sql(
+        f'SELECT {columnas} FROM "{tabla}" WHERE grouping_id = ?{filtro}{orden}',
+        conn, params=(grouping_id(todas, dimensiones),)
+    )
+
+
+def guardar_cubo(conn, cubo, tabla=TABLA_CUBO_BRFSS):
+    """Persiste el cubo con un índice por grouping_id"""
+    cubo.to_sql(tabla, conn, if_exists="replace", index=False)
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabla.lower()}_gid ON "{tabla}"(grouping_id)')
+    conn.commit()
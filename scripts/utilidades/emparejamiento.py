@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+# ========================================
+# EMPAREJAMIENTO ODEPA ↔ FDC (FUZZY MATCHING)
+# ========================================
+# Cada producto ODEPA (nombre normalizado) se empareja con la descripción FDC
+# más parecida según rapidfuzz (WRatio, 0-100). Los productos sin ninguna
+# descripción sobre UMBRAL_MATCH quedan con fdc_id vacío.
+
+UMBRAL_MATCH = 50
+
+COLUMNAS_CORRESPONDENCIA = [
+    'producto_odepa', 'producto_odepa_norm', 'fdc_id', 'fdc_description', 'match_score',
+    'precio_promedio_clp', 'grupo_odepa', 'unidad_odepa', 'categoria_precio'
+]
+
+
+def emparejar_productos(odepa_agregado, fdc_nutrientes, umbral=UMBRAL_MATCH, cada=50):
+    """Una fila por producto ODEPA con su mejor alimento FDC y el puntaje del match"""
+    fdc_descripciones = fdc_nutrientes['description'].fillna('').str.lower().tolist()
+    fdc_ids = fdc_nutrientes['fdc_id'].tolist()
+
+    correspondencias = []
+    for i, (_, row) in enumerate(odepa_agregado.iterrows(), start=1):
+        producto_odepa = row['producto_normalizado']
+        match = process.extractOne(producto_odepa, fdc_descripciones, scorer=fuzz.WRatio, score_cutoff=umbral)
+        if match:
+            fdc_match, score, fdc_idx = match
+            fdc_id = fdc_ids[fdc_idx]
+        else:
+            fdc_match, score, fdc_id = None, np.nan, None
+
+        correspondencias.append({
+            'producto_odepa': row['Producto'],
+            'producto_odepa_norm': producto_odepa,
+            'fdc_id': fdc_id,
+            'fdc_description': fdc_match,
+            'match_score': score,
+            'precio_promedio_clp': row['Precio_Promedio_CLP'],
+            'grupo_odepa': row['Grupo'],
+            'unidad_odepa': row['Unidad'],
+            'categoria_precio': row['categoria_precio']
+        })
+
+        # Mostrar progreso cada `cada` productos
+        if cada and i % cada == 0:
+            print(f"   Procesados: {i}/{len(odepa_agregado)}")
+
+    return pd.DataFrame(correspondencias, columns=COLUMNAS_CORRESPONDENCIA)
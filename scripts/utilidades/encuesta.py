@@ -0,0 +1,339 @@
+import itertools
+import pandas as pd
+import numpy as np
+
+from utilidades.carga import columnas_tabla
+
+# ========================================
+# ESTIMADOR PONDERADO CON DISEÑO MUESTRAL
+# ========================================
+# Prevalencia ponderada (estimador de razón) y error estándar por
+# linealización de Taylor con el diseño estratificado por conglomerados:
+#
+#   p_d   = Σ w·y·z_d / Σ w·z_d              (z_d = 1 si el registro está en el dominio d)
+#   u_hj  = Σ_{i ∈ PSU hj} w_i·z_d·(y_i - p_d) / Σ w·z_d
+#   V(p_d)= Σ_h n_h/(n_h-1) · Σ_j (u_hj - ū_h)²
+#
+# con n_h = número de PSU del estrato h en TODA la muestra (estimación por
+# dominio correcta: las PSU sin registros del dominio cuentan con u = 0). Es la
+# aproximación "con reemplazo" usada por SUDAAN/SAS SURVEYFREQ y R survey.
+# Estratos con una sola PSU no aportan varianza.
+#
+# Todo se calcula con sumas agrupadas: u_hj depende solo de Σw y Σw·y por
+# (dominio, estrato, PSU), que son aditivas. Un único agregado al nivel más
+# fino alcanza para cualquier conjunto de dominios (y para combinar bloques),
+# y Σ_j (u - ū)² se obtiene como Σu² - (Σu)²/n_h sin recorrer grupos en Python.
+
+PESO_BRFSS = '_LLCPWT'
+ESTRATO_BRFSS = '_STSTR'
+PSU_BRFSS = '_PSU'
+COLUMNAS_DISENO_BRFSS = [PESO_BRFSS, ESTRATO_BRFSS, PSU_BRFSS]
+
+Z_95 = 1.959964
+
+MEDIDAS_PSU = ['n', 'suma_w', 'suma_wy']
+# Códigos de estrato por tabla de origen (_STSTR tiene a lo más 6 dígitos)
+FACTOR_ORIGEN = 10 ** 6
+
+TABLA_PONDERADA_BRFSS = "BRFSS_PREVALENCIA_PONDERADA"
+TABLA_PSU_PARCIAL = "BRFSS_PSU_PARCIAL"
+FILAS_LECTURA_PSU = 100000
+
+# Dominios publicados: cada conjunto de dimensiones es una serie de estimaciones
+DOMINIOS_BRFSS = [
+    [],
+    ['_AGE_G'],
+    ['_SEX'],
+    ['categoria_IMC'],
+    ['ses_score'],
+    ['estilo_vida_saludable'],
+    ['_STATE'],
+    ['_STATE', '_AGE_G', '_SEX']
+]
+
+# NHANES: peso del examen MEC (2 años), estrato y PSU enmascarados
+PESO_NHANES = 'WTMEC2YR'
+ESTRATO_NHANES = 'SDMVSTRA'
+PSU_NHANES = 'SDMVPSU'
+
+TABLA_ESTIMACIONES_NHANES = "NHANES_ESTIMACIONES_PONDERADAS"
+
+# Indicador → tipo ('proporcion' se reporta en %, 'media' en su unidad)
+INDICADORES_NHANES = {
+    'tiene_diabetes': 'proporcion',
+    'colesterol_alto': 'proporcion',
+    'sindrome_metabolico': 'proporcion',
+    'LBXGH': 'media',
+    'LBXGLU': 'media',
+    'LBXTC': 'media',
+    'LBDHDD': 'media',
+    'BMXBMI': 'media'
+}
+
+DOMINIOS_NHANES = [
+    [],
+    ['grupo_edad'],
+    ['categoria_imc'],
+    ['categoria_ingreso'],
+    ['RIAGENDR'],
+    ['RIDRETH3'],
+    ['edad_grupo_brfss'],
+    ['categoria_fibra'],
+    ['categoria_azucar'],
+    ['grupo_edad', 'RIAGENDR'],
+    ['categoria_imc', 'RIAGENDR'],
+    ['RIDRETH3', 'RIAGENDR']
+]
+
+
+def tiene_diseno(df, peso=PESO_BRFSS, estrato=ESTRATO_BRFSS, psu=PSU_BRFSS):
+    """True si el DataFrame trae las variables de diseño"""
+    return all(c in df.columns for c in (peso, estrato, psu))
+
+
+def agregar_psu(df, dimensiones, variable='tiene_diabetes',
+                peso=PESO_BRFSS, estrato=ESTRATO_BRFSS, psu=PSU_BRFSS):
+    """Sumas n, Σw y Σw·y por (dimensiones, estrato, PSU).
+
+    Los registros sin `variable` se conservan con sumas 0 para que su PSU
+    cuente en n_h.
+    """
+    dimensiones = [d for d in dimensiones if d in df.columns]
+    w = pd.to_numeric(df[peso], errors='coerce')
+    y = pd.to_numeric(df[variable], errors='coerce')
+    valido = y.notna() & w.notna()
+
+    datos = df[dimensiones].copy()
+    datos['_estrato'] = pd.to_numeric(df[estrato], errors='coerce')
+    datos['_psu'] = pd.to_numeric(df[psu], errors='coerce')
+    datos['n'] = valido.astype('int64')
+    datos['suma_w'] = w.where(valido, 0.0)
+    datos['suma_wy'] = (w * y).where(valido, 0.0)
+    datos = datos.dropna(subset=['_estrato', '_psu'])
+
+    return (
+        datos.groupby(dimensiones + ['_estrato', '_psu'], dropna=False, observed=True)
+        [MEDIDAS_PSU].sum()
+        .reset_index()
+    )
+
+
+def combinar_psu(partes):
+    """Suma agregados por PSU de varios bloques"""
+    partes = [p for p in partes if p is not None]
+    if not partes:
+        return None
+    claves = [c for c in partes[0].columns if c not in MEDIDAS_PSU]
+    return (
+        pd.concat(partes, ignore_index=True)
+        .groupby(claves, dropna=False, observed=True)[MEDIDAS_PSU].sum()
+        .reset_index()
+    )
+
+
+def codificar_estratos(agregado, origen):
+    """Estrato como código entero origen·FACTOR_ORIGEN + estrato, para combinar muestras.
+
+    Cada año de BRFSS tiene su propio diseño: el mismo código de _STSTR en
+    dos años son estratos distintos. Las PSU quedan separadas porque se
+    agrupan siempre dentro de su estrato.
+    """
+    estrato = agregado['_estrato'].round().astype('int64')
+    return agregado.assign(_estrato=origen * FACTOR_ORIGEN + estrato)
+
+
+# ========================================
+# ACUMULACIÓN POR BLOQUES EN SQLITE
+# ========================================
+# Con _PSU de BRFSS (número de registro) el agregado por PSU tiene una fila
+# por encuestado. Re-agruparlo en pandas en cada bloque cuesta tiempo
+# cuadrático, así que cada bloque se anexa a una tabla de paso y al final
+# una sola suma agrupada (GROUP BY en SQLite) produce el agregado completo.
+
+def acumular_psu(conn, parte, primero, tabla=TABLA_PSU_PARCIAL):
+    """Anexa el agregado por PSU de un bloque a la tabla de paso"""
+    parte.to_sql(tabla, conn, if_exists="replace" if primero else "append", index=False)
+
+
+def leer_psu_acumulado(conn, tabla=TABLA_PSU_PARCIAL):
+    """Suma agrupada de todos los bloques acumulados (None si no hay); borra la tabla de paso"""
+    claves = [c for c in columnas_tabla(conn, tabla) if c not in MEDIDAS_PSU]
+    if not claves:
+        return None
+    lista = ', '.join(f'"{c}"' for c in claves)
+    sumas = ', '.join(f'SUM("{m}") AS "{m}"' for m in MEDIDAS_PSU)
+    partes = pd.read_sql(f'SELECT {lista}, {sumas} FROM "{tabla}" GROUP BY {lista}', conn,
+                         chunksize=FILAS_LECTURA_PSU)
+    agregado = pd.concat(partes, ignore_index=True)
+    conn.execute(f'DROP TABLE IF EXISTS "{tabla}"')
+    conn.commit()
+    return agregado
+
+
+def linealizar(agregado, dimensiones):
+    """Estimador de razón Σw·y/Σw y su EE por dominio (escala original de y)"""
+    dimensiones = list(dimensiones)
+
+    # n_h: PSU distintas por estrato en toda la muestra
+    n_h = agregado[['_estrato', '_psu']].drop_duplicates().groupby('_estrato').size().rename('n_h')
+
+    datos = agregado.dropna(subset=dimensiones) if dimensiones else agregado
+    claves = dimensiones if dimensiones else None
+    if claves is None:
+        datos = datos.assign(_dominio=0)
+        claves = ['_dominio']
+
+    psu = datos.groupby(claves + ['_estrato', '_psu'], observed=True)[['n', 'suma_w', 'suma_wy']].sum()
+    dominio = psu.groupby(level=claves, observed=True)[['n', 'suma_w', 'suma_wy']].sum()
+    dominio = dominio[dominio['suma_w'] > 0]
+    dominio['p'] = dominio['suma_wy'] / dominio['suma_w']
+
+    # u_hj = (Σw·y - p·Σw) / W_d, alineado por dominio
+    psu = psu.join(dominio[['p', 'suma_w']].rename(columns={'suma_w': 'W'}), how='inner')
+    psu['u'] = (psu['suma_wy'] - psu['p'] * psu['suma_w']) / psu['W']
+    psu['u2'] = psu['u'] ** 2
+
+    por_estrato = psu.groupby(level=claves + ['_estrato'], observed=True)[['u', 'u2']].sum()
+    por_estrato = por_estrato.join(n_h)
+    nh = por_estrato['n_h']
+    aporte = (nh / (nh - 1)) * (por_estrato['u2'] - por_estrato['u'] ** 2 / nh)
+    por_estrato['var'] = aporte.where(nh > 1, 0.0).clip(lower=0)
+    varianza = por_estrato.groupby(level=claves, observed=True)['var'].sum()
+
+    resultado = pd.DataFrame({
+        'n_muestra': dominio['n'].astype('int64'),
+        'poblacion': dominio['suma_w'],
+        'estimacion': dominio['p'],
+        'ee': np.sqrt(varianza.reindex(dominio.index).fillna(0))
+    })
+    resultado = resultado.reset_index()
+    return resultado.drop(columns='_dominio') if '_dominio' in resultado.columns else resultado
+
+
+def estimar_desde_psu(agregado, dimensiones):
+    """Prevalencia ponderada, EE e IC 95% por dominio a partir del agregado por PSU"""
+    resultado = linealizar(agregado, dimensiones).rename(columns={
+        'estimacion': 'prevalencia_pct', 'ee': 'ee_pct'
+    })
+    resultado[['prevalencia_pct', 'ee_pct']] *= 100
+    resultado['ic95_inf'] = (resultado['prevalencia_pct'] - Z_95 * resultado['ee_pct']).clip(lower=0)
+    resultado['ic95_sup'] = (resultado['prevalencia_pct'] + Z_95 * resultado['ee_pct']).clip(upper=100)
+    resultado['cv_pct'] = resultado['ee_pct'] / resultado['prevalencia_pct'].replace(0, np.nan) * 100
+    return resultado
+
+
+def estimar_dominios(agregado, conjuntos=DOMINIOS_BRFSS):
+    """Apila las estimaciones de varios conjuntos de dominios en una tabla larga"""
+    todas = list(dict.fromkeys(itertools.chain.from_iterable(conjuntos)))
+    partes = []
+    for conjunto in conjuntos:
+        if not all(d in agregado.columns for d in conjunto):
+            continue
+        parte = estimar_desde_psu(agregado, conjunto)
+        parte.insert(0, 'dominio', ' × '.join(conjunto) if conjunto else 'General')
+        partes.append(parte)
+    if not partes:
+        return pd.DataFrame()
+    columnas = ['dominio'] + [d for d in todas if d in agregado.columns]
+    resultado = pd.concat(partes, ignore_index=True)
+    otras = [c for c in resultado.columns if c not in columnas]
+    return resultado.reindex(columns=columnas + otras)
+
+
+def estimar_prevalencias(df, conjuntos=DOMINIOS_BRFSS, variable='tiene_diabetes'):
+    """Un solo agregado por PSU al nivel más fino y todas las series de dominios"""
+    finas = list(dict.fromkeys(itertools.chain.from_iterable(conjuntos)))
+    return estimar_dominios(agregar_psu(df, finas, variable), conjuntos)
+
+
+def consultar_ponderada(tabla, dimensiones):
+    """Filas de la tabla larga correspondientes al conjunto `dimensiones`"""
+    nombre = ' × '.join(dimensiones) if dimensiones else 'General'
+    filas = tabla[tabla['dominio'] == nombre]
+    columnas = list(dimensiones) + ['n_muestra', 'poblacion', 'prevalencia_pct', 'ee_pct', 'ic95_inf', 'ic95_sup', 'cv_pct']
+    return filas[columnas].reset_index(drop=True)
+
+
+def estimar_indicadores(df, indicadores=INDICADORES_NHANES, conjuntos=DOMINIOS_NHANES,
+                        peso=PESO_NHANES, estrato=ESTRATO_NHANES, psu=PSU_NHANES):
+    """Medias y proporciones ponderadas con EE para varios indicadores y dominios.
+
+    Un agregado por PSU por indicador (al nivel más fino de los dominios) y
+    una linealización por conjunto; devuelve una tabla larga
+    (indicador, tipo, dominio, dimensiones..., estimacion, ee, IC 95%).
+    """
+    if not all(c in df.columns for c in (peso, estrato, psu)):
+        return pd.DataFrame()
+    conjuntos = [c for c in conjuntos if all(d in df.columns for d in c)]
+    finas = list(dict.fromkeys(itertools.chain.from_iterable(conjuntos)))
+
+    partes = []
+    for variable, tipo in indicadores.items():
+        if variable not in df.columns:
+            continue
+        agregado = agregar_psu(df, finas, variable, peso, estrato, psu)
+        escala = 100 if tipo == 'proporcion' else 1
+        for conjunto in conjuntos:
+            parte = linealizar(agregado, conjunto)
+            parte[['estimacion', 'ee']] *= escala
+            parte.insert(0, 'dominio', ' × '.join(conjunto) if conjunto else 'General')
+            parte.insert(0, 'tipo', tipo)
+            parte.insert(0, 'indicador', variable)
+            partes.append(parte)
+    if not partes:
+        return pd.DataFrame()
+
+    resultado = pd.concat(partes, ignore_index=True)
+    resultado['ic95_inf'] = resultado['estimacion'] - Z_95 * resultado['ee']
+    resultado['ic95_sup'] = resultado['estimacion'] + Z_95 * resultado['ee']
+    es_pct = resultado['tipo'] == 'proporcion'
+    resultado.loc[es_pct, 'ic95_inf'] = resultado.loc[es_pct, 'ic95_inf'].clip(lower=0)
+    resultado.loc[es_pct, 'ic95_sup'] = resultado.loc[es_pct, 'ic95_sup'].clip(upper=100)
+    resultado['cv_pct'] = resultado['ee'] / resultado['estimacion'].replace(0, np.nan) * 100
+
+    columnas = ['indicador', 'tipo', 'dominio'] + finas
+    otras = [c for c in resultado.columns if c not in columnas]
+    return resultado.reindex(columns=columnas + otras)
+
+
+def consultar_indicador(tabla, indicador, dimensiones):
+    """Filas de la tabla larga de un indicador y conjunto de dominios"""
+    nombre = ' × '.join(dimensiones) if dimensiones else 'General'
+    filas = tabla[(tabla['indicador'] == indicador) & (tabla['dominio'] == nombre)]
+    columnas = list(dimensiones) + ['n_muestra', 'poblacion', 'estimacion', 'ee', 'ic95_inf', 'ic95_sup', 'cv_pct']
+    return filas[columnas].reset_index(drop=True)
+
+
+def guardar_ponderadas(conn, tabla_estimaciones, tabla=TABLA_PONDERADA_BRFSS):
+    """Persiste la tabla larga de estimaciones con índice por dominio"""
+    tabla_estimaciones.to_sql(tabla, conn, if_exists="replace", index=False)
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabla.lower()}_dominio ON "{tabla}"(dominio)')
+    conn.commit()
+
+
+def leer_ponderada(conn, dimensiones, tabla=TABLA_PONDERADA_BRFSS):
+    """Lee un conjunto de dominios de la tabla persistida (None si no existe)"""
+    nombre = ' × '.join(dimensiones) if dimensiones else 'General'
+    try:
+        filas = pd.read_sql(f'SELECT * FROM "{tabla}" WHERE dominio = ?', conn, params=(nombre,))
+    except Exception:
+        return None
+    if filas.empty:
+        return None
+    columnas = list(dimensiones) + ['n_muestra', 'poblacion', 'prevalencia_pct', 'ee_pct', 'ic95_inf', 'ic95_sup', 'cv_pct']
+    return filas[columnas]
+
+
+def leer_indicador(conn, indicador, dimensiones, tabla=TABLA_ESTIMACIONES_NHANES):
+    """Lee un indicador y conjunto de dominios de la tabla larga persistida (None si no existe)"""
+    nombre = ' × '.join(dimensiones) if dimensiones else 'General'
+    try:
+        filas = pd.read_sql(
+            f'SELECT * FROM "{tabla}" WHERE indicador = ? AND dominio = ?', conn, params=(indicador, nombre)
+        )
+    except Exception:
+        return None
+    if filas.empty:
+        return None
+    columnas = list(dimensiones) + ['n_muestra', 'poblacion', 'estimacion', 'ee', 'ic95_inf', 'ic95_sup', 'cv_pct']
+    return filas[columnas]
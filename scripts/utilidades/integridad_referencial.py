@@ -0,0 +1,83 @@
+import pandas as pd
+
+from utilidades.carga import columnas_tabla
+
+# ========================================
+# INTEGRIDAD REFERENCIAL EN LA BASE DE DATOS
+# ========================================
+# Las claves foráneas se revisan con anti-joins (NOT EXISTS) dentro de SQLite,
+# con índice en la clave del padre y de la hija; a pandas solo llegan los
+# conteos y unas pocas claves huérfanas de ejemplo, nunca las columnas de ids.
+
+# (tabla hija, columna, tabla padre, columna del padre)
+RELACIONES_FDC = [
+    ('FDC_FOOD_NUTRIENT_CLEAN', 'fdc_id', 'FDC_FOOD_CLEAN', 'fdc_id'),
+    ('FDC_FOOD_NUTRIENT_CLEAN', 'nutrient_id', 'FDC_NUTRIENT_CLEAN', 'id'),
+    ('FDC_FOOD_PORTION_CLEAN', 'fdc_id', 'FDC_FOOD_CLEAN', 'fdc_id'),
+    ('FDC_FOOD_CLEAN', 'food_category_id', 'FDC_FOOD_CATEGORY_CLEAN', 'id'),
+]
+
+COLUMNAS_INTEGRIDAD = [
+    'tabla', 'columna', 'referencia', 'n_filas_huerfanas', 'n_claves_huerfanas',
+    'n_claves_comunes', 'ejemplos_huerfanos'
+]
+MAX_EJEMPLOS = 10
+
+
+def asegurar_indice(conn, tabla, columna):
+    """Crea (si falta) un índice sobre tabla(columna)"""
+    conn.execute(
+        f'CREATE INDEX IF NOT EXISTS idx_{tabla.lower()}_{columna.lower()} ON "{tabla}"("{columna}")'
+    )
+
+
+def validar_clave_foranea(conn, hija, columna, padre, columna_padre, max_ejemplos=MAX_EJEMPLOS):
+    """Conteos de la relación hija.columna → padre.columna_padre (NULL no cuenta como huérfano)"""
+    asegurar_indice(conn, padre, columna_padre)
+    asegurar_indice(conn, hija, columna)
+
+    existe = f'EXISTS (SELECT 1 FROM "{padre}" p WHERE p."{columna_padre}" = h."{columna}")'
+    desde = f'FROM "{hija}" h WHERE h."{columna}" IS NOT NULL'
+    n_filas, n_claves = conn.execute(
+        f'SELECT COUNT(*), COUNT(DISTINCT h."{columna}") {desde} AND NOT {existe}'
+    ).fetchone()
+    n_comunes = conn.execute(f'SELECT COUNT(DISTINCT h."{columna}") {desde} AND {existe}').fetchone()[0]
+    ejemplos = [fila[0] for fila in conn.execute(
+        f'SELECT DISTINCT h."{columna}" {desde} AND NOT {existe} LIMIT ?', (max_ejemplos,)
+    )]
+    return {
+        'tabla': hija,
+        'columna': columna,
+        'referencia': f"{padre}.{columna_padre}",
+        'n_filas_huerfanas': n_filas,
+        'n_claves_huerfanas': n_claves,
+        'n_claves_comunes': n_comunes,
+        'ejemplos_huerfanos': ', '.join(str(e) for e in ejemplos)
+    }
+
+
+def validar_relaciones(conn, relaciones=RELACIONES_FDC, max_ejemplos=MAX_EJEMPLOS):
+    """Valida todas las relaciones cuyas tablas y columnas existan; una fila por relación"""
+    filas = []
+    for hija, columna, padre, columna_padre in relaciones:
+        if columna not in columnas_tabla(conn, hija) or columna_padre not in columnas_tabla(conn, padre):
+            continue
+        filas.append(validar_clave_foranea(conn, hija, columna, padre, columna_padre, max_ejemplos))
+    conn.commit()
+    return pd.DataFrame(filas, columns=COLUMNAS_INTEGRIDAD)
+
+
+def eliminar_huerfanos(conn, hija, columna, padre, columna_padre, conservar_nulos=False):
+    """Borra de `hija` las filas cuya clave no está en el padre; devuelve cuántas.
+
+    Las filas con clave NULL también se borran (como el filtro isin de pandas),
+    salvo con conservar_nulos=True para claves opcionales.
+    """
+    asegurar_indice(conn, padre, columna_padre)
+    nulos = f'"{columna}" IS NOT NULL AND' if conservar_nulos else f'"{columna}" IS NULL OR'
+    cursor = conn.execute(
+        f'DELETE FROM "{hija}" WHERE {nulos} NOT EXISTS '
+        f'(SELECT 1 FROM "{padre}" p WHERE p."{columna_padre}" = "{hija}"."{columna}")'
+    )
+    conn.commit()
+    return cursor.rowcount
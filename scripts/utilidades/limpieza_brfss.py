@@ -0,0 +1,312 @@
+import pandas as pd
+import numpy as np
+
+from utilidades.carga import leer_por_bloques
+from utilidades.cuantiles import SketchKLL, guardar_sketch
+from utilidades.encuesta import (
+    COLUMNAS_DISENO_BRFSS, tiene_diseno, agregar_psu, codificar_estratos, acumular_psu, leer_psu_acumulado,
+    estimar_dominios, consultar_ponderada, guardar_ponderadas
+)
+from utilidades.cubo_prevalencia import (
+    DIMENSIONES_CUBO_BRFSS, agregar_base, combinar_bases, expandir_cubo, consultar_cubo, guardar_cubo
+)
+from utilidades.mapas_brfss import (
+    MAPEOS_DEMOGRAFICOS, MAPEOS_SALUD, MAPEOS_DIABETES,
+    codificar_columnas, decodificar_categorias, guardar_dimensiones, crear_vista_etiquetas
+)
+from utilidades.validacion_rangos import RANGOS_VALIDOS, validar_rangos, dentro_de_rango
+from utilidades.scores_brfss import clasificar_imc, crear_variables_derivadas
+
+# ========================================
+# PARÁMETROS DE LIMPIEZA BRFSS
+# ========================================
+UMBRAL_NAN_COLUMNA = 0.75
+VALORES_INVALIDOS = [-9, 77, 99, 'NA', 'N/A', ' ', '']
+FACTOR_IQR = 3
+
+INDICES_BRFSS = [
+    "CREATE INDEX IF NOT EXISTS idx_brfss_estado ON BRFSS_2024_LIMPIO(_STATE);",
+    "CREATE INDEX IF NOT EXISTS idx_brfss_edad ON BRFSS_2024_LIMPIO(_AGE_G);",
+    "CREATE INDEX IF NOT EXISTS idx_brfss_sexo ON BRFSS_2024_LIMPIO(_SEX);",
+    "CREATE INDEX IF NOT EXISTS idx_brfss_diabetes ON BRFSS_2024_LIMPIO(tiene_diabetes);",
+    "CREATE INDEX IF NOT EXISTS idx_brfss_imc_cat ON BRFSS_2024_LIMPIO(categoria_IMC);"
+]
+
+# Dimensiones del reporte de prevalencia de diabetes (cortes del cubo)
+DIMENSIONES_REPORTE = [
+    ('_AGE_G', 'GRUPO DE EDAD'),
+    ('categoria_IMC', 'CATEGORÍA DE IMC'),
+    ('ses_score', 'NIVEL SOCIOECONÓMICO'),
+    ('estilo_vida_saludable', 'ESTILO DE VIDA')
+]
+
+
+# ========================================
+# PASOS DE LIMPIEZA
+# ========================================
+
+def reemplazar_invalidos(df):
+    """Códigos de no respuesta → NaN, sin tocar peso/estrato/PSU (un PSU puede valer 77 o 99)"""
+    columnas = [c for c in df.columns if c not in COLUMNAS_DISENO_BRFSS]
+    df[columnas] = df[columnas].replace(VALORES_INVALIDOS, np.nan)
+    return df
+
+
+def mapear_columna(df, col, mapa, reemplazar_nones=True, verbose=True):
+    """Mapea valores numéricos a etiquetas legibles"""
+    if col in df.columns:
+        antes = df[col].notna().sum()
+        df[col] = df[col].astype('Int64')
+        df[col] = df[col].apply(lambda x: mapa.get(x, np.nan) if pd.notna(x) else np.nan)
+        if reemplazar_nones:
+            df[col] = df[col].replace(['No sabe / No respondió', 'None'], np.nan)
+        despues = df[col].notna().sum()
+        if verbose:
+            print(f" Procesando '{col}': {antes:,} → {despues:,} valores válidos")
+    elif verbose:
+        print(f" Columna '{col}' no encontrada")
+
+
+def limpiar_numericas(df, verbose=True):
+    """Edad al diagnóstico (DIABAGE4) y bebidas azucaradas (SSBFRUT3)"""
+    if 'DIABAGE4' in df.columns:
+        df['DIABAGE4'] = pd.to_numeric(df['DIABAGE4'], errors='coerce')
+        df.loc[df['DIABAGE4'] > 97, 'DIABAGE4'] = np.nan
+        if verbose:
+            print(f"✓ Procesando 'DIABAGE4': edad al diagnóstico limpiada")
+
+    if 'SSBFRUT3' in df.columns:
+        df['SSBFRUT3'] = pd.to_numeric(df['SSBFRUT3'], errors='coerce')
+        if verbose:
+            print(f" Procesando 'SSBFRUT3': consumo de bebidas azucaradas")
+
+
+def calcular_imc_real(df):
+    """Crea IMC_REAL (= _BMI5 / 100) y anula valores fuera del rango registrado; devuelve cuántos se anularon"""
+    df['_BMI5'] = pd.to_numeric(df['_BMI5'], errors='coerce')
+    df['IMC_REAL'] = df['_BMI5'] / 100
+    _, violaciones = validar_rangos(df, RANGOS_VALIDOS, tabla='BRFSS', variables=['IMC_REAL'])
+    return int(violaciones['n_fuera_rango'].sum())
+
+
+def limites_iqr(q1, q3, factor=FACTOR_IQR):
+    """Límites (Q1 - k·IQR, Q3 + k·IQR)"""
+    iqr = q3 - q1
+    return q1 - factor * iqr, q3 + factor * iqr
+
+
+def marcar_outliers_imc(df, lower_bound, upper_bound):
+    """es_outlier_imc = 1 si IMC_REAL está fuera de los límites IQR"""
+    df['es_outlier_imc'] = (
+        (df['IMC_REAL'] < lower_bound) |
+        (df['IMC_REAL'] > upper_bound)
+    ).astype(int)
+
+
+def limpiar_bloque(df, limites_imc):
+    """Aplica limpieza, mapeos, IMC y variables derivadas a un bloque ya filtrado por columnas"""
+    df = reemplazar_invalidos(df)
+    df = df.dropna(how='all')
+
+    for col, mapa in MAPEOS_DEMOGRAFICOS + MAPEOS_SALUD + MAPEOS_DIABETES:
+        mapear_columna(df, col, mapa, verbose=False)
+    limpiar_numericas(df, verbose=False)
+
+    if '_BMI5' in df.columns:
+        calcular_imc_real(df)
+        marcar_outliers_imc(df, *limites_imc)
+        df['categoria_IMC'] = clasificar_imc(df['IMC_REAL'])
+
+    return crear_variables_derivadas(df)
+
+
+def imprimir_reporte_diabetes(cubo):
+    """Prevalencia general y por dimensión, leída del cubo de prevalencia"""
+    general = consultar_cubo(cubo, []).iloc[0]
+    print(f"\n PREVALENCIA GENERAL:")
+    print(f"  Total casos con diabetes: {int(general['con_diabetes']):,}")
+    print(f"  Total casos válidos: {int(general['total']):,}")
+    print(f"  Prevalencia: {general['prevalencia_pct']:.2f}%")
+
+    for dim, titulo in DIMENSIONES_REPORTE:
+        if dim in cubo.columns:
+            print(f"\n DIABETES POR {titulo}:")
+            tabla = consultar_cubo(cubo, [dim]).set_index(dim)[['total', 'con_diabetes', 'prevalencia_pct']]
+            tabla.columns = ['Total', 'Con_Diabetes', 'Prevalencia_%']
+            if dim == 'estilo_vida_saludable':
+                tabla.index = tabla.index.map({0: 'No Saludable', 1: 'Saludable'})
+            print(tabla)
+
+
+def imprimir_reporte_ponderado(estimaciones):
+    """Prevalencias ponderadas con EE e IC 95% (general y por dimensión)"""
+    columnas = ['n_muestra', 'prevalencia_pct', 'ee_pct', 'ic95_inf', 'ic95_sup']
+    general = consultar_ponderada(estimaciones, []).iloc[0]
+    print(f"\n PREVALENCIA PONDERADA GENERAL: {general['prevalencia_pct']:.2f}% "
+          f"(EE {general['ee_pct']:.2f}, IC 95% {general['ic95_inf']:.2f}-{general['ic95_sup']:.2f})")
+    print(f"  Población representada: {general['poblacion']:,.0f}")
+
+    for dim, titulo in DIMENSIONES_REPORTE:
+        tabla = consultar_ponderada(estimaciones, [dim])
+        if len(tabla):
+            print(f"\n DIABETES PONDERADA POR {titulo}:")
+            tabla = tabla.set_index(dim)[columnas].round(2)
+            if dim == 'estilo_vida_saludable':
+                tabla.index = tabla.index.map({0: 'No Saludable', 1: 'Saludable'})
+            print(tabla)
+
+    celdas = consultar_ponderada(estimaciones, ['_STATE', '_AGE_G', '_SEX'])
+    if len(celdas):
+        print(f"\n Celdas estado × edad × sexo estimadas: {len(celdas):,} "
+              f"(CV > 30%: {(celdas['cv_pct'] > 30).sum():,})")
+
+
+# ========================================
+# MODO POR BLOQUES (MEMORIA ACOTADA)
+# ========================================
+
+def primera_pasada(conn, tablas, tamano):
+    """Recorre las tablas fuente una vez y calcula las estadísticas globales.
+
+    Devuelve (n_filas, nulos por columna, columnas en orden, sketch KLL de
+    IMC_REAL, momentos de IMC_REAL). La memoria no depende del número de filas.
+    """
+    n_filas = 0
+    nulos = pd.Series(dtype='int64')
+    columnas = []
+    sketch_imc = SketchKLL()
+    momentos = {'n': 0, 'suma': 0.0, 'suma_cuadrados': 0.0, 'min': np.inf, 'max': -np.inf}
+
+    for tabla in tablas:
+        for bloque in leer_por_bloques(conn, tabla, tamano):
+            n_filas += len(bloque)
+            nulos = nulos.add(bloque.isnull().sum(), fill_value=0)
+            columnas += [c for c in bloque.columns if c not in columnas]
+
+            if '_BMI5' in bloque.columns:
+                imc = pd.to_numeric(bloque['_BMI5'].replace(VALORES_INVALIDOS, np.nan), errors='coerce') / 100
+                imc = imc[dentro_de_rango(imc, 'IMC_REAL')].to_numpy()
+                sketch_imc.actualizar(imc)
+                if len(imc):
+                    momentos['n'] += len(imc)
+                    momentos['suma'] += imc.sum()
+                    momentos['suma_cuadrados'] += (imc ** 2).sum()
+                    momentos['min'] = min(momentos['min'], imc.min())
+                    momentos['max'] = max(momentos['max'], imc.max())
+
+    return n_filas, nulos.reindex(columnas).astype('int64'), columnas, sketch_imc, momentos
+
+
+def procesar_por_bloques(conn, tablas_origen, tabla_destino, tamano):
+    """Limpia `tablas_origen` bloque a bloque y los agrega a `tabla_destino`.
+
+    El filtro de columnas (>75% NaN) y los límites IQR de IMC_REAL se calculan
+    en una primera pasada sobre todas las tablas; la segunda pasada aplica
+    limpieza, mapeos y scores a cada bloque y lo guarda codificado, de modo que
+    la memoria depende del tamaño de bloque y no del total de filas.
+    """
+    print("\n" + "="*60)
+    print("MODO POR BLOQUES - PASADA 1: ESTADÍSTICAS GLOBALES")
+    print("="*60)
+
+    n_filas, nulos, columnas, sketch_imc, momentos = primera_pasada(conn, tablas_origen, tamano)
+    col_nan_pct = nulos / n_filas if n_filas else nulos
+    cols_to_drop = col_nan_pct[col_nan_pct > UMBRAL_NAN_COLUMNA].index.tolist()
+    columnas_finales = [c for c in columnas if c not in cols_to_drop]
+
+    # Q1/Q3 desde el sketch KLL (error de rango p99 ~1%, ver utilidades/cuantiles.py)
+    q1, q3 = sketch_imc.cuantiles([0.25, 0.75])
+    limites_imc = limites_iqr(q1, q3)
+    guardar_sketch(conn, 'BRFSS_IMC_REAL', sketch_imc)
+
+    print(f" Tablas fuente: {', '.join(tablas_origen)}")
+    print(f" Filas totales: {n_filas:,} | Columnas: {len(columnas)}")
+    print(f" Columnas eliminadas (>75% NaN): {len(cols_to_drop)}")
+    print(f" Rango normal IMC (IQR): {limites_imc[0]:.1f} - {limites_imc[1]:.1f}")
+
+    print("\n" + "="*60)
+    print(f"MODO POR BLOQUES - PASADA 2: LIMPIEZA ({tamano:,} filas por bloque)")
+    print("="*60)
+
+    n_final = 0
+    n_outliers = 0
+    no_nulos = pd.Series(dtype='int64')
+    dist_imc = pd.Series(dtype='int64')
+    base_cubo = None
+    hay_psu = False
+    multiples_origenes = len(tablas_origen) > 1
+    primero = True
+
+    for origen, tabla in enumerate(tablas_origen):
+        for i, bloque in enumerate(leer_por_bloques(conn, tabla, tamano), start=1):
+            bloque = limpiar_bloque(bloque.reindex(columns=columnas_finales), limites_imc)
+
+            n_final += len(bloque)
+            no_nulos = no_nulos.add(bloque.count(), fill_value=0)
+            if 'es_outlier_imc' in bloque.columns:
+                n_outliers += int(bloque['es_outlier_imc'].sum())
+                dist_imc = dist_imc.add(bloque['categoria_IMC'].value_counts(), fill_value=0)
+            if 'tiene_diabetes' in bloque.columns:
+                base_cubo = combinar_bases(base_cubo, agregar_base(bloque, DIMENSIONES_CUBO_BRFSS))
+
+            codificar_columnas(bloque)
+            # Agregado por PSU (una fila por encuestado) con las dimensiones ya en
+            # códigos enteros, acumulado en una tabla de paso de SQLite
+            if 'tiene_diabetes' in bloque.columns and tiene_diseno(bloque):
+                parte_psu = agregar_psu(bloque, DIMENSIONES_CUBO_BRFSS)
+                if multiples_origenes:
+                    parte_psu = codificar_estratos(parte_psu, origen)
+                acumular_psu(conn, parte_psu, primero=not hay_psu)
+                hay_psu = True
+            bloque.to_sql(tabla_destino, conn, if_exists="replace" if primero else "append", index=False)
+            primero = False
+            print(f"  ✓ {tabla} bloque {i}: {len(bloque):,} filas → {tabla_destino}")
+
+    guardar_dimensiones(conn)
+    crear_vista_etiquetas(conn, tabla_destino, f"V_{tabla_destino}")
+    for idx_query in INDICES_BRFSS:
+        conn.execute(idx_query.replace("BRFSS_2024_LIMPIO", tabla_destino))
+    conn.commit()
+
+    # Cubo de prevalencia: se expande una vez a partir de los agregados de cada bloque
+    cubo = expandir_cubo(base_cubo) if base_cubo is not None else None
+    if cubo is not None:
+        guardar_cubo(conn, cubo)
+
+    # Estimaciones ponderadas: los agregados por PSU de cada bloque se suman en SQLite
+    agregado_psu = leer_psu_acumulado(conn) if hay_psu else None
+    if agregado_psu is not None:
+        decodificar_categorias(agregado_psu)
+    estimaciones = estimar_dominios(agregado_psu) if agregado_psu is not None else None
+    if estimaciones is not None and len(estimaciones):
+        guardar_ponderadas(conn, estimaciones)
+
+    # Reportes a partir de los agregados parciales
+    print("\n" + "="*60)
+    print("MODO POR BLOQUES: ESTADÍSTICAS FINALES")
+    print("="*60)
+    print(f"\n Registros finales: {n_final:,} (eliminados: {n_filas - n_final:,})")
+    if n_final:
+        print(f" Completitud global: {no_nulos.sum() / (n_final * len(no_nulos)) * 100:.2f}%")
+        print(f" Outliers IMC: {n_outliers:,} ({n_outliers / n_final * 100:.2f}%)")
+
+    if momentos['n'] > 1:
+        n = momentos['n']
+        media = momentos['suma'] / n
+        varianza = (momentos['suma_cuadrados'] - n * media ** 2) / (n - 1)
+        print("\n ESTADÍSTICAS DE IMC:")
+        print(f"  Media: {media:.2f}")
+        print(f"  Mediana (sketch): {sketch_imc.cuantil(0.5):.2f}")
+        print(f"  Desviación estándar: {np.sqrt(max(varianza, 0)):.2f}")
+        print(f"  Mínimo: {momentos['min']:.2f}")
+        print(f"  Máximo: {momentos['max']:.2f}")
+        print("\n Distribución por categoría de IMC:")
+        print(dist_imc.astype('int64').sort_index())
+
+    if cubo is not None:
+        print(f"\n Cubo de prevalencia: {len(cubo):,} celdas guardadas")
+        imprimir_reporte_diabetes(cubo)
+    if estimaciones is not None and len(estimaciones):
+        imprimir_reporte_ponderado(estimaciones)
+
+    return n_final
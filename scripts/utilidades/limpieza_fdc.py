@@ -0,0 +1,74 @@
+import pandas as pd
+
+from utilidades.carga import leer_por_bloques, columnas_tabla
+
+# ========================================
+# LIMPIEZA FDC_FOOD_NUTRIENT POR BLOQUES
+# ========================================
+# Para Branded Foods (millones de filas en food_nutrient.csv) la tabla no
+# cabe completa en memoria. Cada bloque se limpia por separado:
+#   - amount nulo o negativo
+#   - duplicados (fdc_id, nutrient_id) dentro del bloque con drop_duplicates,
+#     y entre bloques con un índice UNIQUE en la tabla destino + INSERT OR
+#     IGNORE: se conserva el primer registro, igual que keep='first'
+# La integridad referencial no se revisa aquí: se aplica después sobre la
+# tabla destino con anti-joins (utilidades.integridad_referencial). Un par
+# huérfano lo es en todas sus filas, así que filtrar antes o después de
+# quitar duplicados da el mismo resultado.
+# La memoria depende del tamaño de bloque, no del número de filas ni de ids.
+
+CLAVE_FOOD_NUTRIENT = ['fdc_id', 'nutrient_id']
+
+
+def limpiar_bloque_food_nutrient(bloque):
+    """Mismos filtros que el modo completo, aplicados a un bloque"""
+    bloque = bloque[bloque['amount'].notna()].copy()
+    bloque['amount'] = pd.to_numeric(bloque['amount'], errors='coerce')
+    bloque = bloque[bloque['amount'] >= 0]
+    return bloque.drop_duplicates(subset=CLAVE_FOOD_NUTRIENT, keep='first')
+
+
+def limpiar_food_nutrient_por_bloques(conn, origen, destino, tamano):
+    """Limpia `origen` bloque a bloque hacia `destino`; devuelve (filas leídas, filas guardadas)"""
+    temporal = f"{destino}_BLOQUE"
+    conn.execute(f'DROP TABLE IF EXISTS "{destino}"')
+    n_original = 0
+    creada = False
+
+    for i, bloque in enumerate(leer_por_bloques(conn, origen, tamano), start=1):
+        n_original += len(bloque)
+        bloque = limpiar_bloque_food_nutrient(bloque)
+
+        if not creada:
+            bloque.head(0).to_sql(destino, conn, if_exists="replace", index=False)
+            clave = ', '.join(f'"{c}"' for c in CLAVE_FOOD_NUTRIENT)
+            conn.execute(
+                f'CREATE UNIQUE INDEX IF NOT EXISTS idx_{destino.lower()}_clave ON "{destino}"({clave})'
+            )
+            creada = True
+
+        # Registros ya guardados por un bloque anterior se ignoran (keep='first')
+        bloque.to_sql(temporal, conn, if_exists="replace", index=False)
+        columnas = ', '.join(f'"{c}"' for c in bloque.columns)
+        conn.execute(f'INSERT OR IGNORE INTO "{destino}" ({columnas}) SELECT {columnas} FROM "{temporal}"')
+        conn.commit()
+        print(f"  ✓ {origen} bloque {i}: {len(bloque):,} registros válidos")
+
+    conn.execute(f'DROP TABLE IF EXISTS "{temporal}"')
+    conn.commit()
+    if not creada:
+        return n_original, 0
+    n_final = conn.execute(f'SELECT COUNT(*) FROM "{destino}"').fetchone()[0]
+    return n_original, n_final
+
+
+def eliminar_columnas_vacias(conn, tabla):
+    """Quita las columnas sin ningún valor (equivalente a dropna(axis=1, how='all'))"""
+    columnas = columnas_tabla(conn, tabla)
+    seleccion = ', '.join(f'COUNT("{c}")' for c in columnas)
+    conteos = conn.execute(f'SELECT {seleccion} FROM "{tabla}"').fetchone()
+    vacias = [c for c, n in zip(columnas, conteos) if n == 0]
+    for col in vacias:
+        conn.execute(f'ALTER TABLE "{tabla}" DROP COLUMN "{col}"')
+    conn.commit()
+    return vacias
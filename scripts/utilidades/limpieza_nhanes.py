@@ -0,0 +1,251 @@
+import os
+import sqlite3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+
+from utilidades.validacion_rangos import RANGOS_VALIDOS, COLUMNAS_VIOLACIONES, validar_rangos
+from utilidades.ciclos_nhanes import separar_nombre, armonizar_tabla
+from utilidades.tipos_compactos import optimizar_tipos
+
+# ========================================
+# PARÁMETROS DE LIMPIEZA NHANES
+# ========================================
+threshold_nan_col = 0.70
+threshold_nan_row = 0.70
+
+DEMO_MAPPINGS = {
+    "RIAGENDR": {
+        1: "Hombre",
+        2: "Mujer"
+    },
+    "DMDBORN4": {
+        1: "Nacido en EE.UU.",
+        2: "Otros países",
+        77: np.nan,  # Se negó a responder
+        99: np.nan   # No sabe
+    },
+    "DMDEDUC2": {
+        1: "Menos de 9º grado",
+        2: "9-11º grado",
+        3: "Graduado secundaria",
+        4: "Alguna universidad/AA",
+        5: "Graduado universitario",
+        7: np.nan,
+        9: np.nan
+    },
+    "DMDHHSIZ": {
+        1: "1 persona", 2: "2 personas", 3: "3 personas",
+        4: "4 personas", 5: "5 personas", 6: "6 personas",
+        7: "7 o más personas"
+    },
+    "DMDHRAGZ": {
+        1: "<20 años",
+        2: "20-39 años",
+        3: "40-59 años",
+        4: "60+ años"
+    },
+    "DMDHRGND": {
+        1: "Hombre",
+        2: "Mujer"
+    },
+    "DMDMARTZ": {
+        1: "Casado/Vive con pareja",
+        2: "Viudo/Divorciado/Separado",
+        3: "Nunca se casó",
+        77: np.nan,
+        99: np.nan
+    },
+    "RIDRETH3": {  # Raza/Etnicidad (importante para diabetes)
+        1: "Mexicano-Americano",
+        2: "Otro Hispano",
+        3: "Blanco no hispano",
+        4: "Negro no hispano",
+        6: "Asiático no hispano",
+        7: "Otra raza"
+    }
+}
+
+# Los rangos válidos (fuera de rango pasa a NaN) están en el registro único
+# utilidades/validacion_rangos.RANGOS_VALIDOS
+VARIABLES_BMX = ['BMXWT', 'BMXHT', 'BMXBMI', 'BMXWAIST', 'BMXHIP']
+
+# Tabla (nombre base, sin ciclo) → (variable, etiqueta del mensaje)
+VARIABLES_LABORATORIO = {
+    'GHB': ('LBXGH', "HbA1c limpiada"),
+    'GLU': ('LBXGLU', "Glucosa limpiada"),
+    'TCHOL': ('LBXTC', "Colesterol total limpiado"),
+    'HDL': ('LBDHDD', "HDL limpiado"),
+}
+
+VARS_DIETA = ['TKCAL', 'TCARB', 'TSUGR', 'TFIBE', 'TTFAT', 'TSFAT', 'TCHOL', 'TSODI', 'TPROT']
+
+
+# ========================================
+# PASO 1: LIMPIEZA GLOBAL (POR TABLA)
+# ========================================
+
+def limpiar_global(df, name):
+    """Elimina columnas/filas con exceso de NaN; devuelve (df_limpio, resumen)"""
+    original_shape = df.shape
+
+    if separar_nombre(name)[0] == 'FASTQX':
+        # Regla especial FASTQX (90% de threshold)
+        col_nan_pct = df.isnull().sum() / len(df)
+        cols_to_drop = col_nan_pct[col_nan_pct > 0.90].index.tolist()
+        df_limpio = df.drop(columns=cols_to_drop)
+        row_nan_pct = df_limpio.isnull().sum(axis=1) / df_limpio.shape[1]
+        df_limpio = df_limpio[row_nan_pct < 1.0]
+    else:
+        # Limpieza estándar
+        col_nan_pct = df.isnull().sum() / len(df)
+        cols_to_drop = col_nan_pct[col_nan_pct > threshold_nan_col].index.tolist()
+        df_limpio = df.drop(columns=cols_to_drop)
+        row_nan_pct = df_limpio.isnull().sum(axis=1) / df_limpio.shape[1]
+        df_limpio = df_limpio[row_nan_pct <= threshold_nan_row]
+
+    final_shape = df_limpio.shape
+    completitud = (1 - df_limpio.isnull().sum().sum() / (df_limpio.shape[0] * df_limpio.shape[1])) * 100
+
+    resumen = {
+        'dataset': name,
+        'filas_original': original_shape[0],
+        'filas_final': final_shape[0],
+        'cols_original': original_shape[1],
+        'cols_final': final_shape[1],
+        'cols_eliminadas': len(cols_to_drop),
+        'completitud_pct': completitud
+    }
+    return df_limpio, resumen
+
+
+# ========================================
+# PASO 2: LIMPIEZA ESPECÍFICA (POR TABLA)
+# ========================================
+
+def limpiar_demo(df, name):
+    for col, mapping in DEMO_MAPPINGS.items():
+        if col in df.columns:
+            df[col] = df[col].map(mapping)
+
+    # Variables numéricas
+    for col in ['RIDAGEYR', 'INDFMPIR']:  # INDFMPIR: ratio ingreso/pobreza
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df, [f"  ✓ {name}: Variables demográficas mapeadas"]
+
+
+def limpiar_bmx(df, name):
+    # Los outliers ya se anularon con el registro de rangos
+    for var in VARIABLES_BMX:
+        if var in df.columns:
+            df[var] = pd.to_numeric(df[var], errors='coerce')
+    return df, [f"  ✓ {name}: Variables antropométricas validadas"]
+
+
+def limpiar_laboratorio(df, name):
+    var, etiqueta = VARIABLES_LABORATORIO[separar_nombre(name)[0]]
+    if var not in df.columns:
+        return df, [f"   {var} no encontrada en {name}"]
+    df[var] = pd.to_numeric(df[var], errors='coerce')
+    return df, [f"   {name}: {etiqueta} (n={df[var].notna().sum():,})"]
+
+
+def limpiar_trigliceridos(df, name):
+    # LBDTRSI: nombre alternativo (mmol/L, sin rango en mg/dL en el registro)
+    for var in ['LBXTR', 'LBDTRSI']:
+        if var in df.columns:
+            df[var] = pd.to_numeric(df[var], errors='coerce')
+            return df, [f"  ✓ {name}: Triglicéridos limpiados (n={df[var].notna().sum():,})"]
+    return df, [f"   LBXTR/LBDTRSI no encontrada en {name}"]
+
+
+def limpiar_dieta(df, name):
+    dia = name[2]
+    for var in VARS_DIETA:
+        col = f'DR{dia}{var}'
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df, [f"   {name}: Variables dietéticas limpiadas (día {dia})"]
+
+
+def limpiar_numerico(df, name):
+    # Convertir todas las columnas numéricas
+    for col in df.columns:
+        if col != 'SEQN':  # No convertir el ID
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df, [f"  ✓ {name}: Convertido a numérico"]
+
+
+def limpiar_tabla(df, name):
+    """Mapeos y conversión numérica según la tabla (de cualquier ciclo); devuelve (df, mensajes)"""
+    base = separar_nombre(name)[0]
+    if base == 'DEMO':
+        return limpiar_demo(df, name)
+    if base == 'BMX':
+        return limpiar_bmx(df, name)
+    if base in VARIABLES_LABORATORIO:
+        return limpiar_laboratorio(df, name)
+    if base == 'TRIGLY':
+        return limpiar_trigliceridos(df, name)
+    if base in ('DR1TOT', 'DR2TOT'):
+        return limpiar_dieta(df, name)
+    return limpiar_numerico(df, name)
+
+
+def limpiar_especifica(df, name):
+    """Limpieza de variables clave según la tabla; devuelve (df, mensajes, violaciones).
+
+    Primero se validan en una sola pasada todas las variables de la tabla que
+    figuran en el registro de rangos; luego se aplican mapeos y conversiones.
+    """
+    df = df.copy()
+    violaciones = pd.DataFrame(columns=COLUMNAS_VIOLACIONES)
+    try:
+        df, violaciones = validar_rangos(df, RANGOS_VALIDOS, tabla=name)
+        df, mensajes = limpiar_tabla(df, name)
+        return df, mensajes, violaciones
+    except Exception as e:
+        return df, [f"  ✗ Error en {name}: {e}"], violaciones
+
+
+# ========================================
+# EJECUCIÓN EN PARALELO
+# ========================================
+
+def procesar_tabla(name, ruta_db):
+    """Trabajo independiente por tabla: lee, limpia (PASO 1 y 2) y devuelve el resultado.
+
+    La tabla limpia vuelve con tipos compactos (optimizar_tipos) junto a su
+    reporte de tipos, para que el proceso principal reciba y guarde menos
+    memoria; restaurar_tipos la devuelve con los valores originales.
+    """
+    try:
+        with sqlite3.connect(ruta_db) as conn:
+            df = pd.read_sql(f"SELECT * FROM {name}", conn)
+        # Variables de ciclos anteriores con el nombre/códigos del ciclo actual
+        df = armonizar_tabla(df)
+        df_limpio, resumen = limpiar_global(df, name)
+        df_limpio, mensajes, violaciones = limpiar_especifica(df_limpio, name)
+        df_limpio, tipos = optimizar_tipos(df_limpio, excluir=['SEQN'])
+        return name, df_limpio, tipos, resumen, mensajes, violaciones, None
+    except Exception as e:
+        return name, None, None, None, [], None, str(e)
+
+
+def limpiar_tablas(tablas, ruta_db, n_procesos=None):
+    """Ejecuta procesar_tabla para cada tabla y devuelve los resultados en el orden de `tablas`.
+
+    Usa un pool de procesos con 'fork' (los trabajadores heredan el módulo ya
+    cargado y no re-ejecutan el script). Con un solo proceso, o donde 'fork'
+    no existe, se procesa en serie.
+    """
+    n_procesos = n_procesos or os.cpu_count() or 1
+    n_procesos = min(n_procesos, len(tablas))
+
+    if n_procesos <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return [procesar_tabla(name, ruta_db) for name in tablas]
+
+    with ProcessPoolExecutor(max_workers=n_procesos, mp_context=multiprocessing.get_context('fork')) as pool:
+        return list(pool.map(procesar_tabla, tablas, [ruta_db] * len(tablas)))
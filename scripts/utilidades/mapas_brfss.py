@@ -0,0 +1,200 @@
+import pandas as pd
+
+# ========================================
+# MAPAS DE CÓDIGOS BRFSS → ETIQUETAS
+# ========================================
+
+estado_map = {
+    1:"Alabama",2:"Alaska",4:"Arizona",5:"Arkansas",6:"California",
+    8:"Colorado",9:"Connecticut",10:"Delaware",11:"Distrito de Columbia",
+    12:"Florida",13:"Georgia",15:"Hawái",16:"Idaho",17:"Illinois",
+    18:"Indiana",19:"Iowa",20:"Kansas",21:"Kentucky",22:"Louisiana",
+    23:"Maine",24:"Maryland",25:"Massachusetts",26:"Michigan",
+    27:"Minnesota",28:"Mississippi",29:"Missouri",30:"Montana",
+    31:"Nebraska",32:"Nevada",33:"New Hampshire",34:"New Jersey",
+    35:"New Mexico",36:"New York",37:"North Carolina",38:"North Dakota",
+    39:"Ohio",40:"Oklahoma",41:"Oregon",42:"Pennsylvania",
+    44:"Rhode Island",45:"South Carolina",46:"South Dakota",
+    47:"Tennessee",48:"Texas",49:"Utah",50:"Vermont",
+    51:"Virginia",53:"Washington",54:"West Virginia",55:"Wisconsin",
+    56:"Wyoming"
+}
+
+marital_map = {
+    1:'Casado/a',2:'Divorciado/a',3:'Viudo/a',4:'Separado/a',
+    5:'Nunca se ha casado',6:'Pareja no casada',9:'No sabe / No respondió'
+}
+
+educag_map = {
+    1:'No completó secundaria',
+    2:'Graduado de secundaria',
+    3:'Asistió a universidad o escuela técnica',
+    4:'Graduado de universidad o escuela técnica',
+    9:'No sabe / Falta de información'
+}
+
+children_map = {
+    1:'Sin niños en el hogar',2:'1 niño en el hogar',3:'2 niños en el hogar',
+    4:'3 niños en el hogar',5:'4 niños en el hogar',6:'5 o más niños en el hogar',
+    9:'No sabe / No respondió'
+}
+
+income_map = {
+    1:'Menos de $15,000',2:'$15,000 a < $25,000',3:'$25,000 a < $35,000',
+    4:'$35,000 a < $50,000',5:'$50,000 a < $100,000',6:'$100,000 a < $200,000',
+    7:'$200,000 o más',9:'No sabe / No respondió'
+}
+
+age_g_map = {1:'18-24',2:'25-34',3:'35-44',4:'45-54',5:'55-64',6:'65+'}
+
+sex_map = {1:'Hombre',2:'Mujer'}
+
+urbstat_map = {1:'Urbano',2:'Rural'}
+
+metstat_map = {1:'Condados metropolitanos',2:'Condados no metropolitanos'}
+
+medcost_map = {
+    1:'Sí, no pudo pagar',2:'No',
+    7:'No sabe / Incertidumbre',9:'Se negó a responder'
+}
+
+checkup_map = {
+    1:'En el último año (<12 meses)',2:'Hace 1 a 2 años',3:'Hace 2 a 5 años',
+    4:'Hace 5 o más años',7:'No sabe / Incertidumbre',8:'Nunca',9:'Se negó a responder'
+}
+
+diabetes_map = {
+    1: 'Sí',
+    2: 'Sí, solo durante embarazo',
+    3: 'No',
+    4: 'No, prediabetes',
+    7: 'No sabe',
+    9: 'Se negó'
+}
+
+prediab_map = {1: 'Sí', 2: 'No', 7: 'No sabe', 9: 'Se negó'}
+
+diabtype_map = {
+    1: 'Tipo 1',
+    2: 'Tipo 2',
+    3: 'Gestacional',
+    4: 'Otro tipo',
+    7: 'No sabe',
+    9: 'Se negó'
+}
+
+ejercicio_map = {1: 'Sí', 2: 'No', 7: 'No sabe', 9: 'Se negó'}
+
+smoker_map = {
+    1: 'Fumador actual diario',
+    2: 'Fumador actual ocasional',
+    3: 'Ex-fumador',
+    4: 'Nunca ha fumado',
+    9: 'No sabe'
+}
+
+alcohol_map = {1: 'Sí', 2: 'No', 7: 'No sabe', 9: 'Se negó'}
+
+# Variables derivadas (los códigos se asignan aquí, no vienen del CDC)
+categoria_imc_map = {1: 'Bajo peso', 2: 'Normal', 3: 'Sobrepeso', 4: 'Obesidad', 5: 'Desconocido'}
+
+categoria_riesgo_map = {1: 'Bajo', 2: 'Moderado', 3: 'Alto', 4: 'Desconocido'}
+
+# Orden de mapeo usado por la limpieza (columna, mapa)
+MAPEOS_DEMOGRAFICOS = [
+    ("_STATE", estado_map), ("MARITAL", marital_map), ("_EDUCAG", educag_map),
+    ("_CHLDCNT", children_map), ("_INCOMG1", income_map), ("_AGE_G", age_g_map),
+    ("_SEX", sex_map), ("_URBSTAT", urbstat_map), ("_METSTAT", metstat_map)
+]
+
+MAPEOS_SALUD = [("MEDCOST1", medcost_map), ("CHECKUP1", checkup_map)]
+
+MAPEOS_DIABETES = [
+    ("DIABETE4", diabetes_map), ("PREDIAB2", prediab_map), ("DIABTYPE", diabtype_map),
+    ("EXERANY2", ejercicio_map), ("_SMOKER3", smoker_map), ("DRNK3GE5", alcohol_map)
+]
+
+# Columna → (tabla de dimensión, mapa código → etiqueta)
+DIMENSIONES_BRFSS = {
+    '_STATE': ('DIM_ESTADO', estado_map),
+    'MARITAL': ('DIM_ESTADO_CIVIL', marital_map),
+    '_EDUCAG': ('DIM_EDUCACION', educag_map),
+    '_CHLDCNT': ('DIM_NINOS_HOGAR', children_map),
+    '_INCOMG1': ('DIM_INGRESO', income_map),
+    '_AGE_G': ('DIM_GRUPO_EDAD', age_g_map),
+    '_SEX': ('DIM_SEXO', sex_map),
+    '_URBSTAT': ('DIM_URBANIDAD', urbstat_map),
+    '_METSTAT': ('DIM_METROPOLITANO', metstat_map),
+    'MEDCOST1': ('DIM_COSTO_MEDICO', medcost_map),
+    'CHECKUP1': ('DIM_CHEQUEO', checkup_map),
+    'DIABETE4': ('DIM_DIABETES', diabetes_map),
+    'PREDIAB2': ('DIM_PREDIABETES', prediab_map),
+    'DIABTYPE': ('DIM_TIPO_DIABETES', diabtype_map),
+    'EXERANY2': ('DIM_EJERCICIO', ejercicio_map),
+    '_SMOKER3': ('DIM_TABAQUISMO', smoker_map),
+    'DRNK3GE5': ('DIM_ALCOHOL_EXCESIVO', alcohol_map),
+    'categoria_IMC': ('DIM_CATEGORIA_IMC', categoria_imc_map),
+    'categoria_riesgo': ('DIM_CATEGORIA_RIESGO', categoria_riesgo_map),
+}
+
+
+# ========================================
+# CODIFICACIÓN / DECODIFICACIÓN
+# ========================================
+
+def codificar_columnas(df, dimensiones=DIMENSIONES_BRFSS):
+    """Reemplaza etiquetas por su código entero (Int8) en las columnas de dimensión"""
+    for col, (_, mapa) in dimensiones.items():
+        if col in df.columns:
+            inverso = {etiqueta: codigo for codigo, etiqueta in mapa.items()}
+            df[col] = df[col].map(inverso).astype('Int8')
+    return df
+
+
+def decodificar_columnas(df, dimensiones=DIMENSIONES_BRFSS):
+    """Restaura las etiquetas a partir de los códigos enteros"""
+    for col, (_, mapa) in dimensiones.items():
+        if col in df.columns:
+            df[col] = df[col].map(mapa)
+    return df
+
+
+def decodificar_categorias(df, dimensiones=DIMENSIONES_BRFSS):
+    """Etiquetas como category (categorías en orden alfabético, igual que agrupar el texto)"""
+    for col, (_, mapa) in dimensiones.items():
+        if col in df.columns:
+            df[col] = pd.Categorical(df[col].map(mapa), categories=sorted(set(mapa.values())))
+    return df
+
+
+def guardar_dimensiones(conn, dimensiones=DIMENSIONES_BRFSS):
+    """Crea una tabla DIM_* (codigo, etiqueta) por cada mapa"""
+    for col, (tabla_dim, mapa) in dimensiones.items():
+        df_dim = pd.DataFrame({'codigo': list(mapa.keys()), 'etiqueta': list(mapa.values())})
+        df_dim.to_sql(tabla_dim, conn, if_exists="replace", index=False)
+        conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_{tabla_dim.lower()}_codigo ON {tabla_dim}(codigo)')
+
+
+def crear_vista_etiquetas(conn, tabla, vista, dimensiones=DIMENSIONES_BRFSS):
+    """Crea una vista con las mismas columnas que `tabla` pero con etiquetas legibles.
+
+    Las columnas codificadas se resuelven con LEFT JOIN a su tabla DIM_*; el resto
+    se devuelve tal cual. Los identificadores van entre comillas dobles para que la
+    misma definición sirva en SQLite y en PostgreSQL.
+    """
+    columnas = [fila[1] for fila in conn.execute(f'PRAGMA table_info("{tabla}")').fetchall()]
+
+    select, joins = [], []
+    for i, col in enumerate(columnas):
+        if col in dimensiones:
+            alias = f"d{i}"
+            select.append(f'{alias}.etiqueta AS "{col}"')
+            joins.append(f'LEFT JOIN "{dimensiones[col][0]}" {alias} ON {alias}.codigo = t."{col}"')
+        else:
+            select.append(f't."{col}"')
+
+    conn.execute(f'DROP VIEW IF EXISTS "{vista}"')
+    conn.execute(
+        f'CREATE VIEW "{vista}" AS SELECT ' + ', '.join(select) +
+        f' FROM "{tabla}" t ' + ' '.join(joins)
+    )
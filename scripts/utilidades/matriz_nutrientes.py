@@ -0,0 +1,161 @@
+import io
+import pandas as pd
+import numpy as np
+from scipy import sparse
+
+# ========================================
+# MATRIZ DISPERSA ALIMENTO × NUTRIENTE (FDC)
+# ========================================
+# FDC_FOOD_NUTRIENT es una lista larga (fdc_id, nutrient_id, amount): cada
+# alimento informa pocas decenas de los ~470 nutrientes, así que la tabla
+# pivoteada queda casi vacía (en Branded Foods, millones de registros).
+# Se guarda como CSR (una fila por fdc_id, una columna por nutrient_id) con
+# los mapas de ids ordenados, como los índices de pivot_table.
+#
+# Los 0 informados se guardan explícitos: una celda sin dato es NaN al
+# densificar, no 0. Con registros repetidos se queda el primero no nulo
+# (igual que pivot_table(aggfunc='first')).
+
+
+class MatrizNutrientes:
+    """Montos por alimento (filas) y nutriente (columnas) en formato CSR"""
+
+    def __init__(self, matriz, fdc_ids, nutrient_ids):
+        self.matriz = matriz
+        self.fdc_ids = np.asarray(fdc_ids)
+        self.nutrient_ids = np.asarray(nutrient_ids)
+
+    @classmethod
+    def desde_registros(cls, df, nutrientes=None, fila='fdc_id', columna='nutrient_id', valor='amount'):
+        """Construye la matriz desde registros largos (opcionalmente solo `nutrientes`)"""
+        return cls.desde_bloques([df], nutrientes, fila, columna, valor)
+
+    @classmethod
+    def desde_bloques(cls, bloques, nutrientes=None, fila='fdc_id', columna='nutrient_id', valor='amount'):
+        """Igual que desde_registros, leyendo los registros por bloques (solo se acumulan 3 arreglos)"""
+        partes_fdc, partes_nutriente, partes_monto = [], [], []
+        for bloque in bloques:
+            registros = bloque[[fila, columna, valor]]
+            if nutrientes is not None:
+                registros = registros[registros[columna].isin(list(nutrientes))]
+            registros = registros[registros[valor].notna()]
+            partes_fdc.append(registros[fila].to_numpy())
+            partes_nutriente.append(registros[columna].to_numpy())
+            partes_monto.append(registros[valor].to_numpy(dtype='float64'))
+
+        fdc_ids, filas = np.unique(np.concatenate(partes_fdc), return_inverse=True)
+        nutrient_ids, columnas = np.unique(np.concatenate(partes_nutriente), return_inverse=True)
+        montos = np.concatenate(partes_monto)
+
+        # Orden estable por (fila, columna): el primer registro de cada celda queda primero
+        orden = np.lexsort((columnas, filas))
+        filas, columnas, montos = filas[orden], columnas[orden], montos[orden]
+        primero = np.ones(len(filas), dtype=bool)
+        primero[1:] = (filas[1:] != filas[:-1]) | (columnas[1:] != columnas[:-1])
+        filas, columnas, montos = filas[primero], columnas[primero], montos[primero]
+
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(filas, minlength=len(fdc_ids)))])
+        matriz = sparse.csr_matrix(
+            (montos, columnas.astype('int32'), indptr.astype('int64')),
+            shape=(len(fdc_ids), len(nutrient_ids))
+        )
+        return cls(matriz, fdc_ids, nutrient_ids)
+
+    @property
+    def forma(self):
+        return self.matriz.shape
+
+    @property
+    def n_valores(self):
+        return int(self.matriz.nnz)
+
+    def seleccionar_nutrientes(self, nutrientes):
+        """Submatriz con las columnas de `nutrientes` presentes (en el orden de la matriz)"""
+        pedidos = np.isin(self.nutrient_ids, list(nutrientes))
+        posicion = np.full(len(self.nutrient_ids), -1, dtype='int64')
+        posicion[pedidos] = np.arange(pedidos.sum())
+
+        nuevas = posicion[self.matriz.indices]
+        conservar = nuevas >= 0
+        filas = np.repeat(np.arange(self.forma[0]), np.diff(self.matriz.indptr))[conservar]
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(filas, minlength=self.forma[0]))])
+        matriz = sparse.csr_matrix(
+            (self.matriz.data[conservar], nuevas[conservar].astype('int32'), indptr.astype('int64')),
+            shape=(self.forma[0], int(pedidos.sum()))
+        )
+        return MatrizNutrientes(matriz, self.fdc_ids, self.nutrient_ids[pedidos])
+
+    def densificar(self):
+        """Arreglo denso filas × nutrientes con NaN donde no hay dato"""
+        denso = np.full(self.forma, np.nan)
+        filas = np.repeat(np.arange(self.forma[0]), np.diff(self.matriz.indptr))
+        denso[filas, self.matriz.indices] = self.matriz.data
+        return denso
+
+    def a_dataframe(self, nombres=None, fila='fdc_id'):
+        """Tabla ancha fdc_id + una columna por nutriente, solo alimentos con algún dato.
+
+        Equivale a pivot_table(index='fdc_id', columns='nutrient_id', aggfunc='first').reset_index();
+        `nombres` ({nutrient_id: nombre}) renombra las columnas.
+        """
+        nombres = nombres or {}
+        con_datos = np.diff(self.matriz.indptr) > 0
+        denso = self.densificar()[con_datos]
+        columnas = [nombres.get(n, f'nutrient_{n}') for n in self.nutrient_ids.tolist()]
+        tabla = pd.DataFrame(denso, columns=columnas)
+        tabla.insert(0, fila, self.fdc_ids[con_datos])
+        return tabla
+
+    def a_bytes(self):
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer, data=self.matriz.data, indices=self.matriz.indices, indptr=self.matriz.indptr,
+            fdc_ids=self.fdc_ids, nutrient_ids=self.nutrient_ids
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        contenido = np.load(io.BytesIO(datos))
+        fdc_ids, nutrient_ids = contenido['fdc_ids'], contenido['nutrient_ids']
+        matriz = sparse.csr_matrix(
+            (contenido['data'], contenido['indices'], contenido['indptr']),
+            shape=(len(fdc_ids), len(nutrient_ids))
+        )
+        return cls(matriz, fdc_ids, nutrient_ids)
+
+
+# ========================================
+# PERSISTENCIA
+# ========================================
+
+def guardar_matriz(conn, nombre, matriz):
+    """Guarda la matriz en la tabla MATRIZ_NUTRIENTES (una fila por nombre)"""
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS MATRIZ_NUTRIENTES "
+        "(nombre TEXT PRIMARY KEY, n_alimentos INTEGER, n_nutrientes INTEGER, "
+        "n_valores INTEGER, datos BLOB, actualizado TEXT)"
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO MATRIZ_NUTRIENTES VALUES (?, ?, ?, ?, ?, datetime('now'))",
+        (nombre, matriz.forma[0], matriz.forma[1], matriz.n_valores, matriz.a_bytes())
+    )
+    conn.commit()
+
+
+def cargar_matriz(conn, nombre):
+    """Devuelve la matriz guardada con `nombre`, o None si no existe"""
+    try:
+        fila = conn.execute("SELECT datos FROM MATRIZ_NUTRIENTES WHERE nombre = ?", (nombre,)).fetchone()
+    except Exception:
+        return None
+    return MatrizNutrientes.desde_bytes(fila[0]) if fila else None
+
+
+def resumen_matriz(matriz):
+    """Texto con dimensiones, valores guardados y densidad"""
+    celdas = matriz.forma[0] * matriz.forma[1]
+    densidad = matriz.n_valores / celdas * 100 if celdas else 0
+    megas = (matriz.matriz.data.nbytes + matriz.matriz.indices.nbytes + matriz.matriz.indptr.nbytes) / 1024 ** 2
+    return (f"{matriz.forma[0]:,} alimentos × {matriz.forma[1]} nutrientes, "
+            f"{matriz.n_valores:,} valores ({densidad:.1f}% densidad, {megas:.1f} MB)")
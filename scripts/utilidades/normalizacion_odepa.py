@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# ========================================
+# NORMALIZACIÓN ODEPA POR DICCIONARIO
+# ========================================
+# Los precios ("1234,5") y los textos (Region, Producto, ...) de ODEPA se
+# repiten muchísimo: unos pocos miles de valores distintos en millones de
+# filas. Cada columna se codifica una vez con pd.factorize (códigos enteros +
+# valores únicos), la limpieza de texto se hace solo sobre los únicos y el
+# resultado se expande con un take de los códigos. Así el costo de las
+# operaciones de texto depende de la cardinalidad y no del largo del
+# historial. Las reglas son las mismas de la cadena original:
+#   precios: str → ',' por '.' → strip → 'nan'/'None'/'' a NaN → to_numeric
+#   textos:  str → strip → espacios repetidos a uno
+
+COLUMNAS_PRECIO_ODEPA = ['Precio minimo', 'Precio maximo', 'Precio promedio']
+COLUMNAS_TEXTO_ODEPA = ['Region', 'Sector', 'Tipo de punto monitoreo', 'Grupo', 'Producto', 'Unidad']
+VALORES_NULOS = ['nan', 'None', '']
+
+# Unidades comunes → unidad normalizada (Unidad_normalizada)
+UNIDADES_ODEPA = {
+    '$/kilo': 'CLP/kg',
+    '$/kilogramo': 'CLP/kg',
+    '$/kg': 'CLP/kg',
+    '$/litro': 'CLP/L',
+    '$/lt': 'CLP/L',
+    '$/unidad': 'CLP/unidad',
+    '$/un': 'CLP/unidad',
+    '$/docena': 'CLP/docena'
+}
+
+
+def codificar(serie):
+    """(códigos, únicos) de la columna; NaN/None quedan como un valor más"""
+    return pd.factorize(serie, use_na_sentinel=False)
+
+
+def _limpiar_precios(valores):
+    texto = pd.Series(valores, dtype=object).astype(str)
+    texto = texto.str.replace(',', '.', regex=False).str.strip()
+    return pd.to_numeric(texto.replace(VALORES_NULOS, np.nan), errors='coerce').to_numpy()
+
+
+def _limpiar_texto(valores):
+    texto = pd.Series(valores, dtype=object).astype(str).str.strip()
+    return texto.str.replace(r'\s+', ' ', regex=True)
+
+
+def normalizar_precio(serie):
+    """Precio con coma decimal → número (inválidos a NaN), parseando solo los valores distintos"""
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.copy()
+    codigos, unicos = codificar(serie)
+    return pd.Series(_limpiar_precios(unicos)[codigos], index=serie.index, name=serie.name)
+
+
+def normalizar_texto(serie):
+    """Texto sin espacios sobrantes, limpiando solo los valores distintos"""
+    codigos, unicos = codificar(serie)
+    limpios = _limpiar_texto(unicos)
+    return pd.Series(limpios.take(codigos).to_numpy(), index=serie.index, name=serie.name, dtype=limpios.dtype)
@@ -0,0 +1,177 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+from utilidades.carga import leer_por_bloques, leer_columnas, columnas_tabla
+from utilidades.matriz_nutrientes import MatrizNutrientes, guardar_matriz, cargar_matriz
+
+# ========================================
+# ARTEFACTO DE NUTRIENTES FDC (VERSIONADO)
+# ========================================
+# La tabla de nutrientes clave con índices derivados se arma una sola vez
+# (LyT_OFDC) y la integración la lee. El artefacto tiene dos partes:
+#   - FDC_NUTRIENTES_CLAVE: alimento + nutrientes clave + índices derivados
+#   - MATRIZ_NUTRIENTES['FDC_FOOD_NUTRIENT_CLEAN']: matriz CSR completa
+# y queda registrado en VERSIONES_FDC con el hash de contenido de sus tablas
+# de entrada (FDC_*_CLEAN) y VERSION_NUTRIENTES_FDC. Si ninguno cambió, se
+# reutiliza sin volver a pivotear; subir la versión al cambiar la lógica.
+
+VERSION_NUTRIENTES_FDC = 1
+TABLA_NUTRIENTES_FDC = "FDC_NUTRIENTES_CLAVE"
+MATRIZ_FDC = "FDC_FOOD_NUTRIENT_CLEAN"
+ENTRADAS_NUTRIENTES_FDC = ["FDC_FOOD_CLEAN", "FDC_FOOD_NUTRIENT_CLEAN"]
+TAMANO_BLOQUE_HASH = 500000
+
+# Nutrientes críticos para análisis de diabetes/colesterol
+NUTRIENTES_CLAVE = {
+    1003: 'Proteina',
+    1004: 'Grasa_Total',
+    1005: 'Carbohidratos',
+    1079: 'Fibra',
+    1087: 'Calcio',
+    1089: 'Hierro',
+    1095: 'Zinc',
+    1253: 'Colesterol_Dietetico',
+    1258: 'Acidos_Grasos_Saturados',
+    1292: 'Acidos_Grasos_Monoinsaturados',
+    1293: 'Acidos_Grasos_Poliinsaturados',
+    2000: 'Azucares_Totales',
+    1008: 'Energia',
+    1093: 'Sodio'
+}
+
+COLUMNAS_ALIMENTO = ['fdc_id', 'description', 'food_category_id']
+
+
+# ========================================
+# HASH DE CONTENIDO
+# ========================================
+
+def hash_tabla(conn, tabla, tamano=TAMANO_BLOQUE_HASH):
+    """SHA-256 del contenido de `tabla` (columnas y filas en orden de rowid)"""
+    hasher = hashlib.sha256('|'.join(columnas_tabla(conn, tabla)).encode())
+    for bloque in leer_por_bloques(conn, tabla, tamano):
+        hasher.update(pd.util.hash_pandas_object(bloque, index=False).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+
+def _crear_registro(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS VERSIONES_FDC "
+        "(nombre TEXT PRIMARY KEY, hash TEXT, version INTEGER, actualizado TEXT)"
+    )
+
+
+def registrar_hashes(conn, tablas=ENTRADAS_NUTRIENTES_FDC):
+    """Calcula y guarda el hash de contenido de cada tabla; devuelve {tabla: hash}"""
+    _crear_registro(conn)
+    hashes = {tabla: hash_tabla(conn, tabla) for tabla in tablas}
+    conn.executemany(
+        "INSERT OR REPLACE INTO VERSIONES_FDC VALUES (?, ?, NULL, datetime('now'))",
+        list(hashes.items())
+    )
+    conn.commit()
+    return hashes
+
+
+def hash_entradas(conn, tablas=ENTRADAS_NUTRIENTES_FDC):
+    """Hash combinado de las tablas de entrada registradas (las que falten se calculan)"""
+    _crear_registro(conn)
+    registrados = dict(conn.execute("SELECT nombre, hash FROM VERSIONES_FDC").fetchall())
+    faltantes = [t for t in tablas if registrados.get(t) is None]
+    if faltantes:
+        registrados.update(registrar_hashes(conn, faltantes))
+    return hashlib.sha256('|'.join(registrados[t] for t in tablas).encode()).hexdigest()
+
+
+def firma_artefacto(conn):
+    """'hash:versión' del artefacto registrado en VERSIONES_FDC (None si no hay)"""
+    _crear_registro(conn)
+    fila = conn.execute(
+        "SELECT hash, version FROM VERSIONES_FDC WHERE nombre = ?", (TABLA_NUTRIENTES_FDC,)
+    ).fetchone()
+    return f"{fila[0]}:{fila[1]}" if fila else None
+
+
+def artefacto_vigente(conn):
+    """True si el artefacto guardado corresponde a las entradas y versión actuales"""
+    _crear_registro(conn)
+    fila = conn.execute(
+        "SELECT hash, version FROM VERSIONES_FDC WHERE nombre = ?", (TABLA_NUTRIENTES_FDC,)
+    ).fetchone()
+    if fila is None or fila[1] != VERSION_NUTRIENTES_FDC:
+        return False
+    return fila[0] == hash_entradas(conn) and bool(columnas_tabla(conn, TABLA_NUTRIENTES_FDC))
+
+
+# ========================================
+# CONSTRUCCIÓN Y CARGA
+# ========================================
+
+def calcular_indices_nutricionales(fdc_nutrientes):
+    """Variables derivadas: carbohidratos netos, IG estimado, grasas saludables, densidad de fibra"""
+    # Carbohidratos netos (importantes para diabetes)
+    fdc_nutrientes['Carb_Netos'] = (
+        fdc_nutrientes['Carbohidratos'] - fdc_nutrientes['Fibra'].fillna(0)
+    )
+
+    # Índice glicémico estimado (aproximación)
+    fdc_nutrientes['Indice_Glicemico_Est'] = (
+        fdc_nutrientes['Carb_Netos'] / (fdc_nutrientes['Fibra'].fillna(0.1) + 1)
+    )
+
+    # Grasas saludables vs saturadas
+    fdc_nutrientes['Grasas_Saludables'] = (
+        fdc_nutrientes['Acidos_Grasos_Monoinsaturados'].fillna(0) +
+        fdc_nutrientes['Acidos_Grasos_Poliinsaturados'].fillna(0)
+    )
+
+    fdc_nutrientes['Ratio_Grasas_Saludables'] = (
+        fdc_nutrientes['Grasas_Saludables'] /
+        (fdc_nutrientes['Acidos_Grasos_Saturados'].fillna(0.1) + 1)
+    )
+
+    # Densidad de fibra (g fibra / 100 kcal)
+    fdc_nutrientes['Densidad_Fibra'] = (
+        (fdc_nutrientes['Fibra'].fillna(0) /
+         fdc_nutrientes['Energia'].replace(0, np.nan)) * 100
+    )
+    return fdc_nutrientes
+
+
+def construir_nutrientes_fdc(conn, matriz=None, df_food=None, tamano=TAMANO_BLOQUE_HASH):
+    """Arma y guarda el artefacto (tabla + matriz + registro); devuelve la tabla.
+
+    Sin `matriz` se arma desde FDC_FOOD_NUTRIENT_CLEAN por bloques; sin
+    `df_food` se leen las columnas necesarias de FDC_FOOD_CLEAN.
+    """
+    hash_actual = hash_entradas(conn)
+    if matriz is None:
+        matriz = MatrizNutrientes.desde_bloques(leer_por_bloques(conn, MATRIZ_FDC, tamano))
+    if df_food is None:
+        df_food = leer_columnas(conn, "FDC_FOOD_CLEAN", COLUMNAS_ALIMENTO)
+
+    nutrientes_pivot = matriz.seleccionar_nutrientes(NUTRIENTES_CLAVE).a_dataframe(NUTRIENTES_CLAVE)
+    fdc_nutrientes = df_food[COLUMNAS_ALIMENTO].merge(nutrientes_pivot, on='fdc_id', how='inner')
+    fdc_nutrientes = calcular_indices_nutricionales(fdc_nutrientes)
+
+    fdc_nutrientes.to_sql(TABLA_NUTRIENTES_FDC, conn, if_exists="replace", index=False)
+    guardar_matriz(conn, MATRIZ_FDC, matriz)
+    conn.execute(
+        "INSERT OR REPLACE INTO VERSIONES_FDC VALUES (?, ?, ?, datetime('now'))",
+        (TABLA_NUTRIENTES_FDC, hash_actual, VERSION_NUTRIENTES_FDC)
+    )
+    conn.commit()
+    return fdc_nutrientes
+
+
+def cargar_nutrientes_fdc(conn):
+    """Tabla del artefacto si está vigente, o None si hay que reconstruirlo"""
+    if not artefacto_vigente(conn):
+        return None
+    return pd.read_sql(f'SELECT * FROM "{TABLA_NUTRIENTES_FDC}"', conn)
+
+
+def cargar_matriz_fdc(conn):
+    """Matriz completa del artefacto (None si no existe)"""
+    return cargar_matriz(conn, MATRIZ_FDC)
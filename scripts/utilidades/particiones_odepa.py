@@ -0,0 +1,425 @@
+import hashlib
+from itertools import groupby
+
+import numpy as np
+import pandas as pd
+
+from utilidades.carga import columnas_tabla, guardar_particion
+from utilidades.cuantiles import SketchKLL, guardar_sketch
+from utilidades.validacion_rangos import RANGOS_VALIDOS, validar_rangos
+from utilidades.normalizacion_odepa import (
+    COLUMNAS_PRECIO_ODEPA, COLUMNAS_TEXTO_ODEPA, UNIDADES_ODEPA, normalizar_precio, normalizar_texto
+)
+
+# ========================================
+# HISTORIAL ODEPA POR PARTICIONES AÑO/SEMANA
+# ========================================
+# ODEPA_PRECIOS guarda el historial completo (2008 en adelante), un año por
+# partición de ingesta. La limpieza incremental trabaja por semana:
+#   - partición = Anio * 100 + Semana (AAAASS), con índice de expresión en
+#     ODEPA_PRECIOS para leer solo las semanas pedidas
+#   - detección de cambios por contenido, en dos niveles: el hash del CSV del
+#     año (ODEPA_ARCHIVOS, lo escribe la ingesta) descarta sin leer filas las
+#     semanas de años que no se recargaron; las semanas de años recargados (o
+#     sin hash registrado) se leen y se comparan por un hash de sus filas, así
+#     una revisión de precios que reutiliza los mismos rowid se detecta
+#   - solo las particiones nuevas o con otro contenido se limpian y se
+#     escriben en ODEPA_PRECIOS_CLEAN (guardar_particion), con sus agregados
+#     parciales por Producto y su sketch KLL en ODEPA_PARTICIONES
+#   - lo global (límites de outliers y cuartiles de precio) sale de la fusión
+#     de los sketches y se aplica con un UPDATE en SQLite
+# Los agregados parciales (n, media, M2, mín, máx) se combinan con la fórmula
+# de Chan para media y desviación estándar, sin volver a leer los precios.
+# Diferencias con el modo completo: los cuartiles son los del sketch (error
+# de rango ~1%, ver utilidades.cuantiles) y no se eliminan columnas con un
+# solo valor (Anio y Semana son constantes dentro de cada partición).
+
+TABLA_ODEPA = "ODEPA_PRECIOS"
+TABLA_ODEPA_CLEAN = "ODEPA_PRECIOS_CLEAN"
+TABLA_ODEPA_RECIENTES = "ODEPA_PRECIOS_RECIENTES"
+TABLA_PARTICIONES_ODEPA = "ODEPA_PARTICIONES"
+TABLA_PARCIALES_ODEPA = "ODEPA_AGREGADO_PARCIAL"
+COLUMNA_PARTICION = 'particion'
+SKETCH_ODEPA = 'ODEPA_PRECIO_PROMEDIO'
+
+# Partición AAAASS (-1 = registros sin año o semana)
+EXPRESION_PARTICION = 'COALESCE(CAST("Anio" AS INTEGER) * 100 + CAST("Semana" AS INTEGER), -1)'
+
+COLUMNAS_NUMERICAS_ODEPA = ['Anio', 'Mes', 'Semana', 'ID region']
+COLUMNAS_FECHA_ODEPA = ['Fecha inicio', 'Fecha termino']
+ETIQUETAS_PRECIO = ['Bajo', 'Medio-Bajo', 'Medio-Alto', 'Alto']
+FACTOR_IQR = 3
+
+INDICES_ODEPA_CLEAN = [
+    ("idx_odepa_producto", "Producto"),
+    ("idx_odepa_grupo", "Grupo"),
+    ("idx_odepa_region", "Region"),
+    ("idx_odepa_anio", "Anio"),
+    ("idx_odepa_precio", "Precio promedio"),
+]
+
+COLUMNAS_AGREGADO_ODEPA = [
+    'Producto', 'Precio_Promedio_CLP', 'Precio_Min_CLP',
+    'Precio_Max_CLP', 'Precio_Std_CLP', 'N_Observaciones',
+    'Grupo', 'Unidad'
+]
+
+# Ingesta: años con URL conocida en datos.odepa.gob.cl; los demás se leen de
+# data_xpt/precio_consumidor_publico_{anio}.csv si el archivo existe
+ANIO_ODEPA_ACTUAL = 2025
+PRIMER_ANIO_ODEPA = 2008
+URLS_ODEPA = {
+    2025: "https://datos.odepa.gob.cl/dataset/c3ca8246-3d84-4145-9e34-525b0ba95859/resource/7f8f1255-a13b-4233-aad0-631054a8a025/download/precio_consumidor_publico_2025.csv",
+}
+
+
+# ========================================
+# INGESTA POR AÑO
+# ========================================
+
+def anios_odepa(texto):
+    """'2008-2025' o '2023,2024,2025' → lista ordenada de años válidos"""
+    anios = set()
+    for parte in str(texto).split(','):
+        parte = parte.strip()
+        if not parte:
+            continue
+        if '-' in parte:
+            desde, hasta = (int(x) for x in parte.split('-', 1))
+            anios.update(range(desde, hasta + 1))
+        else:
+            anios.add(int(parte))
+    validos = sorted(a for a in anios if PRIMER_ANIO_ODEPA <= a <= ANIO_ODEPA_ACTUAL)
+    descartados = sorted(anios - set(validos))
+    if descartados:
+        print(f"⚠ Años ODEPA fuera de {PRIMER_ANIO_ODEPA}-{ANIO_ODEPA_ACTUAL} ignorados: {descartados}")
+    return validos
+
+
+def _crear_registro_archivos(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS ODEPA_ARCHIVOS "
+        "(anio INTEGER PRIMARY KEY, hash TEXT, n_filas INTEGER, actualizado TEXT)"
+    )
+
+
+def archivo_odepa_cambiado(conn, anio, contenido, tabla=TABLA_ODEPA):
+    """True si el CSV del año difiere del último cargado (o el año no está en la tabla)"""
+    _crear_registro_archivos(conn)
+    fila = conn.execute("SELECT hash FROM ODEPA_ARCHIVOS WHERE anio = ?", (anio,)).fetchone()
+    if fila is None or fila[0] != hashlib.sha256(contenido).hexdigest():
+        return True
+    if 'Anio' not in columnas_tabla(conn, tabla):
+        return True
+    return conn.execute(f'SELECT 1 FROM "{tabla}" WHERE "Anio" = ? LIMIT 1', (anio,)).fetchone() is None
+
+
+def registrar_archivo_odepa(conn, anio, contenido, n_filas):
+    _crear_registro_archivos(conn)
+    conn.execute(
+        "INSERT OR REPLACE INTO ODEPA_ARCHIVOS VALUES (?, ?, ?, datetime('now'))",
+        (anio, hashlib.sha256(contenido).hexdigest(), n_filas)
+    )
+    conn.commit()
+
+
+# ========================================
+# LIMPIEZA DE REGISTROS (MISMAS REGLAS QUE LyT_ODEPA)
+# ========================================
+
+def limpiar_registros_odepa(df):
+    """Limpieza fila a fila de LyT_ODEPA (secciones 3-7 y 10), sin reportes"""
+    df = df.copy()
+    for col in COLUMNAS_PRECIO_ODEPA:
+        if col in df.columns:
+            df[col] = normalizar_precio(df[col])
+    for col in COLUMNAS_NUMERICAS_ODEPA:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    for col in COLUMNAS_FECHA_ODEPA:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce', format='%Y-%m-%d')
+    if 'Fecha inicio' in df.columns and df['Fecha inicio'].notna().any():
+        df['año_fecha'] = df['Fecha inicio'].dt.year
+        df['mes_fecha'] = df['Fecha inicio'].dt.month
+        df['semana_año'] = df['Fecha inicio'].dt.isocalendar().week
+    for col in COLUMNAS_TEXTO_ODEPA:
+        if col in df.columns:
+            df[col] = normalizar_texto(df[col])
+
+    # Registros inválidos: sin precio, precio <= 0, sin producto o sin grupo
+    if 'Precio promedio' in df.columns:
+        df = df[df['Precio promedio'].notna()]
+        df, _ = validar_rangos(df, RANGOS_VALIDOS, tabla='ODEPA', accion='eliminar', variables=['Precio promedio'])
+    for col in ['Producto', 'Grupo']:
+        if col in df.columns:
+            df = df[df[col].notna() & ~df[col].isin(['', 'nan'])]
+
+    # Promedio fuera de [mínimo, máximo] → media de mínimo y máximo
+    if all(col in df.columns for col in COLUMNAS_PRECIO_ODEPA):
+        mask = (df['Precio promedio'] < df['Precio minimo']) | (df['Precio promedio'] > df['Precio maximo'])
+        df.loc[mask, 'Precio promedio'] = (df.loc[mask, 'Precio minimo'] + df.loc[mask, 'Precio maximo']) / 2
+
+    if 'Unidad' in df.columns:
+        df['Unidad_normalizada'] = df['Unidad'].replace(UNIDADES_ODEPA)
+    return df
+
+
+# ========================================
+# AGREGADOS PARCIALES POR PRODUCTO
+# ========================================
+
+def agregados_parciales(df):
+    """n, media, M2 (suma de desvíos al cuadrado), mín y máx por partición y Producto"""
+    grupos = df.groupby([COLUMNA_PARTICION, 'Producto'], sort=False)
+    precio = grupos['Precio promedio']
+    n = precio.count()
+    parciales = pd.DataFrame({
+        'n': n,
+        'media': precio.mean(),
+        'm2': precio.var(ddof=0) * n,
+        'minimo': precio.min(),
+        'maximo': precio.max(),
+    })
+    for col in ['Grupo', 'Unidad_normalizada']:
+        if col in df.columns:
+            parciales[col] = grupos[col].first()
+    return parciales.reset_index()
+
+
+def combinar_parciales(parciales):
+    """Estadísticas por Producto (columnas de ODEPA_AGREGADO) desde los agregados parciales"""
+    parciales = parciales.sort_values(COLUMNA_PARTICION, kind='stable')
+    parciales = parciales.assign(suma=parciales['media'] * parciales['n'])
+    grupos = parciales.groupby('Producto')
+    total = grupos.agg(n=('n', 'sum'), suma=('suma', 'sum'), minimo=('minimo', 'min'), maximo=('maximo', 'max'))
+    media = total['suma'] / total['n']
+
+    # Chan: M2 total = Σ [M2_i + n_i · (media_i - media)²]
+    desvio = parciales['media'].to_numpy() - media.reindex(parciales['Producto']).to_numpy()
+    m2 = (parciales['m2'] + parciales['n'] * desvio ** 2).groupby(parciales['Producto']).sum()
+    n = total['n'].to_numpy()
+    varianza = np.where(n > 1, np.clip(m2.to_numpy(), 0, None) / np.maximum(n - 1, 1), np.nan)
+
+    resultado = pd.DataFrame({
+        'Producto': total.index,
+        'Precio_Promedio_CLP': media.to_numpy(),
+        'Precio_Min_CLP': total['minimo'].to_numpy(),
+        'Precio_Max_CLP': total['maximo'].to_numpy(),
+        'Precio_Std_CLP': np.sqrt(varianza),
+        'N_Observaciones': n.astype('int64'),
+    })
+    for col, nombre in [('Grupo', 'Grupo'), ('Unidad_normalizada', 'Unidad')]:
+        resultado[nombre] = (grupos[col].first().to_numpy() if col in parciales.columns
+                             else np.full(len(resultado), None))
+    return resultado[COLUMNAS_AGREGADO_ODEPA]
+
+
+def leer_parciales_ultimo_anio(conn, tabla=TABLA_PARCIALES_ODEPA):
+    """Agregados parciales de las semanas del último año del historial.
+
+    Los precios son nominales: promediar 2008 con 2025 mezcla niveles de
+    precio, así que el agregado por producto (costos, categoría de precio)
+    usa solo el último año, como cuando se ingería un solo año.
+    """
+    return pd.read_sql(
+        f'SELECT * FROM "{tabla}" WHERE "{COLUMNA_PARTICION}" >= '
+        f'(SELECT CAST(MAX("{COLUMNA_PARTICION}") / 100 AS INTEGER) * 100 FROM "{tabla}")',
+        conn
+    )
+
+
+# ========================================
+# REGISTRO Y LECTURA DE PARTICIONES
+# ========================================
+
+def _crear_registro(conn):
+    # Registro de una versión anterior (firma por rowid): se descarta y se reprocesa todo
+    existentes = columnas_tabla(conn, TABLA_PARTICIONES_ODEPA)
+    if existentes and 'hash' not in existentes:
+        conn.execute(f"DROP TABLE {TABLA_PARTICIONES_ODEPA}")
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {TABLA_PARTICIONES_ODEPA} "
+        "(particion INTEGER PRIMARY KEY, archivo TEXT, hash TEXT, n_filas INTEGER, n_limpias INTEGER, "
+        "sketch BLOB, actualizado TEXT)"
+    )
+
+
+def firmas_particiones(conn, tabla=TABLA_ODEPA):
+    """Partición, filas y hash del CSV de su año (None si el año no está en ODEPA_ARCHIVOS)"""
+    _crear_registro_archivos(conn)
+    conn.execute(
+        f'CREATE INDEX IF NOT EXISTS idx_{tabla.lower()}_particion ON "{tabla}"({EXPRESION_PARTICION})'
+    )
+    return pd.read_sql(
+        f"SELECT t.particion, t.n_filas, a.hash AS archivo FROM ("
+        f'SELECT {EXPRESION_PARTICION} AS particion, COUNT(*) AS n_filas FROM "{tabla}" GROUP BY 1'
+        f") t LEFT JOIN ODEPA_ARCHIVOS a ON a.anio = t.particion / 100 ORDER BY 1",
+        conn
+    )
+
+
+def particiones_pendientes(conn, firmas):
+    """(particiones a revisar por contenido, particiones que ya no están en el origen)
+
+    Se descartan sin leerlas las que tienen el mismo hash de archivo y las
+    mismas filas que en el registro; sin hash de archivo siempre se revisan.
+    """
+    _crear_registro(conn)
+    registradas = {p: (a, n) for p, a, n in conn.execute(
+        f"SELECT particion, archivo, n_filas FROM {TABLA_PARTICIONES_ODEPA}"
+    )}
+    pendientes = [
+        int(p) for p, a, n in zip(firmas['particion'], firmas['archivo'], firmas['n_filas'])
+        if a is None or pd.isna(a) or registradas.get(p) != (a, n)
+    ]
+    presentes = set(firmas['particion'].tolist())
+    eliminadas = sorted(p for p in registradas if p not in presentes)
+    return pendientes, eliminadas
+
+
+def hashes_contenido(df):
+    """sha256 de las filas de cada partición (valores y nombres de columna, sin el rowid)"""
+    columnas = sorted(c for c in df.columns if c != COLUMNA_PARTICION)
+    filas = pd.util.hash_pandas_object(df[columnas], index=False).to_numpy()
+    encabezado = '\x1f'.join(columnas).encode()
+    return {
+        int(p): hashlib.sha256(encabezado + filas[posiciones].tobytes()).hexdigest()
+        for p, posiciones in df.groupby(COLUMNA_PARTICION).indices.items()
+    }
+
+
+def leer_particiones(conn, particiones, tabla=TABLA_ODEPA):
+    """Registros de las particiones pedidas, en orden de inserción (usa el índice de expresión)"""
+    marcadores = ', '.join('?' for _ in particiones)
+    return pd.read_sql(
+        f'SELECT *, {EXPRESION_PARTICION} AS particion FROM "{tabla}" '
+        f'WHERE {EXPRESION_PARTICION} IN ({marcadores}) ORDER BY rowid',
+        conn, params=list(particiones)
+    )
+
+
+def borrar_particiones(conn, particiones):
+    """Quita las particiones de la tabla limpia, los parciales y el registro"""
+    marcadores = ', '.join('?' for _ in particiones)
+    for tabla in [TABLA_ODEPA_CLEAN, TABLA_PARCIALES_ODEPA, TABLA_PARTICIONES_ODEPA]:
+        if COLUMNA_PARTICION in columnas_tabla(conn, tabla):
+            conn.execute(f'DELETE FROM "{tabla}" WHERE "{COLUMNA_PARTICION}" IN ({marcadores})', list(particiones))
+    conn.commit()
+
+
+def sketch_global(conn):
+    """Fusión de los sketches KLL de todas las particiones registradas"""
+    sketch = SketchKLL()
+    for (datos,) in conn.execute(f"SELECT sketch FROM {TABLA_PARTICIONES_ODEPA} WHERE sketch IS NOT NULL"):
+        sketch.fusionar(SketchKLL.desde_bytes(datos))
+    return sketch
+
+
+def actualizar_marcas_globales(conn, sketch, tabla=TABLA_ODEPA_CLEAN):
+    """es_outlier (Q1/Q3 ± 3·IQR) y categoria_precio (cuartiles) desde el sketch, en SQLite"""
+    q1, q2, q3 = sketch.cuantiles([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    bajo, alto = q1 - FACTOR_IQR * iqr, q3 + FACTOR_IQR * iqr
+    precio = '"Precio promedio"'
+    conn.execute(
+        f'UPDATE "{tabla}" SET es_outlier = ({precio} < ? OR {precio} > ?), '
+        f'categoria_precio = CASE WHEN {precio} <= ? THEN ? WHEN {precio} <= ? THEN ? '
+        f'WHEN {precio} <= ? THEN ? ELSE ? END',
+        (bajo, alto, q1, ETIQUETAS_PRECIO[0], q2, ETIQUETAS_PRECIO[1], q3, ETIQUETAS_PRECIO[2],
+         ETIQUETAS_PRECIO[3])
+    )
+    conn.commit()
+    return bajo, alto
+
+
+# ========================================
+# PROCESO INCREMENTAL
+# ========================================
+
+def procesar_odepa_incremental(conn, origen=TABLA_ODEPA):
+    """Limpia solo las semanas nuevas o cambiadas y actualiza lo global; devuelve las procesadas"""
+    print("\nModo incremental: particiones año/semana")
+    _crear_registro(conn)
+
+    # Tabla limpia escrita por el modo completo (sin partición): se reprocesa todo
+    if COLUMNA_PARTICION not in columnas_tabla(conn, TABLA_ODEPA_CLEAN):
+        conn.execute(f"DELETE FROM {TABLA_PARTICIONES_ODEPA}")
+        conn.execute(f'DROP TABLE IF EXISTS "{TABLA_PARCIALES_ODEPA}"')
+
+    firmas = firmas_particiones(conn, origen)
+    pendientes, eliminadas = particiones_pendientes(conn, firmas)
+    print(f"Particiones: {len(firmas):,} en {origen}, {len(pendientes):,} a revisar por contenido, "
+          f"{len(eliminadas):,} eliminadas")
+    if eliminadas:
+        borrar_particiones(conn, eliminadas)
+
+    firma = firmas.set_index('particion')
+    registradas = dict(conn.execute(f"SELECT particion, hash FROM {TABLA_PARTICIONES_ODEPA}").fetchall())
+    procesadas = []
+    # Un año por lote: la memoria depende de un año de datos, no del historial
+    for anio, lote in groupby(pendientes, key=lambda p: p // 100):
+        lote = list(lote)
+        crudo = leer_particiones(conn, lote, origen)
+        hashes = hashes_contenido(crudo)
+        cambiadas = [p for p in lote if registradas.get(p) != hashes.get(p)]
+
+        # Mismo contenido (p. ej. CSV recargado sin cambios en esas semanas): solo se anota el archivo
+        conn.executemany(
+            f"UPDATE {TABLA_PARTICIONES_ODEPA} SET archivo = ? WHERE particion = ?",
+            [(firma.at[p, 'archivo'], p) for p in lote if p not in cambiadas]
+        )
+        conn.commit()
+        if not cambiadas:
+            continue
+
+        crudo = crudo[crudo[COLUMNA_PARTICION].isin(cambiadas)]
+        limpio = limpiar_registros_odepa(crudo)
+        limpio['es_outlier'] = 0
+        limpio['categoria_precio'] = None
+
+        borrar_particiones(conn, cambiadas)
+        guardar_particion(conn, limpio, TABLA_ODEPA_CLEAN, COLUMNA_PARTICION)
+        guardar_particion(conn, agregados_parciales(limpio), TABLA_PARCIALES_ODEPA, COLUMNA_PARTICION)
+
+        # Registro: hash del archivo y del contenido, filas y sketch KLL de cada semana
+        precios = {p: valores.to_numpy() for p, valores in limpio.groupby(COLUMNA_PARTICION)['Precio promedio']}
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {TABLA_PARTICIONES_ODEPA} VALUES (?, ?, ?, ?, ?, ?, datetime('now'))",
+            [(p, firma.at[p, 'archivo'], hashes[p], int(firma.at[p, 'n_filas']), len(precios.get(p, [])),
+              SketchKLL().actualizar(precios.get(p, [])).a_bytes())
+             for p in cambiadas]
+        )
+        conn.commit()
+        procesadas.extend(cambiadas)
+        print(f"  ✓ {anio}: {len(cambiadas):,} semanas, {len(crudo):,} registros → {len(limpio):,} limpios")
+
+    if not procesadas and not eliminadas:
+        print("✓ ODEPA sin cambios: no se reprocesa")
+        return []
+
+    # Límites globales desde la fusión de sketches (sin releer precios)
+    sketch = sketch_global(conn)
+    guardar_sketch(conn, SKETCH_ODEPA, sketch)
+    if sketch.n:
+        bajo, alto = actualizar_marcas_globales(conn, sketch)
+        n_outliers = conn.execute(f'SELECT SUM(es_outlier) FROM "{TABLA_ODEPA_CLEAN}"').fetchone()[0]
+        print(f"Outliers (sketch KLL, {sketch.n:,} precios): {n_outliers:,} "
+              f"fuera de ${bajo:.0f} - ${alto:.0f}")
+
+    # Datos del último año e índices
+    conn.execute(f'DROP TABLE IF EXISTS "{TABLA_ODEPA_RECIENTES}"')
+    conn.execute(
+        f'CREATE TABLE "{TABLA_ODEPA_RECIENTES}" AS SELECT * FROM "{TABLA_ODEPA_CLEAN}" '
+        f'WHERE "Anio" = (SELECT MAX("Anio") FROM "{TABLA_ODEPA_CLEAN}")'
+    )
+    for nombre, columna in INDICES_ODEPA_CLEAN:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {nombre} ON "{TABLA_ODEPA_CLEAN}"("{columna}")')
+    conn.commit()
+
+    n_limpias, n_productos = conn.execute(
+        f'SELECT (SELECT COUNT(*) FROM "{TABLA_ODEPA_CLEAN}"), '
+        f'(SELECT COUNT(DISTINCT "Producto") FROM "{TABLA_PARCIALES_ODEPA}")'
+    ).fetchone()
+    print(f"✓ {TABLA_ODEPA_CLEAN}: {n_limpias:,} registros, {n_productos:,} productos")
+    return procesadas
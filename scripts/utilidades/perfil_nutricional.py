@@ -0,0 +1,66 @@
+import pandas as pd
+import numpy as np
+
+from utilidades.reglas_clinicas import OPERADORES
+
+# ========================================
+# PERFIL NUTRICIONAL DE ALIMENTOS (FDC)
+# ========================================
+# Clasificación por reglas en orden de prioridad: la primera que se cumple
+# define la etiqueta (np.select sobre columnas completas, sin apply por fila).
+# Una columna ausente cuenta como 0 y un NaN no cumple la regla, igual que
+# row.get(col, 0) > umbral.
+
+REGLAS_CLASIFICACION_SALUD = [
+    # (etiqueta, variable, operador, umbral) por 100 g
+    ('Alto_Azucar', 'Azucares_Totales', '>', 15),
+    ('Alto_Grasa_Sat', 'Acidos_Grasos_Saturados', '>', 5),
+    ('Alto_Sodio', 'Sodio', '>', 400),
+    ('Alto_Fibra', 'Fibra', '>', 5),
+]
+CLASIFICACION_POR_DEFECTO = 'Balanceado'
+
+# Puntaje ponderado estilo NRF (Nutrient Rich Foods): nutrientes a favorecer
+# suman y nutrientes a limitar restan, como % del valor diario por 100 g.
+# Los aportes positivos se topan en 100% del valor diario (un alimento no
+# compensa azúcar o sodio con exceso de un solo nutriente).
+VALORES_DIARIOS = {
+    'Proteina': 50, 'Fibra': 28, 'Calcio': 1300, 'Hierro': 18, 'Zinc': 11,
+    'Azucares_Totales': 50, 'Acidos_Grasos_Saturados': 20, 'Sodio': 2300,
+}
+PESOS_PERFIL = {
+    'Proteina': 1, 'Fibra': 1, 'Calcio': 1, 'Hierro': 1, 'Zinc': 1,
+    'Azucares_Totales': -1, 'Acidos_Grasos_Saturados': -1, 'Sodio': -1,
+}
+TOPE_POSITIVOS = 1.0
+
+
+def cumple_regla(df, variable, operador, umbral):
+    """Máscara booleana de la regla (columna ausente → valor 0; NaN → no cumple)"""
+    if variable not in df.columns:
+        return np.full(len(df), bool(OPERADORES[operador](0, umbral)))
+    valores = pd.to_numeric(df[variable], errors='coerce').to_numpy(dtype='float64')
+    return OPERADORES[operador](valores, umbral)
+
+
+def clasificar_perfil(df, reglas=REGLAS_CLASIFICACION_SALUD, defecto=CLASIFICACION_POR_DEFECTO):
+    """Etiqueta de la primera regla que se cumple para cada alimento"""
+    condiciones = [cumple_regla(df, variable, op, umbral) for _, variable, op, umbral in reglas]
+    etiquetas = [etiqueta for etiqueta, *_ in reglas]
+    return pd.Series(np.select(condiciones, etiquetas, default=defecto), index=df.index)
+
+
+def puntaje_perfil(df, pesos=PESOS_PERFIL, valores_diarios=VALORES_DIARIOS, tope=TOPE_POSITIVOS):
+    """Suma ponderada de % del valor diario por 100 g (x100); nutrientes sin dato cuentan 0"""
+    variables = list(pesos)
+    valores = np.column_stack([
+        pd.to_numeric(df[v], errors='coerce').to_numpy(dtype='float64') if v in df.columns
+        else np.zeros(len(df))
+        for v in variables
+    ]) if variables else np.zeros((len(df), 0))
+    pct_diario = np.nan_to_num(valores / np.array([valores_diarios[v] for v in variables], dtype='float64'))
+
+    ponderaciones = np.array([pesos[v] for v in variables], dtype='float64')
+    positivos = ponderaciones > 0
+    pct_diario[:, positivos] = np.minimum(pct_diario[:, positivos], tope)
+    return pd.Series(pct_diario @ ponderaciones * 100, index=df.index)
@@ -0,0 +1,72 @@
+import pandas as pd
+
+from utilidades.nutrientes_fdc import NUTRIENTES_CLAVE
+
+# ========================================
+# NUTRIENTES Y COSTO POR PORCIÓN (FDC_FOOD_PORTION)
+# ========================================
+# FDC informa los nutrientes por 100 g; cada porción (taza, rebanada, ...)
+# tiene su gram_weight. La expansión multiplica, en una sola operación con
+# broadcast, la fila de nutrientes del alimento por gram_weight / 100 para
+# todos los pares (alimento, porción). Se guarda como tabla indexada para que
+# Power BI no lo calcule fila a fila.
+# Solo se escalan cantidades (g, mg, kcal); los índices que son razones
+# (Indice_Glicemico_Est, Ratio_Grasas_Saludables, Densidad_Fibra) no cambian
+# con la porción y se leen de la tabla por 100 g.
+
+TABLA_PORCIONES_FDC = "FDC_NUTRIENTES_PORCION"
+TABLA_COSTO_PORCION = "ODEPA_COSTO_PORCION"
+
+COLUMNAS_PORCION = ['fdc_id', 'portion_id', 'seq_num', 'amount', 'measure_unit_id',
+                    'portion_description', 'modifier', 'gram_weight']
+NUTRIENTES_POR_PORCION = list(NUTRIENTES_CLAVE.values()) + ['Carb_Netos', 'Grasas_Saludables']
+
+# Gramos que cubre el precio ODEPA según su unidad normalizada
+GRAMOS_POR_UNIDAD_PRECIO = {'CLP/kg': 1000}
+
+
+def expandir_porciones(porciones, nutrientes, columnas=NUTRIENTES_POR_PORCION):
+    """Nutrientes de cada porción = nutrientes por 100 g × gram_weight / 100"""
+    porciones = porciones.rename(columns={'id': 'portion_id'})
+    columnas = [c for c in columnas if c in nutrientes.columns]
+
+    # Fila del alimento para cada porción (las de alimentos sin nutrientes se descartan)
+    posicion = pd.Index(nutrientes['fdc_id']).get_indexer(porciones['fdc_id'])
+    validas = posicion >= 0
+    porciones = porciones[validas]
+    factor = porciones['gram_weight'].to_numpy(dtype='float64') / 100
+
+    valores = nutrientes[columnas].to_numpy(dtype='float64')[posicion[validas]] * factor[:, None]
+
+    resultado = porciones[[c for c in COLUMNAS_PORCION if c in porciones.columns]].reset_index(drop=True)
+    resultado['factor_porcion'] = factor
+    return pd.concat([resultado, pd.DataFrame(valores, columns=columnas)], axis=1)
+
+
+def costo_por_porcion(porciones, precios, unidades=GRAMOS_POR_UNIDAD_PRECIO):
+    """Costo en CLP de cada porción a partir del precio ODEPA del alimento emparejado.
+
+    `precios` tiene fdc_id, precio_promedio_clp y unidad_odepa; las unidades que no
+    son de peso (litro, unidad, docena) quedan sin costo.
+    """
+    costos = porciones[['fdc_id', 'portion_id', 'gram_weight']].merge(
+        precios[['fdc_id', 'producto_odepa', 'precio_promedio_clp', 'unidad_odepa']].dropna(subset=['fdc_id']),
+        on='fdc_id', how='inner'
+    )
+    gramos_precio = costos['unidad_odepa'].map(unidades).to_numpy(dtype='float64')
+    costos['costo_porcion_clp'] = (
+        costos['precio_promedio_clp'].to_numpy(dtype='float64') * costos['gram_weight'].to_numpy(dtype='float64')
+        / gramos_precio
+    )
+    return costos
+
+
+def guardar_indexada(conn, df, tabla, indices):
+    """Guarda la tabla y crea un índice por cada columna (o tupla de columnas)"""
+    df.to_sql(tabla, conn, if_exists="replace", index=False)
+    for columnas in indices:
+        columnas = [columnas] if isinstance(columnas, str) else list(columnas)
+        nombre = f"idx_{tabla.lower()}_{'_'.join(c.lower() for c in columnas)}"
+        lista = ', '.join(f'"{c}"' for c in columnas)
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {nombre} ON "{tabla}"({lista})')
+    conn.commit()
@@ -0,0 +1,194 @@
+import operator
+import pandas as pd
+import numpy as np
+
+# ========================================
+# REGLAS CLÍNICAS DECLARATIVAS (NHANES)
+# ========================================
+# Cada clasificación es una entrada de tabla, no una función por fila:
+#   - 'variable': columna (o lista de alternativas, se usa la primera presente)
+#   - 'cortes': puntos de corte ascendentes; con 'sexo', un dict sexo → cortes
+#   - 'etiquetas': len(cortes) + 1 etiquetas, de menor a mayor
+#   - 'cerrado': 'izquierda' → intervalos [a, b) (valor < corte pasa al
+#     siguiente recién al alcanzarlo); 'derecha' → (a, b] (valor <= corte)
+# Se compilan a np.searchsorted / np.select sobre columnas completas.
+
+REGLAS_CATEGORIAS = {
+    'categoria_ingreso': {
+        'variable': 'INDFMPIR', 'cortes': [1.0, 2.0, 4.0],
+        'etiquetas': ['Bajo pobreza', 'Cerca pobreza', 'Medio', 'Alto']
+    },
+    'categoria_imc': {
+        'variable': 'BMXBMI', 'cortes': [18.5, 25, 30],
+        'etiquetas': ['Bajo peso', 'Normal', 'Sobrepeso', 'Obesidad']
+    },
+    'riesgo_rcc': {
+        'variable': 'ratio_cintura_cadera', 'sexo': 'RIAGENDR', 'cerrado': 'derecha',
+        'cortes': {'Hombre': [0.90], 'Mujer': [0.85]},
+        'etiquetas': ['Normal', 'Alto riesgo']
+    },
+    'categoria_hba1c': {
+        'variable': 'LBXGH', 'cortes': [5.7, 6.5],
+        'etiquetas': ['Normal', 'Prediabetes', 'Diabetes']
+    },
+    'categoria_glucosa': {
+        'variable': 'LBXGLU', 'cortes': [100, 126],
+        'etiquetas': ['Normal', 'Prediabetes', 'Diabetes']
+    },
+    'categoria_colesterol': {
+        'variable': 'LBXTC', 'cortes': [200, 240],
+        'etiquetas': ['Deseable', 'Límite alto', 'Alto']
+    },
+    'categoria_hdl': {
+        'variable': 'LBDHDD', 'sexo': 'RIAGENDR',
+        'cortes': {'Hombre': [40, 60], 'Mujer': [50, 60]},
+        'etiquetas': ['Bajo (riesgo)', 'Normal', 'Alto (protector)']
+    },
+    'categoria_trigliceridos': {
+        'variable': ['LBXTR', 'LBDTRSI'], 'cortes': [150, 200, 500],
+        'etiquetas': ['Normal', 'Límite alto', 'Alto', 'Muy alto']
+    },
+    'categoria_ldl': {
+        'variable': 'LBDLDL_calc', 'cortes': [100, 130, 160, 190],
+        'etiquetas': ['Óptimo', 'Cerca del óptimo', 'Límite alto', 'Alto', 'Muy alto']
+    },
+    'categoria_riesgo_cv': {
+        'variable': 'riesgo_cardiovascular', 'cortes': [2, 5, 7], 'cerrado': 'derecha',
+        'etiquetas': ['Bajo', 'Moderado', 'Alto', 'Muy alto']
+    },
+    'categoria_azucar': {
+        'variable': 'pct_calorias_azucar', 'cortes': [10, 20],
+        'etiquetas': ['Bajo', 'Moderado', 'Alto']
+    },
+    'categoria_fibra': {
+        'variable': 'promedio_tfibe', 'cortes': [15, 25],
+        'etiquetas': ['Bajo', 'Adecuado', 'Alto']
+    },
+    'edad_grupo_brfss': {
+        'variable': 'RIDAGEYR', 'cortes': [18, 25, 35, 45, 55, 65],
+        'etiquetas': ['<18', '18-24', '25-34', '35-44', '45-54', '55-64', '65+']
+    },
+}
+
+# Criterios binarios: variable, operador, umbral (o dict por sexo) y qué
+# devolver si falta la variable ('nan' → NaN, 0 → cuenta como no cumplido)
+CRITERIOS_BINARIOS = {
+    'diabetes_hba1c': {'variable': 'LBXGH', 'operador': '>=', 'umbral': 6.5, 'si_falta': 'nan'},
+    'diabetes_glucosa': {'variable': 'LBXGLU', 'operador': '>=', 'umbral': 126, 'si_falta': 'nan'},
+    'colesterol_alto': {'variable': 'LBXTC', 'operador': '>=', 'umbral': 240, 'si_falta': 'nan'},
+    'hdl_bajo': {
+        'variable': 'LBDHDD', 'operador': '<', 'sexo': 'RIAGENDR',
+        'umbral': {'Hombre': 40, 'Mujer': 50}, 'si_falta': 'nan'
+    },
+    'trigliceridos_altos': {'variable': ['LBXTR', 'LBDTRSI'], 'operador': '>=', 'umbral': 150, 'si_falta': 'nan'},
+    # Síndrome metabólico (ATP III, sin presión arterial)
+    'sm_criterio_cintura': {
+        'variable': 'BMXWAIST', 'operador': '>', 'sexo': 'RIAGENDR',
+        'umbral': {'Hombre': 102, 'Mujer': 88}, 'si_falta': 0
+    },
+    'sm_criterio_trigliceridos': {'variable': ['LBXTR', 'LBDTRSI'], 'operador': '>=', 'umbral': 150, 'si_falta': 0},
+    'sm_criterio_hdl': {
+        'variable': 'LBDHDD', 'operador': '<', 'sexo': 'RIAGENDR',
+        'umbral': {'Hombre': 40, 'Mujer': 50}, 'si_falta': 0
+    },
+    'sm_criterio_glucosa': {'variable': 'LBXGLU', 'operador': '>=', 'umbral': 100, 'si_falta': 0},
+}
+
+CRITERIOS_SINDROME_METABOLICO = [
+    'sm_criterio_cintura', 'sm_criterio_trigliceridos', 'sm_criterio_hdl', 'sm_criterio_glucosa'
+]
+
+# Score de riesgo cardiovascular (0-10): (variable, operador, valor, puntos)
+PUNTOS_RIESGO_CV = [
+    ('RIDAGEYR', '>=', 45, 1),
+    ('RIDAGEYR', '>=', 65, 1),
+    ('tiene_diabetes', '==', 1, 3),
+    ('colesterol_alto', '==', 1, 2),
+    ('hdl_bajo', '==', 1, 1),
+    ('categoria_imc', '==', 'Obesidad', 1),
+    ('sindrome_metabolico', '==', 1, 1),
+]
+
+OPERADORES = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt,
+    '>=': operator.ge, '==': operator.eq, '!=': operator.ne
+}
+
+
+# ========================================
+# COMPILACIÓN A OPERACIONES POR COLUMNA
+# ========================================
+
+def variable_regla(df, regla):
+    """Primera columna disponible de la regla (None si no hay ninguna)"""
+    variables = regla['variable'] if isinstance(regla['variable'], list) else [regla['variable']]
+    return next((v for v in variables if v in df.columns), None)
+
+
+def clasificar_por_cortes(valores, cortes, etiquetas, cerrado='izquierda'):
+    """Índice de intervalo con searchsorted → etiqueta; NaN se mantiene"""
+    valores = pd.to_numeric(pd.Series(valores), errors='coerce')
+    lado = 'right' if cerrado == 'izquierda' else 'left'
+    indice = np.searchsorted(np.asarray(cortes, dtype='float64'), valores.to_numpy(dtype='float64'), side=lado)
+    resultado = np.asarray(etiquetas, dtype=object)[indice]
+    resultado[valores.isna().to_numpy()] = np.nan
+    return pd.Series(resultado, index=valores.index, dtype=object)
+
+
+def aplicar_categoria(df, regla):
+    """Evalúa una regla de categorías (con o sin cortes por sexo) sobre todo el DataFrame"""
+    variable = variable_regla(df, regla)
+    cerrado = regla.get('cerrado', 'izquierda')
+    if 'sexo' not in regla:
+        return clasificar_por_cortes(df[variable], regla['cortes'], regla['etiquetas'], cerrado)
+
+    sexo = df[regla['sexo']]
+    condiciones, opciones = [], []
+    for valor_sexo, cortes in regla['cortes'].items():
+        condiciones.append((sexo == valor_sexo).to_numpy())
+        opciones.append(clasificar_por_cortes(df[variable], cortes, regla['etiquetas'], cerrado).to_numpy())
+    resultado = np.select(condiciones, opciones, default=np.nan)
+    return pd.Series(resultado, index=df.index, dtype=object)
+
+
+def evaluar_criterio(df, criterio):
+    """Criterio binario como columna 0/1 (float con NaN o int según 'si_falta')"""
+    variable = variable_regla(df, criterio)
+    comparar = OPERADORES[criterio['operador']]
+    valores = df[variable]
+
+    if 'sexo' in criterio:
+        cumple = np.zeros(len(df), dtype=bool)
+        for valor_sexo, umbral in criterio['umbral'].items():
+            cumple |= ((df[criterio['sexo']] == valor_sexo) & comparar(valores, umbral)).to_numpy()
+    else:
+        cumple = comparar(valores, criterio['umbral']).to_numpy()
+
+    if criterio.get('si_falta') == 'nan':
+        resultado = cumple.astype(float)
+        resultado[valores.isna().to_numpy()] = np.nan
+        return pd.Series(resultado, index=df.index)
+    return pd.Series(cumple.astype('int64'), index=df.index)
+
+
+def calcular_puntaje(df, puntos=PUNTOS_RIESGO_CV):
+    """Suma de puntos de las condiciones que se cumplen (columnas ausentes no suman)"""
+    total = np.zeros(len(df), dtype='int64')
+    for variable, op, valor, pts in puntos:
+        if variable in df.columns:
+            total += np.where(OPERADORES[op](df[variable], valor).fillna(False).to_numpy(dtype=bool), pts, 0)
+    return pd.Series(total, index=df.index)
+
+
+def mascara_criterios(df, criterios=CRITERIOS_SINDROME_METABOLICO):
+    """Empaqueta criterios 0/1 en una máscara de bits (bit i = criterio i)"""
+    mascara = np.zeros(len(df), dtype='int64')
+    for bit, criterio in enumerate(criterios):
+        mascara |= (df[criterio].fillna(0).to_numpy(dtype='int64') & 1) << bit
+    return pd.Series(mascara, index=df.index)
+
+
+def contar_bits(mascara, n_bits=len(CRITERIOS_SINDROME_METABOLICO)):
+    """Número de criterios cumplidos a partir de la máscara"""
+    valores = np.asarray(mascara, dtype='int64')
+    return pd.Series(sum((valores >> bit) & 1 for bit in range(n_bits)), index=getattr(mascara, 'index', None))
@@ -0,0 +1,104 @@
+import pandas as pd
+import numpy as np
+
+# ========================================
+# VARIABLES DERIVADAS BRFSS (VECTORIZADAS)
+# ========================================
+# Cada score se calcula con aritmética booleana sobre columnas completas.
+# La equivalencia con el cálculo original por fila se comprueba en
+# scripts/tests/test_scores_brfss.py.
+
+DIABETES_SI = ['Sí', 'Sí, solo durante embarazo']
+EDAD_RIESGO_ALTO = ['55-64', '65+']
+FUMADOR_ACTUAL = ['Fumador actual diario', 'Fumador actual ocasional']
+INGRESO_ALTO = ['$100,000 a < $200,000', '$200,000 o más']
+
+
+def _col(df, col):
+    """Devuelve la columna o una serie vacía (equivalente a row.get)"""
+    if col in df.columns:
+        return df[col]
+    return pd.Series(np.nan, index=df.index, dtype=object)
+
+
+def calcular_tiene_diabetes(df):
+    """1 = diabetes, 0 = no, NaN = otra respuesta"""
+    diabetes = _col(df, 'DIABETE4')
+    return pd.Series(
+        np.select(
+            [diabetes.isin(DIABETES_SI), diabetes == 'No'],
+            [1.0, 0.0],
+            default=np.nan
+        ),
+        index=df.index
+    )
+
+
+def clasificar_imc(imc):
+    """Categoría de IMC a partir de IMC_REAL"""
+    return pd.Series(
+        np.select(
+            [imc.isna(), imc < 18.5, imc < 25, imc < 30],
+            ['Desconocido', 'Bajo peso', 'Normal', 'Sobrepeso'],
+            default='Obesidad'
+        ),
+        index=imc.index
+    )
+
+
+def calcular_riesgo_metabolico(df):
+    """Score de riesgo metabólico (0-8)"""
+    imc = _col(df, 'IMC_REAL')
+    edad = _col(df, '_AGE_G')
+
+    score = np.where(imc >= 30, 3, np.where(imc >= 25, 2, 0))
+    score = score + np.where(_col(df, 'tiene_diabetes') == 1, 3, 0)
+    score = score + np.where(edad.isin(EDAD_RIESGO_ALTO), 2, np.where(edad == '45-54', 1, 0))
+    return pd.Series(score, index=df.index, dtype='int64')
+
+
+def clasificar_riesgo(score):
+    """Bajo (0-2), Moderado (3-5), Alto (6+)"""
+    return pd.Series(
+        np.select(
+            [score.isna(), score <= 2, score <= 5],
+            ['Desconocido', 'Bajo', 'Moderado'],
+            default='Alto'
+        ),
+        index=score.index
+    )
+
+
+def evaluar_estilo_vida(df):
+    """1 = saludable, 0 = no saludable"""
+    no_saludable = (
+        (_col(df, 'EXERANY2') == 'No') |
+        _col(df, '_SMOKER3').isin(FUMADOR_ACTUAL) |
+        (_col(df, 'DRNK3GE5') == 'Sí')
+    )
+    return (~no_saludable).astype('int64')
+
+
+def calcular_ses(df):
+    """Score de estatus socioeconómico (0-4)"""
+    educacion = _col(df, '_EDUCAG')
+    ingreso = _col(df, '_INCOMG1')
+
+    score = np.where(educacion == 'Graduado de universidad o escuela técnica', 2,
+                     np.where(educacion == 'Asistió a universidad o escuela técnica', 1, 0))
+    score = score + np.where(ingreso.isin(INGRESO_ALTO), 2,
+                             np.where(ingreso == '$50,000 a < $100,000', 1, 0))
+    score = score - np.where(_col(df, 'MEDCOST1') == 'Sí, no pudo pagar', 1, 0)
+    return pd.Series(np.maximum(score, 0), index=df.index, dtype='int64')
+
+
+def crear_variables_derivadas(df):
+    """Agrega tiene_diabetes, riesgo, estilo de vida y SES al DataFrame"""
+    if 'DIABETE4' in df.columns:
+        df['tiene_diabetes'] = calcular_tiene_diabetes(df)
+    df['riesgo_metabolico'] = calcular_riesgo_metabolico(df)
+    df['categoria_riesgo'] = clasificar_riesgo(df['riesgo_metabolico'])
+    df['estilo_vida_saludable'] = evaluar_estilo_vida(df)
+    df['ses_score'] = calcular_ses(df)
+    return df
+
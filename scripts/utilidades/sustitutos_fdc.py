@@ -0,0 +1,185 @@
+import io
+import pandas as pd
+import numpy as np
+from scipy.spatial import cKDTree
+
+# ========================================
+# ÍNDICE DE SUSTITUTOS SALUDABLES (FDC)
+# ========================================
+# Vecinos más cercanos por perfil de macronutrientes dentro de la misma
+# food_category_id. Cada categoría tiene su KD-tree (scipy cKDTree) sobre
+# los macros estandarizados (z-score global; NaN → media, es decir 0).
+# Un vecino es sustituto si tiene menos azúcar O menos grasa saturada que el
+# alimento consultado (un NaN no cuenta como menor).
+# Las consultas van en lote por categoría; si entre los vecinos no hay k
+# sustitutos se amplía la búsqueda (k × 2, × 4, ...) solo para esas filas.
+# Se guardan solo los arreglos (np.savez, como MatrizNutrientes y SketchKLL);
+# los árboles se reconstruyen al cargar.
+
+VARIABLES_PERFIL = ['Energia', 'Proteina', 'Grasa_Total', 'Carbohidratos', 'Fibra']
+CRITERIOS_MEJORA = ['Azucares_Totales', 'Acidos_Grasos_Saturados']
+COLUMNA_CATEGORIA = 'food_category_id'
+K_SUSTITUTOS = 5
+FACTOR_CANDIDATOS = 4
+
+COLUMNAS_SUSTITUTOS = ['fdc_id', 'rango', 'fdc_id_sustituto', 'distancia'] + \
+    [f'dif_{c}' for c in CRITERIOS_MEJORA]
+
+
+class IndiceSustitutos:
+    """KD-trees por categoría sobre perfiles estandarizados, con consulta top-k en lote"""
+
+    def __init__(self, fdc_ids, categorias, vectores, criterios, arboles, medias, desvios):
+        self.fdc_ids = fdc_ids
+        self.categorias = categorias
+        self.vectores = vectores
+        self.criterios = criterios
+        self.arboles = arboles  # {código de categoría: (cKDTree, posiciones en fdc_ids)}
+        self.medias = medias
+        self.desvios = desvios
+        self._posicion = pd.Series(np.arange(len(fdc_ids)), index=fdc_ids)
+
+    @classmethod
+    def construir(cls, df, variables=VARIABLES_PERFIL, criterios=CRITERIOS_MEJORA, categoria=COLUMNA_CATEGORIA):
+        """Estandariza los perfiles y arma un árbol por categoría"""
+        datos = df.drop_duplicates('fdc_id')
+        valores = np.column_stack([
+            pd.to_numeric(datos[v], errors='coerce').to_numpy(dtype='float64') if v in datos.columns
+            else np.full(len(datos), np.nan)
+            for v in variables
+        ])
+        medias = np.nan_to_num(np.nanmean(valores, axis=0)) if len(datos) else np.zeros(len(variables))
+        desvios = np.nan_to_num(np.nanstd(valores, axis=0)) if len(datos) else np.ones(len(variables))
+        desvios[desvios == 0] = 1
+        vectores = np.nan_to_num((valores - medias) / desvios)
+
+        mejora = np.column_stack([
+            pd.to_numeric(datos[c], errors='coerce').to_numpy(dtype='float64') if c in datos.columns
+            else np.full(len(datos), np.nan)
+            for c in criterios
+        ])
+        # Categorías como códigos enteros (sin categoría = un código más)
+        valores_categoria = datos[categoria] if categoria in datos.columns else pd.Series(np.zeros(len(datos)))
+        categorias = pd.factorize(valores_categoria, use_na_sentinel=False)[0]
+        return cls(datos['fdc_id'].to_numpy(), categorias, vectores, mejora,
+                   _arboles(categorias, vectores), medias, desvios)
+
+    @property
+    def n_alimentos(self):
+        return len(self.fdc_ids)
+
+    def _vecinos_validos(self, arbol, posiciones, consultas, k):
+        """(posiciones de sustitutos, distancias) por consulta, ampliando la búsqueda si faltan"""
+        n = len(posiciones)
+        resultado = [None] * len(consultas)
+        pendientes = np.arange(len(consultas))
+        k_busqueda = min(n, k * FACTOR_CANDIDATOS + 1)
+
+        while len(pendientes):
+            distancias, vecinos = arbol.query(self.vectores[consultas[pendientes]], k=k_busqueda)
+            distancias = distancias.reshape(len(pendientes), -1)
+            vecinos = vecinos.reshape(len(pendientes), -1)
+            candidatos = posiciones[np.minimum(vecinos, n - 1)]
+
+            # Sustituto: otro alimento con menos azúcar o menos grasa saturada
+            propios = self.criterios[consultas[pendientes]][:, None, :]
+            mejor = (self.criterios[candidatos] < propios).any(axis=2)
+            validos = mejor & (vecinos < n) & (candidatos != consultas[pendientes][:, None])
+
+            completos = (validos.sum(axis=1) >= k) | (k_busqueda >= n)
+            for fila in np.flatnonzero(completos):
+                seleccion = np.flatnonzero(validos[fila])[:k]
+                resultado[pendientes[fila]] = (candidatos[fila, seleccion], distancias[fila, seleccion])
+            pendientes = pendientes[~completos]
+            k_busqueda = min(n, k_busqueda * 2)
+        return resultado
+
+    def buscar(self, fdc_ids, k=K_SUSTITUTOS):
+        """Top-k sustitutos para cada fdc_id (los que no están en el índice se omiten)"""
+        posiciones = self._posicion.reindex(np.asarray(fdc_ids)).dropna().astype('int64').to_numpy()
+        origen, rangos, sustitutos, distancias = [], [], [], []
+        for codigo in np.unique(self.categorias[posiciones]):
+            arbol, en_categoria = self.arboles[codigo]
+            consultas = posiciones[self.categorias[posiciones] == codigo]
+            for consulta, (encontrados, dist) in zip(
+                    consultas, self._vecinos_validos(arbol, en_categoria, consultas, k)):
+                origen.append(np.full(len(encontrados), consulta))
+                rangos.append(np.arange(1, len(encontrados) + 1))
+                sustitutos.append(encontrados)
+                distancias.append(dist)
+        if not origen:
+            return pd.DataFrame(columns=COLUMNAS_SUSTITUTOS)
+
+        origen, sustitutos = np.concatenate(origen), np.concatenate(sustitutos)
+        resultado = pd.DataFrame({
+            'fdc_id': self.fdc_ids[origen],
+            'rango': np.concatenate(rangos),
+            'fdc_id_sustituto': self.fdc_ids[sustitutos],
+            'distancia': np.concatenate(distancias),
+        })
+        for i, c in enumerate(CRITERIOS_MEJORA):
+            resultado[f'dif_{c}'] = self.criterios[sustitutos, i] - self.criterios[origen, i]
+        return resultado
+
+    def a_bytes(self):
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer, fdc_ids=np.asarray(self.fdc_ids, dtype='int64'), categorias=self.categorias,
+            vectores=self.vectores, criterios=self.criterios, medias=self.medias, desvios=self.desvios
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        contenido = np.load(io.BytesIO(datos))
+        categorias, vectores = contenido['categorias'], contenido['vectores']
+        return cls(contenido['fdc_ids'], categorias, vectores, contenido['criterios'],
+                   _arboles(categorias, vectores), contenido['medias'], contenido['desvios'])
+
+
+def _arboles(categorias, vectores):
+    """{código de categoría: (cKDTree, posiciones)} para los vectores de cada categoría"""
+    arboles = {}
+    for codigo in np.unique(categorias):
+        posiciones = np.flatnonzero(categorias == codigo)
+        arboles[codigo] = (cKDTree(vectores[posiciones]), posiciones)
+    return arboles
+
+
+# ========================================
+# PERSISTENCIA
+# ========================================
+
+def _crear_registro(conn):
+    # Registro de una versión anterior (pickle, sin firma): se descarta
+    columnas = [fila[1] for fila in conn.execute("PRAGMA table_info(INDICE_SUSTITUTOS)")]
+    if columnas and 'firma' not in columnas:
+        conn.execute("DROP TABLE INDICE_SUSTITUTOS")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS INDICE_SUSTITUTOS "
+        "(nombre TEXT PRIMARY KEY, n_alimentos INTEGER, n_categorias INTEGER, firma TEXT, datos BLOB, "
+        "actualizado TEXT)"
+    )
+
+
+def guardar_indice(conn, nombre, indice, firma=None):
+    """Guarda los arreglos del índice en INDICE_SUSTITUTOS, con la firma de los datos de origen"""
+    _crear_registro(conn)
+    conn.execute(
+        "INSERT OR REPLACE INTO INDICE_SUSTITUTOS VALUES (?, ?, ?, ?, ?, datetime('now'))",
+        (nombre, indice.n_alimentos, len(indice.arboles), firma, indice.a_bytes())
+    )
+    conn.commit()
+
+
+def cargar_indice(conn, nombre, firma=None):
+    """Devuelve el índice guardado con `nombre` (y `firma`, si se pide), o None si no existe"""
+    try:
+        fila = conn.execute(
+            "SELECT datos, firma FROM INDICE_SUSTITUTOS WHERE nombre = ?", (nombre,)
+        ).fetchone()
+    except Exception:
+        return None
+    if fila is None or (firma is not None and fila[1] != firma):
+        return None
+    return IndiceSustitutos.desde_bytes(fila[0])
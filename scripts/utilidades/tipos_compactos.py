@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+# ========================================
+# OPTIMIZACIÓN DE TIPOS (MEMORIA)
+# ========================================
+# - Medidas float64 → float32 solo si cada valor se recupera exacto al volver
+#   a float64 y redondear a sus decimales (p.ej. HbA1c 5.7, IMC 27.35).
+#   Derivados con decimales "infinitos" (ratios) se quedan en float64.
+# - Enteros (flags 0/1, conteos, scores) → el entero más chico (int8, ...).
+# - Texto con pocas categorías (categoria_imc, grupo_edad, ...) → category.
+# El reporte guarda el tipo original y los decimales para restaurar_tipos(),
+# que se usa antes de to_sql: la base de datos recibe los mismos valores.
+
+MAX_DECIMALES = 4
+UMBRAL_CATEGORIA = 0.5  # proporción máxima de valores únicos para usar category
+
+COLUMNAS_REPORTE_TIPOS = ['columna', 'tipo_original', 'tipo_nuevo', 'decimales', 'bytes_antes', 'bytes_despues']
+
+
+def decimales_necesarios(valores, max_decimales=MAX_DECIMALES):
+    """Menor número de decimales que representa exactamente los valores (None si no alcanza)"""
+    for decimales in range(max_decimales + 1):
+        if np.array_equal(np.round(valores, decimales), valores):
+            return decimales
+    return None
+
+
+def flotante_compacto(serie, max_decimales=MAX_DECIMALES):
+    """float32 de la serie y sus decimales, o (None, None) si se perdería precisión"""
+    valores = serie.to_numpy(dtype='float64')
+    validos = valores[~np.isnan(valores)]
+    decimales = decimales_necesarios(validos, max_decimales)
+    if decimales is None:
+        return None, None
+
+    compacta = serie.astype('float32')
+    recuperados = np.round(compacta.to_numpy(dtype='float64'), decimales)
+    if not np.array_equal(recuperados, valores, equal_nan=True):
+        return None, None
+    return compacta, decimales
+
+
+def columna_compacta(serie, max_decimales=MAX_DECIMALES, umbral_categoria=UMBRAL_CATEGORIA):
+    """(serie compacta, decimales) para una columna; la serie original si no conviene cambiarla"""
+    if pd.api.types.is_bool_dtype(serie) or isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie, None
+
+    if pd.api.types.is_integer_dtype(serie):
+        return pd.to_numeric(serie, downcast='integer'), None
+
+    if pd.api.types.is_float_dtype(serie):
+        if serie.dtype == 'float32':
+            return serie, None
+        compacta, decimales = flotante_compacto(serie, max_decimales)
+        return (serie, None) if compacta is None else (compacta, decimales)
+
+    if serie.dtype == object or pd.api.types.is_string_dtype(serie):
+        no_nulos = serie.dropna()
+        if len(no_nulos) and no_nulos.map(type).eq(str).all() and \
+                no_nulos.nunique() / len(serie) <= umbral_categoria:
+            return serie.astype('category'), None
+
+    return serie, None
+
+
+def optimizar_tipos(df, excluir=(), max_decimales=MAX_DECIMALES, umbral_categoria=UMBRAL_CATEGORIA):
+    """Reduce los tipos de todas las columnas; devuelve (df compacto, reporte por columna)"""
+    columnas = {}
+    filas = []
+    for col in df.columns:
+        serie = df[col]
+        if col in excluir:
+            compacta, decimales = serie, None
+        else:
+            compacta, decimales = columna_compacta(serie, max_decimales, umbral_categoria)
+        columnas[col] = compacta
+        filas.append({
+            'columna': col,
+            'tipo_original': str(serie.dtype),
+            'tipo_nuevo': str(compacta.dtype),
+            'decimales': decimales,
+            'bytes_antes': int(serie.memory_usage(deep=True, index=False)),
+            'bytes_despues': int(compacta.memory_usage(deep=True, index=False))
+        })
+    compacto = pd.DataFrame(columnas, index=df.index)
+    return compacto, pd.DataFrame(filas, columns=COLUMNAS_REPORTE_TIPOS)
+
+
+def restaurar_tipos(df, reporte):
+    """Copia con los tipos originales (float32 → float64 redondeado a sus decimales)"""
+    restaurado = df.copy()
+    for fila in reporte.itertuples(index=False):
+        if fila.columna not in restaurado.columns or fila.tipo_original == fila.tipo_nuevo:
+            continue
+        serie = restaurado[fila.columna]
+        if fila.tipo_nuevo == 'float32':
+            restaurado[fila.columna] = np.round(serie.astype('float64'), int(fila.decimales))
+        else:
+            restaurado[fila.columna] = serie.astype(fila.tipo_original)
+    return restaurado
+
+
+def imprimir_reporte_memoria(reporte, nombre):
+    """Resumen de memoria antes/después y columnas por tipo nuevo"""
+    antes = reporte['bytes_antes'].sum() / 1024 ** 2
+    despues = reporte['bytes_despues'].sum() / 1024 ** 2
+    ahorro = (1 - despues / antes) * 100 if antes else 0
+    print(f"  ✓ {nombre}: {antes:.1f} MB → {despues:.1f} MB ({ahorro:.1f}% menos)")
+
+    cambios = reporte[reporte['tipo_original'] != reporte['tipo_nuevo']]
+    if len(cambios):
+        conteo = cambios.groupby(['tipo_original', 'tipo_nuevo']).size()
+        for (original, nuevo), n in conteo.items():
+            print(f"    {original} → {nuevo}: {n} columnas")
@@ -0,0 +1,69 @@
+import pandas as pd
+
+# ========================================
+# UNIÓN MULTI-TABLA POR SEQN
+# ========================================
+# Reemplaza la cadena de merge(on='SEQN', how='left'): cada tabla se indexa
+# por SEQN una sola vez, se alinea al orden de la tabla base con reindex y
+# todas se pegan en un único pd.concat(axis=1). El costo es lineal en el
+# tamaño de la tabla final (no se copia la tabla ancha en cada paso).
+#
+# Colisiones de nombres: igual que merge(suffixes=('', f'_{tabla}')), una
+# columna que ya existe en lo acumulado se renombra a f'{columna}_{tabla}'.
+# Si una tabla trae SEQN repetidos se conserva la primera fila de cada SEQN
+# (merge duplicaría filas de la base).
+
+
+def resolver_colisiones(columnas_tabla, existentes, nombre_tabla):
+    """Renombres {columna: nueva} para las columnas que ya existen"""
+    renombres = {}
+    for col in columnas_tabla:
+        if col in existentes:
+            nueva = f"{col}_{nombre_tabla}"
+            sufijo = 2
+            while nueva in existentes or nueva in columnas_tabla:
+                nueva = f"{col}_{nombre_tabla}_{sufijo}"
+                sufijo += 1
+            renombres[col] = nueva
+    return renombres
+
+
+def indexar_por_seqn(df, clave='SEQN'):
+    """Tabla indexada por SEQN, sin claves nulas ni repetidas; devuelve (tabla, n_duplicados)"""
+    tabla = df[df[clave].notna()]
+    duplicados = tabla[clave].duplicated(keep='first')
+    n_duplicados = int(duplicados.sum())
+    if n_duplicados:
+        tabla = tabla[~duplicados]
+    return tabla.set_index(clave), n_duplicados
+
+
+def unir_por_seqn(base, tablas, clave='SEQN'):
+    """LEFT JOIN de `base` con todas las `tablas` [(nombre, df), ...] en una sola concatenación.
+
+    Devuelve (tabla unida, resumen por tabla con columnas agregadas,
+    renombradas por colisión y SEQN repetidos descartados).
+    """
+    claves_base = base[clave]
+    existentes = set(base.columns)
+    bloques = [base]
+    resumen = []
+
+    for nombre, df in tablas:
+        tabla, n_duplicados = indexar_por_seqn(df, clave)
+        renombres = resolver_colisiones(list(tabla.columns), existentes, nombre)
+        if renombres:
+            tabla = tabla.rename(columns=renombres)
+        existentes.update(tabla.columns)
+
+        alineada = tabla.reindex(claves_base)
+        alineada.index = base.index
+        bloques.append(alineada)
+        resumen.append({
+            'tabla': nombre,
+            'columnas': tabla.shape[1],
+            'renombradas': len(renombres),
+            'seqn_duplicados': n_duplicados
+        })
+
+    return pd.concat(bloques, axis=1), pd.DataFrame(resumen)
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# ========================================
+# REGISTRO DE RANGOS VÁLIDOS
+# ========================================
+# Variable → (mínimo, máximo[, cerrado]). None deja el límite abierto.
+# 'cerrado' = 'ambos' (por defecto) acepta mínimo <= x <= máximo;
+# 'derecha' acepta mínimo < x <= máximo (p.ej. precios estrictamente > 0).
+# Los NaN no cuentan como fuera de rango (se tratan aparte).
+
+RANGOS_VALIDOS = {
+    # NHANES - Antropometría (BMX_L)
+    'BMXWT': (20, 300),       # Peso (kg)
+    'BMXHT': (100, 230),      # Altura (cm)
+    'BMXBMI': (12, 70),       # IMC
+    'BMXWAIST': (40, 200),    # Cintura (cm)
+    # NHANES - Laboratorio
+    'LBXGH': (3, 18),         # HbA1c (%)
+    'LBXGLU': (40, 600),      # Glucosa (mg/dL)
+    'LBXTC': (100, 500),      # Colesterol total (mg/dL)
+    'LBDHDD': (10, 150),      # HDL (mg/dL)
+    'LBXTR': (30, 1000),      # Triglicéridos (mg/dL)
+    # BRFSS
+    'IMC_REAL': (10, 80),
+    # ODEPA
+    'Precio promedio': (0, None, 'derecha'),
+}
+
+COLUMNAS_VIOLACIONES = ['tabla', 'variable', 'minimo', 'maximo', 'n_evaluados', 'n_fuera_rango', 'pct_fuera_rango']
+
+
+def limites(rango):
+    """(mínimo, máximo, cerrado) con límites abiertos como ±inf"""
+    minimo, maximo = rango[0], rango[1]
+    cerrado = rango[2] if len(rango) > 2 else 'ambos'
+    minimo = -np.inf if minimo is None else minimo
+    maximo = np.inf if maximo is None else maximo
+    return minimo, maximo, cerrado
+
+
+def rangos_presentes(df, rangos=RANGOS_VALIDOS, variables=None):
+    """Subconjunto del registro con las columnas presentes en df"""
+    variables = variables if variables is not None else list(rangos)
+    return {v: rangos[v] for v in variables if v in rangos and v in df.columns}
+
+
+def mascara_fuera_rango(df, rangos):
+    """Matriz booleana (filas × variables) de valores fuera de rango, en una sola pasada.
+
+    Las columnas deben ser numéricas (validar_rangos las convierte antes).
+    """
+    variables = list(rangos)
+    if not variables:
+        return np.zeros((len(df), 0), dtype=bool), variables
+
+    valores = df[variables].to_numpy(dtype='float64')
+    minimos, maximos, abiertos = [], [], []
+    for v in variables:
+        minimo, maximo, cerrado = limites(rangos[v])
+        minimos.append(minimo)
+        maximos.append(maximo)
+        abiertos.append(cerrado == 'derecha')
+    minimos = np.array(minimos, dtype='float64')
+    maximos = np.array(maximos, dtype='float64')
+    abiertos = np.array(abiertos)
+
+    # Límite inferior inclusivo o exclusivo por columna (broadcast sobre filas)
+    bajo = np.where(abiertos, valores <= minimos, valores < minimos)
+    return bajo | (valores > maximos), variables
+
+
+def resumir_violaciones(df, rangos, fuera, variables, tabla):
+    """Conteo de valores evaluados (no nulos) y fuera de rango por variable"""
+    n_evaluados = df[variables].notna().sum().to_numpy() if variables else []
+    n_fuera = fuera.sum(axis=0)
+    filas = []
+    for i, v in enumerate(variables):
+        minimo, maximo = rangos[v][0], rangos[v][1]
+        filas.append({
+            'tabla': tabla,
+            'variable': v,
+            'minimo': minimo,
+            'maximo': maximo,
+            'n_evaluados': int(n_evaluados[i]),
+            'n_fuera_rango': int(n_fuera[i]),
+            'pct_fuera_rango': round(n_fuera[i] / n_evaluados[i] * 100, 2) if n_evaluados[i] else 0.0
+        })
+    return pd.DataFrame(filas, columns=COLUMNAS_VIOLACIONES)
+
+
+def validar_rangos(df, rangos=RANGOS_VALIDOS, tabla=None, accion='anular', variables=None):
+    """Aplica todos los rangos del registro presentes en df.
+
+    accion='anular' deja en NaN los valores fuera de rango (las columnas quedan
+    numéricas); accion='eliminar' descarta las filas con alguna violación.
+    Devuelve (df, resumen de violaciones por variable).
+    """
+    rangos = rangos_presentes(df, rangos, variables)
+    variables = list(rangos)
+    if not variables:
+        return df, pd.DataFrame(columns=COLUMNAS_VIOLACIONES)
+
+    for v in variables:
+        df[v] = pd.to_numeric(df[v], errors='coerce')
+    fuera, variables = mascara_fuera_rango(df, rangos)
+    violaciones = resumir_violaciones(df, rangos, fuera, variables, tabla)
+
+    if accion == 'eliminar':
+        df = df[~fuera.any(axis=1)]
+    else:
+        df[variables] = df[variables].mask(fuera)
+    return df, violaciones
+
+
+def dentro_de_rango(valores, variable, rangos=RANGOS_VALIDOS):
+    """Máscara de valores dentro del rango registrado para `variable` (arreglos sueltos)"""
+    minimo, maximo, cerrado = limites(rangos[variable])
+    valores = np.asarray(valores, dtype='float64')
+    bajo_ok = valores > minimo if cerrado == 'derecha' else valores >= minimo
+    return bajo_ok & (valores <= maximo)
@@ -0,0 +1,100 @@
+import pandas as pd
+
+from utilidades.carga import tipo_sqlite
+from utilidades.tipos_compactos import restaurar_tipos
+
+# ========================================
+# TABLAS *_LIMPIO COMO VISTAS SOBRE NHANES_MASTER
+# ========================================
+# La mayoría de las columnas de una tabla limpia ya están, con los mismos
+# valores, en NHANES_MASTER (misma fila por SEQN y ciclo). En lugar de
+# guardar otra copia se guarda:
+#   - {tabla}_LIMPIO_DELTA: SEQN + las columnas que no se pueden leer de la
+#     maestra (no unidas, renombradas con otros valores, modificadas en el
+#     PASO 4, o toda la tabla si hay SEQN repetidos o fuera de la maestra)
+#   - {tabla}_LIMPIO: vista que junta DELTA con NHANES_MASTER por SEQN y
+#     devuelve las columnas en el orden y con los valores de la tabla limpia
+# El orden de las filas se guarda en la columna explícita COLUMNA_ORDEN de la
+# delta (no en el rowid), para que la vista sea SQL estándar y se pueda
+# recrear en PostgreSQL (Conexion_postgre.py).
+
+SUFIJO_DELTA = "_DELTA"
+COLUMNA_ORDEN = "_orden"
+
+
+def eliminar_tabla_o_vista(conn, nombre):
+    """Borra `nombre` sea tabla o vista (para poder cambiar de modo entre corridas)"""
+    fila = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (nombre,)).fetchone()
+    if fila is not None:
+        conn.execute(f'DROP {"VIEW" if fila[0] == "view" else "TABLE"} "{nombre}"')
+
+
+def mismos_valores(a, b):
+    """Igualdad elemento a elemento con NaN == NaN y mismo tipo de columna SQLite"""
+    if tipo_sqlite(a) != tipo_sqlite(b):
+        return False
+    a, b = a.reset_index(drop=True), b.reset_index(drop=True)
+    iguales = (a == b) | (a.isna() & b.isna())
+    return bool(iguales.all())
+
+
+def columnas_desde_maestra(df, master, base, ciclo, clave='SEQN', tipos=None):
+    """{columna de df: columna de la maestra} para las columnas que se pueden leer de la maestra.
+
+    `master` puede venir con tipos compactos (optimizar_tipos): con su reporte
+    `tipos` cada columna candidata se restaura sola antes de comparar, con los
+    valores que quedaron guardados en la base.
+    """
+    en_ciclo = master['ciclo'] == ciclo if 'ciclo' in master.columns else pd.Series(True, index=master.index)
+    posiciones = pd.Series(range(len(master)), index=master[clave].to_numpy())[en_ciclo.to_numpy()]
+    posiciones = posiciones[~posiciones.index.duplicated()]
+    claves = df[clave]
+    if claves.duplicated().any() or not claves.isin(posiciones.index).all():
+        return {}
+
+    # Filas de la maestra alineadas con df, sin copiar la maestra completa
+    filas = posiciones.reindex(claves).to_numpy()
+    mapa = {}
+    for col in df.columns:
+        if col == clave:
+            continue
+        # Columnas repetidas entre tablas llevan el nombre base como sufijo en la maestra
+        for candidata in (f"{col}_{base}", col):
+            if candidata not in master.columns:
+                continue
+            alineada = master[[candidata]].iloc[filas]
+            if tipos is not None:
+                alineada = restaurar_tipos(alineada, tipos)
+            if mismos_valores(df[col], alineada[candidata]):
+                mapa[col] = candidata
+                break
+    return mapa
+
+
+def guardar_como_vista(conn, nombre, df, master, base, ciclo, clave='SEQN', tabla_maestra="NHANES_MASTER",
+                       tipos=None):
+    """Guarda `nombre` como vista sobre la maestra + tabla delta; devuelve (columnas de la maestra, columnas en delta)"""
+    mapa = columnas_desde_maestra(df, master, base, ciclo, clave, tipos)
+    columnas_delta = [c for c in df.columns if c not in mapa]
+    if clave not in columnas_delta:
+        columnas_delta.insert(0, clave)
+
+    tabla_delta = f"{nombre}{SUFIJO_DELTA}"
+    eliminar_tabla_o_vista(conn, nombre)
+    eliminar_tabla_o_vista(conn, tabla_delta)
+    delta = df[columnas_delta].copy()
+    delta[COLUMNA_ORDEN] = range(len(delta))
+    delta.to_sql(tabla_delta, conn, if_exists="replace", index=False)
+
+    seleccion = ', '.join(
+        f'm."{mapa[c]}" AS "{c}"' if c in mapa else f'd."{c}"'
+        for c in df.columns
+    )
+    condicion_ciclo = f" AND m.\"ciclo\" = '{ciclo}'" if ciclo is not None else ""
+    conn.execute(
+        f'CREATE VIEW "{nombre}" AS SELECT {seleccion} '
+        f'FROM "{tabla_delta}" d LEFT JOIN "{tabla_maestra}" m '
+        f'ON m."{clave}" = d."{clave}"{condicion_ciclo} ORDER BY d."{COLUMNA_ORDEN}"'
+    )
+    conn.commit()
+    return len(mapa), len(columnas_delta)